@@ -0,0 +1,95 @@
+from app import create_app, db
+from app.json_provider import orjson
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from config import Config
+from flask.json.provider import DefaultJSONProvider
+from datetime import datetime
+from decimal import Decimal
+import json
+import random
+import sys
+import time
+
+# Mede a serialização do payload de um hunt com 500 bónus (to_dict) com o
+# provider JSON por omissão do Flask, com o FastJSONProvider sem orjson (json
+# padrão) e com orjson, e confirma que os três dão o mesmo JSON depois de
+# lido. Verifica também Decimal, datetime e inf/nan. Corre numa base de dados
+# em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+BONUSES = 500
+REPEAT = 200
+MIN_SPEEDUP = 3
+
+class StdlibConfig(CheckConfig):
+    JSON_ORJSON = False
+
+def make_hunt(rng):
+    slots = [Slot(name=f'Slot {i}', provider=f'Provider {i % 20}', image=f'images/slot{i}.png') for i in range(100)]
+    db.session.add_all(slots)
+    hunt = BonusHunt(nome='Bench', custo_inicial=1000.0)
+    db.session.add(hunt)
+    for i in range(BONUSES):
+        # Metade aberta: break-even finito; os testes de inf usam outro payload
+        db.session.add(Bonus(hunt=hunt, slot=rng.choice(slots), aposta=rng.choice([0.5, 1.0, 2.0]),
+                             payout=round(rng.uniform(0, 300), 2) if i < BONUSES // 2 else None, nota='nota'))
+    db.session.commit()
+    return hunt
+
+def timed(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def check_types(provider):
+    value = {'decimal': Decimal('1.25'), 'date': datetime(2026, 10, 18, 12, 30, 5), 'inf': float('inf'),
+             'nan': float('nan'), 'nested': [float('-inf'), 2.5], 'text': 'ação'}
+    expected = {'decimal': 1.25, 'date': '2026-10-18T12:30:05', 'inf': None, 'nan': None, 'nested': [None, 2.5], 'text': 'ação'}
+    return json.loads(provider.dumps(value)) == expected
+
+if __name__ == "__main__":
+    ok = True
+    stdlib_app = create_app(StdlibConfig)
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        hunt = make_hunt(random.Random(0))
+        payload = hunt.carregar_bonus().to_dict()
+
+        providers = {
+            'flask default': DefaultJSONProvider(app),
+            'fast (stdlib)': stdlib_app.json,
+            'fast (orjson)': app.json,
+        }
+        print(f"orjson {'available' if orjson else 'NOT installed'}; payload {len(json.dumps(payload)) // 1024} KiB, {BONUSES} bonuses")
+        reference = json.loads(providers['flask default'].dumps(payload))
+        times = {}
+        print(f"{'provider':>16}{'dumps ms':>10}{'response ms':>13}  same JSON  types")
+        for name, provider in providers.items():
+            times[name] = timed(lambda: provider.dumps(payload))
+            response_ms = timed(lambda: provider.response(payload))
+            same = json.loads(provider.response(payload).get_data()) == reference
+            types = name == 'flask default' or check_types(provider)
+            print(f"{name:>16}{times[name]:>10.2f}{response_ms:>13.2f}  {str(same):>9}  {types}")
+            ok = ok and same and types
+
+        if orjson:
+            speedup = times['flask default'] / times['fast (orjson)']
+            print(f"orjson speedup over the Flask default: {speedup:.1f}x")
+            ok = ok and speedup >= MIN_SPEEDUP
+
+        # Hunt sem bónus por abrir: break_even_x infinito chega ao cliente como null
+        for bonus in hunt.bonuses:
+            if bonus.payout is None:
+                bonus.payout = 1.0
+        db.session.commit()
+        data = app.test_client().get(f'/bonus-hunts/{hunt.id}/data').get_json()
+        print(f"break_even_x with no unopened bonuses: {data['estatisticas']['break_even_x']!r}")
+        ok = ok and data['estatisticas']['break_even_x'] is None
+    sys.exit(0 if ok else 1)
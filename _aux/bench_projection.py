@@ -0,0 +1,91 @@
+from app import create_app, db
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from app.projection import project, simulate, _groups, _history, _remaining
+from config import Config
+import numpy as np
+import random
+import sys
+import time
+
+# Mede a projeção Monte Carlo (app/projection.py) com 100k simulações para
+# hunts com 20, 50 e 100 bónus por abrir, confirma que a média simulada bate
+# com o valor esperado calculado diretamente das amostras e que o resultado
+# fica em cache até a revisão do hunt mudar. Corre numa base de dados em
+# memória com um histórico aleatório.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+SIZES = [20, 50, 100]
+SIMULATIONS = 100000
+HISTORY = 3000
+TARGET_MS = 100
+TARGET_SIZE = 50
+
+def add_history(rng):
+    slots = [Slot(name=f'Slot {i}', provider=f'Provider {i % 12}', volatility=rng.randint(1, 10),
+                  potential=rng.choice([None, 500, 2500, 5000, 10000, 50000])) for i in range(300)]
+    db.session.add_all(slots)
+    hunt = BonusHunt(nome='History', custo_inicial=100000.0)
+    db.session.add(hunt)
+    # Só parte dos slots tem histórico: os outros usam provider/faixa/global
+    for _ in range(HISTORY):
+        slot = rng.choice(slots[:120])
+        aposta = rng.choice([0.5, 1.0, 2.0, 4.0])
+        db.session.add(Bonus(hunt=hunt, slot=slot, aposta=aposta, payout=round(aposta * rng.lognormvariate(3.5, 1.2), 2)))
+    db.session.commit()
+    return slots
+
+def add_hunt(size, slots, rng):
+    hunt = BonusHunt(nome=f'Open {size}', custo_inicial=size * 2.0)
+    db.session.add(hunt)
+    for _ in range(size):
+        db.session.add(Bonus(hunt=hunt, slot=rng.choice(slots), aposta=rng.choice([0.5, 1.0, 2.0])))
+    db.session.commit()
+    return hunt
+
+def expected_total(groups):
+    # Valor esperado exato da soma dos payouts: média das amostras (já com o teto) x aposta
+    return sum(float(amostras.mean() * apostas.sum()) for amostras, apostas in groups)
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    ok = True
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        slots = add_history(rng)
+        print(f"{'bonuses':>8}{'simulate ms':>13}{'project ms':>12}{'cached ms':>11}{'mean err':>10}  sources")
+        for size in SIZES:
+            hunt = add_hunt(size, slots, rng)
+            groups, sources = _groups(_remaining(hunt.id), _history(), app.config['PROJECTION_MIN_SAMPLES'])
+
+            simulate(groups, 1000, np.random.default_rng(0), app.config['PROJECTION_BATCH_SIZE'])  # aquecimento
+            start = time.perf_counter()
+            totals = simulate(groups, SIMULATIONS, np.random.default_rng(1), app.config['PROJECTION_BATCH_SIZE'])
+            simulate_ms = (time.perf_counter() - start) * 1000
+            error = abs(totals.mean() / expected_total(groups) - 1)
+
+            start = time.perf_counter()
+            result = project(hunt, SIMULATIONS)
+            project_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            cached = project(hunt, SIMULATIONS)
+            cached_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{size:>8}{simulate_ms:>13.1f}{project_ms:>12.1f}{cached_ms:>11.3f}{error:>10.2%}  {sources}")
+            ok = ok and error < 0.01 and cached is result
+            if size == TARGET_SIZE:
+                ok = ok and simulate_ms < TARGET_MS
+
+            # Uma alteração ao hunt muda a revisão e obriga a simular de novo
+            bonus = hunt.bonuses[0]
+            bonus.payout = 100.0
+            db.session.commit()
+            again = project(hunt, SIMULATIONS)
+            ok = ok and again is not result and again['bonus_por_abrir'] == size - 1
+        print(f"P(profit) {result['probabilidade_lucro']:.3f}, P10/P50/P90 "
+              f"{result['p10']:.0f}/{result['p50']:.0f}/{result['p90']:.0f} (last hunt)")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,57 @@
+from app import create_app, db
+from app.models.slot import Slot
+from app.search import search_slots_ranked, rebuild_search_index, slot_filter
+from sqlalchemy import func, select
+import time
+
+# Compara o /slots/search antigo com search_slots_ranked(). "matches" são as
+# linhas que o SQLite lê nos dois casos (todos os slots cujo nome contém o
+# termo); "old rows" e "new rows" são as que chegam ao Python: o caminho
+# antigo carrega todos os matches como objetos Slot, o novo só as 10 da
+# resposta. O tempo é a média de RUNS pesquisas.
+#
+# Corre sobre a base de dados configurada e (re)cria o índice FTS5: usar uma
+# cópia, p. ex. DATABASE_URL=sqlite:////tmp/slots.db.
+
+app = create_app()
+
+QUERIES = ['b', 'bo', 'bonan']
+RUNS = 50
+
+def old_search(query):
+    # Caminho antigo de /slots/search: carrega todos os matches e deduplica em Python
+    slots = Slot.query.filter(func.lower(Slot.name).like(f"%{query.lower()}%")).all()
+    unique_slots = {}
+    for slot in slots:
+        if slot.name.lower() not in unique_slots:
+            unique_slots[slot.name.lower()] = slot
+            if len(unique_slots) == 10:
+                break
+    return len(slots), list(unique_slots.values())
+
+def new_search(query):
+    rows = search_slots_ranked(query, limit=10)
+    return len(rows), rows
+
+def count_matches(query):
+    return db.session.execute(select(func.count()).select_from(Slot).where(slot_filter('name', query))).scalar()
+
+def measure(fn, query):
+    rows_loaded, _ = fn(query)
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        fn(query)
+        db.session.expunge_all()
+    return rows_loaded, (time.perf_counter() - start) / RUNS * 1000
+
+def run_benchmark():
+    with app.app_context():
+        rebuild_search_index()
+        print(f"{'query':<8}{'matches':>10}{'old rows':>10}{'old ms':>10}{'new rows':>10}{'new ms':>10}")
+        for query in QUERIES:
+            old_rows, old_ms = measure(old_search, query)
+            new_rows, new_ms = measure(new_search, query)
+            print(f"{query:<8}{count_matches(query):>10}{old_rows:>10}{old_ms:>10.2f}{new_rows:>10}{new_ms:>10.2f}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,123 @@
+from config import basedir
+import http.client
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Pedidos/s do servidor de desenvolvimento (o run.py, com debug, e app.run
+# sem debug, para comparar só o servidor) contra o gunicorn
+# (gunicorn.conf.py) e o waitress (python wsgi.py), com a mesma app e uma
+# cópia migrada do slots.db, com as miniaturas geradas. Cada endpoint leva
+# CONCURRENCY ligações em paralelo durante DURATION segundos, com
+# Accept-Encoding como um browser.
+#
+#   PYTHONPATH=. python _aux/bench_server.py [DURATION]
+
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+CONCURRENCY = 8
+PORT = 8765
+ENDPOINTS = ['/health', '/slots/', '/slots/?sort=rtp&order=desc&page=3', '/slots/search?q=book', '/bonus-hunts/']
+SERVERS = {
+    # O run.py tal como está (debug: sem a cache da lista de slots), sem o reloader
+    'run.py (debug)': [sys.executable, '-c', f"from wsgi import app; app.run(host='127.0.0.1', port={PORT}, debug=True, use_reloader=False)"],
+    'dev server': [sys.executable, '-c', f"from wsgi import app; app.run(host='127.0.0.1', port={PORT}, threaded=True)"],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+    'waitress': [sys.executable, 'wsgi.py'],
+}
+HEADERS = {'Accept-Encoding': 'br, gzip', 'Connection': 'keep-alive'}
+
+def wait_ready(timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=2)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def load(path):
+    """(pedidos/s, latência média em ms, erros) de `path` durante DURATION segundos."""
+    counts, errors, latencies = [0] * CONCURRENCY, [0] * CONCURRENCY, [0.0] * CONCURRENCY
+    deadline = time.monotonic() + DURATION
+
+    def client(index):
+        # O HTTPConnection volta a ligar-se sozinho quando o servidor fecha a ligação
+        connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=HEADERS)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                connection.close()
+                continue
+            latencies[index] += time.perf_counter() - start
+            counts[index] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CONCURRENCY)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = sum(counts)
+    return total / DURATION, sum(latencies) / max(total, 1) * 1000, sum(errors)
+
+def migrated_copy(folder):
+    path = os.path.join(folder, 'slots.db')
+    shutil.copy(os.path.join(basedir, 'slots.db'), path)
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    # Como em produção: esquema atual e miniaturas geradas (sem elas as
+    # páginas da lista de slots não ficam em cache)
+    for command in (['db', 'upgrade'], ['slots', 'thumbnails']):
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'wsgi', *command], cwd=basedir, env=env,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return env
+
+if __name__ == "__main__":
+    ok = True
+    folder = tempfile.mkdtemp()
+    results = {}
+    try:
+        env = migrated_copy(folder)
+        env.update(SERVER_BIND=f'127.0.0.1:{PORT}', HEALTH_CHECK='1')
+        for name, command in SERVERS.items():
+            server = subprocess.Popen(command, cwd=basedir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not wait_ready():
+                    print(f"{name}: did not start")
+                    ok = False
+                    continue
+                for path in ENDPOINTS:
+                    load(path)  # aquecimento: caches e ligações
+                    results[name, path] = load(path)
+            finally:
+                server.terminate()
+                server.wait(30)
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"{os.cpu_count()} CPU(s), {CONCURRENCY} concurrent connections, {DURATION:.0f}s per endpoint")
+    print(f"{'endpoint':<40}" + ''.join(f"{name:>22}" for name in SERVERS))
+    for path in ENDPOINTS:
+        row = f"{path:<40}"
+        for name in SERVERS:
+            if (name, path) not in results:
+                row += f"{'-':>22}"
+                continue
+            rate, latency, errors = results[name, path]
+            row += f"{rate:>9.0f} req/s {latency:>5.1f} ms"
+            ok = ok and errors == 0
+        print(row)
+    sys.exit(0 if ok else 1)
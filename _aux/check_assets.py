@@ -0,0 +1,127 @@
+from app import create_app, db
+from app.assets import BUNDLES, DIST_DIR, asset_urls, build_assets, compress_static, rjsmin
+from app.models.bonus_hunt import BonusHunt
+from config import Config
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Constrói os bundles de JS/CSS (`flask assets build`) numa cópia dos
+# estáticos e confirma que: as páginas passam a pedir só os ficheiros com
+# hash, servidos com cache imutável de um ano (e em br/gzip); o bundle de JS é
+# JavaScript válido (com o node, se existir); um build sem alterações dá os
+# mesmos nomes; e, alterado um ficheiro de origem, as páginas voltam a pedir a
+# origem até ao build seguinte, que muda o hash e apaga o bundle antigo. A
+# página de um hunt fechado muda de ETag a cada build: a revalidação com a
+# ETag anterior não dá 304 para uma página com os bundles apagados. Corre
+# numa base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+IMMUTABLE = 'max-age=31536000'
+
+def page_assets(client):
+    html = client.get('/bonus-hunts/').get_data(as_text=True)
+    return {url for url in html.replace('"', ' ').split() if url.startswith('/static/') and url.endswith(('.js', '.css'))}
+
+def closed_hunt(client, hunt_id, etag=None):
+    """(estado, ETag, ficheiros pedidos) da página do hunt fechado."""
+    response = client.get(f'/bonus-hunts/{hunt_id}', headers={'If-None-Match': etag} if etag else {})
+    html = response.get_data(as_text=True)
+    urls = {url for url in html.replace('"', ' ').split() if url.startswith('/static/') and url.endswith(('.js', '.css'))}
+    return response.status_code, response.headers['ETag'], urls
+
+def check_revalidation(client, hunt_id, etag, urls):
+    status, new_etag, loaded = closed_hunt(client, hunt_id, etag)
+    print(f"closed hunt revalidated with the previous ETag: {status}, ETag {etag} -> {new_etag}")
+    return status == 200 and new_etag != etag and loaded == urls, new_etag
+
+def check_node(path):
+    if shutil.which('node') is None:
+        print("node not found: bundle syntax not checked")
+        return True
+    result = subprocess.run(['node', '--check', path], capture_output=True, text=True)
+    print(f"node --check {os.path.basename(path)}: {'ok' if result.returncode == 0 else result.stderr}")
+    return result.returncode == 0
+
+def build(static_folder):
+    manifest = build_assets(static_folder)
+    compress_static(os.path.join(static_folder, DIST_DIR))
+    return manifest
+
+def check(static_folder):
+    client = app.test_client()
+    sources = {f'/static/{source}' for sources in BUNDLES.values() for source in sources}
+    ok = page_assets(client) == sources
+    print(f"without a build the pages load the {len(sources)} source files: {ok}")
+    hunt = BonusHunt(nome='Assets', custo_inicial=100.0)
+    db.session.add(hunt)
+    db.session.commit()
+    client.post(f'/bonus-hunts/{hunt.id}/close', headers={'X-Requested-With': 'XMLHttpRequest'})
+    status, etag, _ = closed_hunt(client, hunt.id)
+    ok = ok and status == 200 and closed_hunt(client, hunt.id, etag)[0] == 304
+
+    manifest = build(static_folder)
+    for name, filename in sorted(manifest.items()):
+        original = sum(os.path.getsize(os.path.join(static_folder, source)) for source in BUNDLES[name])
+        print(f"{name} -> {filename}: {original} -> {os.path.getsize(os.path.join(static_folder, filename))} bytes")
+    ok = check_node(os.path.join(static_folder, manifest['js/app.js'])) and ok
+    urls = {f'/static/{filename}' for filename in manifest.values()}
+    loaded = page_assets(client)
+    print(f"pages load {sorted(loaded)}")
+    ok = ok and loaded == urls
+    revalidated, etag = check_revalidation(client, hunt.id, etag, urls)
+    ok = ok and revalidated
+
+    for url in sorted(urls):
+        response = client.get(url, headers={'Accept-Encoding': 'br, gzip'})
+        response.close()
+        cache_control = response.headers.get('Cache-Control', '')
+        good = response.status_code == 200 and IMMUTABLE in cache_control and 'immutable' in cache_control
+        print(f"  {url}: {response.status_code} {response.headers.get('Content-Encoding')} Cache-Control: {cache_control}")
+        ok = ok and good and response.headers.get('Content-Encoding') in ('br', 'gzip')
+    # Os ficheiros de origem continuam sem cache imutável
+    response = client.get('/static/js/slots.js')
+    response.close()
+    ok = ok and 'immutable' not in response.headers.get('Cache-Control', '')
+
+    ok = ok and build(static_folder) == manifest
+    print(f"rebuild without changes keeps the names: {build(static_folder) == manifest}")
+
+    # Origem alterada: volta a servir a origem até ao build seguinte
+    time.sleep(0.01)
+    with open(os.path.join(static_folder, 'css/style.css'), 'a', encoding='utf-8') as f:
+        f.write('\n.check-assets { color: red; }\n')
+    with app.test_request_context():
+        stale = asset_urls('css/app.css')
+    print(f"edited style.css, before rebuilding: {stale}")
+    ok = ok and stale == ['/static/css/style.css', '/static/css/bonus-hunt.css']
+    rebuilt = build(static_folder)
+    old = os.path.join(static_folder, manifest['css/app.css'])
+    print(f"rebuilt css/app.css -> {rebuilt['css/app.css']}; previous bundle removed: {not os.path.exists(old)}")
+    ok = ok and rebuilt['css/app.css'] != manifest['css/app.css'] and rebuilt['js/app.js'] == manifest['js/app.js']
+    ok = ok and not os.path.exists(old) and not os.path.exists(old + '.br')
+    with app.test_request_context():
+        ok = ok and asset_urls('css/app.css') == [f"/static/{rebuilt['css/app.css']}"]
+    revalidated, etag = check_revalidation(client, hunt.id, etag, {f'/static/{filename}' for filename in rebuilt.values()})
+    return ok and revalidated
+
+if __name__ == "__main__":
+    print(f"rjsmin/rcssmin {'available' if rjsmin else 'NOT installed'}")
+    static_folder = tempfile.mkdtemp()
+    try:
+        for folder in ('js', 'css'):
+            shutil.copytree(os.path.join(app.static_folder, folder), os.path.join(static_folder, folder))
+        app.static_folder = static_folder
+        with app.app_context():
+            db.create_all()
+            ok = check(static_folder)
+    finally:
+        shutil.rmtree(static_folder)
+    sys.exit(0 if ok else 1)
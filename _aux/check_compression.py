@@ -0,0 +1,130 @@
+from app import create_app, db
+from app.assets import compress_static
+from app.compression import brotli
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from config import Config, basedir
+import gzip
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+# Confirma a compressão das respostas: o estado de um hunt de 300 bónus
+# (/data) e a sua página, em br e gzip, com o Vary certo e o mesmo conteúdo
+# depois de descomprimido; sem Accept-Encoding, abaixo do limite ou em stream
+# não há compressão; o 304 do hunt fechado continua a funcionar com a ETag
+# fraca. Depois pré-comprime uma cópia dos JS/CSS e confirma que a rota
+# static serve a variante certa. Os slots vêm do slots.db (só leitura) para o
+# payload ter nomes e imagens reais; corre numa base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+BONUSES = 300
+
+def catalog_slots(count):
+    path = os.path.join(basedir, 'slots.db')
+    if os.path.exists(path):
+        with sqlite3.connect(f'file:{path}?mode=ro', uri=True) as conn:
+            rows = conn.execute("SELECT name, provider, image FROM slots ORDER BY id LIMIT ?", (count,)).fetchall()
+        if rows:
+            return [Slot(name=name, provider=provider or 'Unknown', image=image) for name, provider, image in rows]
+    return [Slot(name=f'Slot {i}', provider=f'Provider {i % 20}', image=f'images/slot{i}.png') for i in range(count)]
+
+def make_hunt(rng):
+    slots = catalog_slots(200)
+    db.session.add_all(slots)
+    hunt = BonusHunt(nome='Compression', custo_inicial=1000.0)
+    db.session.add(hunt)
+    for i in range(BONUSES):
+        db.session.add(Bonus(hunt=hunt, slot=rng.choice(slots), aposta=rng.choice([0.4, 1.0, 2.0]),
+                             payout=round(rng.uniform(0, 300), 2) if i % 2 else None))
+    db.session.commit()
+    return hunt.id
+
+def decode(response):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'br':
+        return brotli.decompress(response.data)
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    return response.data
+
+def check_encodings(client, url):
+    identity = client.get(url)
+    ok = identity.status_code == 200 and 'Content-Encoding' not in identity.headers
+    print(f"{url}: {len(identity.data)} bytes")
+    for encoding in (['br'] if brotli else []) + ['gzip']:
+        response = client.get(url, headers={'Accept-Encoding': f'{encoding}, identity;q=0.5'})
+        same = decode(response) == identity.data
+        vary = 'Accept-Encoding' in response.vary
+        saved = 1 - len(response.data) / len(identity.data)
+        print(f"  {encoding:>5}: {len(response.data):>7} bytes ({saved:.0%} saved)  same content: {same}  Vary: {vary}")
+        ok = ok and response.headers.get('Content-Encoding') == encoding and same and vary and saved > 0.5
+    # Sem brotli aceite, com preferência explícita
+    response = client.get(url, headers={'Accept-Encoding': 'br;q=0.1, gzip'})
+    ok = ok and response.headers.get('Content-Encoding') == 'gzip'
+    return ok
+
+def check_static(client, static_folder):
+    count, original_bytes, compressed_bytes = compress_static(static_folder)
+    print(f"static: {count} files precompressed ({original_bytes} -> {compressed_bytes} bytes)")
+    ok = count > 0 and compress_static(static_folder) == (0, 0, 0)
+    for filename in ('js/bonus-hunts.js', 'css/style.css'):
+        with open(os.path.join(static_folder, filename), 'rb') as f:
+            original = f.read()
+        for accept, encoding in (('br, gzip', 'br' if brotli else 'gzip'), ('gzip', 'gzip'), ('', None)):
+            response = client.get(f'/static/{filename}', headers={'Accept-Encoding': accept})
+            body = decode(response)
+            response.close()
+            good = (response.headers.get('Content-Encoding') == encoding and body == original
+                    and 'Accept-Encoding' in response.vary and response.mimetype in ('text/javascript', 'text/css'))
+            print(f"  /static/{filename} [{accept or 'identity'}]: {len(response.data)} bytes, {response.mimetype}  ok: {good}")
+            ok = ok and good
+    # Original alterado depois da compressão: serve o original
+    path = os.path.join(static_folder, 'css/style.css')
+    os.utime(path, (os.stat(path).st_atime, os.stat(path + '.gz').st_mtime + 10))
+    response = client.get('/static/css/style.css', headers={'Accept-Encoding': 'br, gzip'})
+    response.close()
+    print(f"  stale variants ignored: {'Content-Encoding' not in response.headers}")
+    return ok and 'Content-Encoding' not in response.headers
+
+if __name__ == "__main__":
+    ok = True
+    print(f"brotli {'available' if brotli else 'NOT installed'}")
+    with app.app_context():
+        db.create_all()
+        hunt_id = make_hunt(random.Random(0))
+        client = app.test_client()
+        ok = check_encodings(client, f'/bonus-hunts/{hunt_id}/data') and ok
+        ok = check_encodings(client, f'/bonus-hunts/{hunt_id}') and ok
+
+        # Abaixo do limite e respostas em stream ficam como estão
+        small = client.post('/bonus-hunts/update_payout/999999', headers={'Accept-Encoding': 'gzip'})
+        export = client.get('/bonus-hunts/bonuses/export', headers={'Accept-Encoding': 'gzip'})
+        export.close()
+        print(f"small response encoded: {'Content-Encoding' in small.headers}; streamed export encoded: {'Content-Encoding' in export.headers}")
+        ok = ok and 'Content-Encoding' not in small.headers and 'Content-Encoding' not in export.headers
+
+        # Hunt fechado: ETag fraca na resposta comprimida e 304 na revalidação
+        client.post(f'/bonus-hunts/{hunt_id}/close', headers={'X-Requested-With': 'XMLHttpRequest'})
+        response = client.get(f'/bonus-hunts/{hunt_id}', headers={'Accept-Encoding': 'gzip'})
+        revalidated = client.get(f'/bonus-hunts/{hunt_id}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        print(f"closed hunt ETag {response.headers['ETag']} -> {revalidated.status_code}")
+        ok = ok and response.headers['ETag'].startswith('W/') and revalidated.status_code == 304
+
+    static_folder = tempfile.mkdtemp()
+    try:
+        for folder in ('js', 'css'):
+            shutil.copytree(os.path.join(app.static_folder, folder), os.path.join(static_folder, folder))
+        app.static_folder = static_folder
+        with app.app_context():
+            ok = check_static(app.test_client(), static_folder) and ok
+    finally:
+        shutil.rmtree(static_folder)
+    sys.exit(0 if ok else 1)
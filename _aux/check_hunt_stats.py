@@ -0,0 +1,239 @@
+from app import create_app, db
+from app import hunt_stats
+from app.exporter import export_table
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from config import Config
+from sqlalchemy.orm import Session
+import math
+import random
+import sys
+import time
+
+# Compara as estatísticas incrementais (app/hunt_stats.py) com o cálculo
+# antigo, que percorria todos os bónus, depois de sequências aleatórias de
+# alterações. O resultado tem de ser idêntico, valor a valor e tipo a tipo,
+# incluindo os floats das somas. Confirma também que a cache dos HuntStats
+# não passa de HUNT_STATS_CACHE_SIZE hunts, que exportar os hunts não a
+# altera e que duas sessões a editar o mesmo hunt ao mesmo tempo não falham
+# nem repetem uma revisão. Corre numa base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+SEQUENCES = 100
+STEPS = 60
+BENCH_SIZES = [500, 2000]
+BENCH_UPDATES = 200
+
+def legacy_stats(self):
+    # BonusHunt.calcular_estatisticas original, sem alterações
+    total_ganho = sum(b.payout for b in self.bonuses if b.payout is not None)
+    total_apostas = sum(b.aposta for b in self.bonuses)
+    num_bonus = len(self.bonuses)
+    num_bonus_abertos = sum(1 for b in self.bonuses if b.payout is not None)
+    
+    saldo_restante = self.custo_inicial - total_apostas
+    for bonus in self.bonuses:
+        if bonus.saldo_restante is not None:
+            saldo_restante = bonus.saldo_restante
+    
+    investimento = self.custo_inicial - saldo_restante
+    media_aposta_inicial = total_apostas / num_bonus if num_bonus > 0 else 0
+    break_even_x_inicial = int(investimento / media_aposta_inicial) if media_aposta_inicial > 0 else float('inf')
+    break_even_euro_inicial = int(investimento / num_bonus) if num_bonus > 0 else investimento
+
+    bonuses_nao_abertos = [b for b in self.bonuses if b.payout is None]
+    total_apostas_nao_abertas = sum(b.aposta for b in bonuses_nao_abertos)
+    num_bonus_nao_abertos = len(bonuses_nao_abertos)
+
+    media_aposta = total_apostas_nao_abertas / num_bonus_nao_abertos if num_bonus_nao_abertos > 0 else 0
+    valor_restante = investimento - total_ganho
+    break_even_x = int(valor_restante / media_aposta) if total_apostas_nao_abertas > 0 else math.inf
+    break_even_euro = int(valor_restante / num_bonus_nao_abertos) if num_bonus_nao_abertos > 0 else 0
+
+    bonuses_abertos = [b for b in self.bonuses if b.payout is not None]
+    avg_x = int(sum(b.multiplicador for b in bonuses_abertos) / len(bonuses_abertos)) if bonuses_abertos else 0
+    avg_euro = int(sum(b.payout for b in bonuses_abertos) / len(bonuses_abertos)) if bonuses_abertos else 0
+
+    best_x = max(bonuses_abertos, key=lambda b: b.multiplicador) if bonuses_abertos else None
+    best_euro = max(bonuses_abertos, key=lambda b: b.payout) if bonuses_abertos else None
+    worst_x = min(bonuses_abertos, key=lambda b: b.multiplicador) if bonuses_abertos else None
+    worst_euro = min(bonuses_abertos, key=lambda b: b.payout) if bonuses_abertos else None
+
+    return {
+        'custo_inicial': self.custo_inicial,
+        'saldo_restante': saldo_restante,
+        'investimento': investimento,
+        'total_ganho': total_ganho,
+        'lucro_prejuizo': total_ganho - investimento,
+        'num_bonus': num_bonus,
+        'num_bonus_abertos': num_bonus_abertos,
+        'num_bonus_nao_abertos': num_bonus - num_bonus_abertos,
+        'media_aposta_inicial': media_aposta_inicial,
+        'media_aposta': media_aposta,
+        'break_even_x_inicial': break_even_x_inicial,
+        'break_even_euro_inicial': break_even_euro_inicial,
+        'break_even_x': break_even_x,
+        'break_even_euro': break_even_euro,
+        'avg_x': avg_x,
+        'avg_euro': avg_euro,
+        'best_bonus_x': best_x.to_dict() if best_x else None,
+        'best_bonus_euro': best_euro.to_dict() if best_euro else None,
+        'worst_bonus_x': worst_x.to_dict() if worst_x else None,
+        'worst_bonus_euro': worst_euro.to_dict() if worst_euro else None,
+    }
+
+def compare(expected, actual):
+    """Chaves com valor ou tipo diferente."""
+    assert list(expected) == list(actual), (list(expected), list(actual))
+    return [key for key in expected
+            if expected[key] != actual[key] or type(expected[key]) is not type(actual[key])]
+
+def random_money(rng):
+    return rng.choice([0.1, 0.2, 0.4, 0.5, 1.0, 2.0, 2.5, 4.0, round(rng.uniform(0.1, 20), 2)])
+
+def random_step(rng, hunt, slot):
+    bonuses = list(hunt.bonuses)
+    action = rng.choice(['add', 'add', 'payout', 'payout', 'payout', 'update', 'delete', 'reset', 'custo'])
+    if action == 'add' or not bonuses:
+        db.session.add(Bonus(hunt=hunt, slot=slot, aposta=random_money(rng),
+                             saldo_restante=rng.choice([None, None, round(rng.uniform(0, hunt.custo_inicial), 2)])))
+    elif action == 'payout':
+        bonus = rng.choice(bonuses)
+        bonus.payout = rng.choice([None, 0.0, round(rng.uniform(0, 500), 2), bonus.aposta * rng.randint(1, 50)])
+    elif action == 'update':
+        bonus = rng.choice(bonuses)
+        bonus.aposta = random_money(rng)
+        bonus.saldo_restante = rng.choice([None, round(rng.uniform(0, hunt.custo_inicial), 2)])
+    elif action == 'delete':
+        db.session.delete(rng.choice(bonuses))
+    elif action == 'reset':
+        # UPDATE em bloco, fora do flush: só a revisão invalida o HuntStats
+        hunt.reset_payouts()
+    else:
+        hunt.custo_inicial = rng.choice([100.0, 500.0, 1000.0, 2500.5])
+
+    if rng.random() < 0.1:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    if rng.random() < 0.2:
+        # Novo pedido: sessão nova, os agregados em cache têm de continuar certos
+        db.session.remove()
+
+def check_sequences(seed):
+    rng = random.Random(seed)
+    failures, checks = 0, 0
+    for sequence in range(SEQUENCES):
+        hunt = BonusHunt(nome=f'Hunt {sequence}', custo_inicial=1000.0)
+        db.session.add(hunt)
+        db.session.commit()
+        hunt_id = hunt.id
+        for step in range(STEPS):
+            hunt = db.session.get(BonusHunt, hunt_id)
+            random_step(rng, hunt, db.session.get(Slot, 1))
+            hunt = db.session.get(BonusHunt, hunt_id)
+            actual = hunt.calcular_estatisticas()
+            db.session.expire(hunt, ['bonuses'])
+            expected = legacy_stats(hunt)
+            checks += 1
+            different = compare(expected, actual)
+            if different:
+                failures += 1
+                print(f"sequence {sequence} step {step}:")
+                for key in different:
+                    print(f"  {key}: expected {expected[key]!r}, got {actual[key]!r}")
+    print(f"{checks} checks: {checks - failures} identical to the original calcular_estatisticas, {failures} different")
+    return failures == 0
+
+def check_cache():
+    maxsize = app.config['HUNT_STATS_CACHE_SIZE']
+    hunt_ids = [hunt.id for hunt in BonusHunt.query.order_by(BonusHunt.id)]
+    hunt_stats.invalidate_stats()
+    for hunt_id in hunt_ids:
+        db.session.get(BonusHunt, hunt_id).calcular_estatisticas(serializar_bonus=False)
+    cached = list(hunt_stats._engines)
+    bounded = cached == hunt_ids[-maxsize:]
+    print(f"{len(hunt_ids)} hunts, {len(cached)} in the cache (max {maxsize}), most recently used kept: {bounded}")
+    # Um hunt usado de novo passa para o fim e não é o próximo a sair
+    db.session.get(BonusHunt, cached[0]).calcular_estatisticas(serializar_bonus=False)
+    reused = list(hunt_stats._engines)[-1] == cached[0]
+    print(f"reused hunt moved to the end: {reused}")
+
+    before = list(hunt_stats._engines)
+    rows = ''.join(export_table('bonus_hunts', 'ndjson')).count('\n')
+    untouched = list(hunt_stats._engines) == before
+    print(f"export of {rows} hunts left the cache unchanged: {untouched}")
+    return bounded and reused and untouched
+
+def check_concurrent_edits():
+    slot = db.session.get(Slot, 1)
+    hunt = BonusHunt(nome='Concurrent', custo_inicial=100.0)
+    db.session.add_all([hunt, Bonus(hunt=hunt, slot=slot, aposta=1.0), Bonus(hunt=hunt, slot=slot, aposta=2.0)])
+    db.session.commit()
+    hunt.calcular_estatisticas(serializar_bonus=False)
+    revisao = hunt.revisao
+    first, second = hunt.bonuses
+
+    # Outro pedido altera o hunt depois de este já o ter lido
+    with Session(db.engine) as other:
+        other.get(Bonus, first.id).payout = 10.0
+        other.commit()
+    second.payout = 30.0
+    try:
+        db.session.commit()
+    except Exception as error:
+        db.session.rollback()
+        print(f"concurrent edit failed: {error!r}")
+        return False
+    db.session.expire_all()
+    hunt = db.session.get(BonusHunt, hunt.id)
+    actual = hunt.calcular_estatisticas()
+    db.session.expire(hunt, ['bonuses'])
+    different = compare(legacy_stats(hunt), actual)
+    good = hunt.revisao == revisao + 2 and not different and actual['num_bonus_abertos'] == 2
+    print(f"concurrent edits: revision {revisao} -> {hunt.revisao}, statistics identical: {not different}")
+    return good
+
+def benchmark():
+    rng = random.Random(1)
+    slot = db.session.get(Slot, 1)
+    print(f"{'bonuses':>8}{'legacy ms':>12}{'incremental ms':>16}")
+    for size in BENCH_SIZES:
+        hunt = BonusHunt(nome=f'Bench {size}', custo_inicial=10000.0)
+        db.session.add(hunt)
+        db.session.add_all(Bonus(hunt=hunt, slot=slot, aposta=random_money(rng)) for _ in range(size))
+        db.session.commit()
+        bonuses = list(hunt.bonuses)
+        hunt.calcular_estatisticas()
+
+        legacy, incremental = 0.0, 0.0
+        for _ in range(BENCH_UPDATES):
+            # Como em update_payout: altera um bónus, commit e estatísticas
+            rng.choice(bonuses).payout = round(rng.uniform(0, 500), 2)
+            db.session.commit()
+            hunt.custo_inicial  # recarrega o hunt expirado pelo commit fora da medição
+            start = time.perf_counter()
+            hunt.calcular_estatisticas()
+            incremental += time.perf_counter() - start
+            list(hunt.bonuses)  # o legacy usa os bónus já carregados
+            start = time.perf_counter()
+            legacy_stats(hunt)
+            legacy += time.perf_counter() - start
+        print(f"{size:>8}{legacy / BENCH_UPDATES * 1000:>12.3f}{incremental / BENCH_UPDATES * 1000:>16.3f}")
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        db.session.add(Slot(name='Check', provider='Check'))
+        db.session.commit()
+        # to_dict() dos melhores/piores bónus precisa de um pedido (URLs das imagens)
+        with app.test_request_context():
+            ok = check_sequences(seed=int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+            ok = check_cache() and ok
+            ok = check_concurrent_edits() and ok
+            benchmark()
+    sys.exit(0 if ok else 1)
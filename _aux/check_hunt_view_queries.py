@@ -0,0 +1,105 @@
+from app import create_app, db
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from app.hunt_events import HuntBroadcaster
+from config import Config
+from sqlalchemy import event
+import random
+import sys
+
+# Confirma que abrir um hunt, pedir o seu estado completo e as alterações de
+# bónus (com o delta devolvido), incluindo os payouts em lote, e o reset,
+# a ativação, o fecho e o apagar de um hunt fazem o mesmo número de queries seja qual for
+# o número de bónus do hunt. Corre numa base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+BONUS_COUNTS = [10, 100, 300]
+
+def add_hunt(size, rng):
+    slots = Slot.query.all()
+    hunt = BonusHunt(nome=f'Hunt {size}', custo_inicial=1000.0)
+    db.session.add(hunt)
+    for _ in range(size):
+        db.session.add(Bonus(hunt=hunt, slot=rng.choice(slots), aposta=rng.choice([0.5, 1.0, 2.0, 4.0]),
+                             payout=rng.choice([None, round(rng.uniform(0, 300), 2)])))
+    db.session.commit()
+    return hunt.id, [bonus.id for bonus in hunt.bonuses]
+
+def count_queries(request):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        request()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        db.session.remove()
+    return len(statements)
+
+def check_response(response):
+    assert response.status_code == 200, response.status_code
+    if response.is_json:
+        assert response.json.get('success', True), response.json
+
+def check_not_modified(client, url):
+    # GET + revalidação com o ETag recebido
+    etag = client.get(url).headers['ETag']
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304, response.status_code
+
+def requests_for(client, hunt_id, bonus_ids, other_id):
+    xhr = {'X-Requested-With': 'XMLHttpRequest'}
+    return {
+        'view': lambda: check_response(client.get(f'/bonus-hunts/{hunt_id}')),
+        'data': lambda: check_response(client.get(f'/bonus-hunts/{hunt_id}/data')),
+        'activate_bonus': lambda: check_response(client.post(f'/bonus-hunts/activate_bonus/{bonus_ids[0]}')),
+        'update_payout': lambda: check_response(client.post(f'/bonus-hunts/update_payout/{bonus_ids[0]}', json={'payout': '12.5'})),
+        'update_bonus': lambda: check_response(client.post(f'/bonus-hunts/update_bonus/{bonus_ids[1]}', data={
+            'aposta': '2', 'saldo_restante': '', 'payout': '30', 'nota': '', 'padrinho': ''})),
+        'delete_bonus': lambda: check_response(client.post(f'/bonus-hunts/delete_bonus/{bonus_ids[-1]}')),
+        # Lote com metade dos bónus do hunt: as queries também não crescem com o lote
+        'payouts': lambda: check_response(client.post(f'/bonus-hunts/{hunt_id}/payouts', json={'bonuses': [
+            {'bonus_id': bonus_id, 'payout': i * 1.5} for i, bonus_id in enumerate(bonus_ids[2:len(bonus_ids) // 2])]})),
+        'stream_state': lambda: HuntBroadcaster(app)._read_active(),
+        # UPDATE/DELETE em bloco, sem carregar os bónus
+        'reset': lambda: check_response(client.post(f'/bonus-hunts/{other_id}/reset', headers=xhr)),
+        'activate_hunt': lambda: check_response(client.post(f'/bonus-hunts/{other_id}/activate', headers=xhr)),
+        'reactivate_hunt': lambda: check_response(client.post(f'/bonus-hunts/{hunt_id}/activate', headers=xhr)),
+        # Hunt fechado: servido do snapshot, com ETag
+        'close_hunt': lambda: check_response(client.post(f'/bonus-hunts/{other_id}/close', headers=xhr)),
+        'closed_view': lambda: check_response(client.get(f'/bonus-hunts/{other_id}')),
+        'closed_data': lambda: check_response(client.get(f'/bonus-hunts/{other_id}/data')),
+        'closed_304': lambda: check_not_modified(client, f'/bonus-hunts/{other_id}'),
+        'reopen_hunt': lambda: check_response(client.post(f'/bonus-hunts/{other_id}/reopen', headers=xhr)),
+        'delete_hunt': lambda: check_response(client.post(f'/bonus-hunts/{other_id}/delete', headers=xhr)),
+    }
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Slot(name=f'Check {i}', provider='Check', image=f'images/check{i}.png') for i in range(20))
+        db.session.commit()
+        client = app.test_client()
+        results = {}
+        for size in BONUS_COUNTS:
+            hunt_id, bonus_ids = add_hunt(size, rng)
+            other_id, _ = add_hunt(size, rng)
+            db.session.get(BonusHunt, hunt_id).set_active()
+            db.session.commit()
+            db.session.remove()
+            for name, request in requests_for(client, hunt_id, bonus_ids, other_id).items():
+                results.setdefault(name, []).append(count_queries(request))
+
+        print(f"{'request':<16}" + ''.join(f"{f'{size} bonuses':>14}" for size in BONUS_COUNTS))
+        ok = True
+        for name, counts in results.items():
+            constant = len(set(counts)) == 1
+            ok = ok and constant
+            print(f"{name:<16}" + ''.join(f"{count:>14}" for count in counts) + ('' if constant else '  <- grows'))
+    sys.exit(0 if ok else 1)
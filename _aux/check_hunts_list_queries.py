@@ -0,0 +1,88 @@
+from app import create_app, db
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from config import Config
+from sqlalchemy import event
+import math
+import random
+import sys
+
+# Confirma que a listagem de hunts faz o mesmo número de queries seja qual
+# for o número de hunts, e que os totais da query agregada batem com
+# calcular_estatisticas() (também para os hunts fechados, que vêm do
+# snapshot). Corre numa base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+HUNT_COUNTS = [1, 10, 100, 500]
+# count, página, totais dos hunts abertos e snapshots dos fechados
+MAX_QUERIES = 4
+KEYS = ['investimento', 'total_ganho', 'num_bonus', 'num_bonus_abertos']
+
+def add_hunts(count, rng):
+    slot = db.session.get(Slot, 1)
+    for _ in range(count):
+        hunt = BonusHunt(nome=f'Hunt {rng.random():.6f}', custo_inicial=rng.choice([500.0, 1000.0]))
+        db.session.add(hunt)
+        for _ in range(rng.randint(0, 30)):
+            db.session.add(Bonus(hunt=hunt, slot=slot, aposta=rng.choice([0.5, 1.0, 2.0, 4.0]),
+                                 payout=rng.choice([None, round(rng.uniform(0, 300), 2)]),
+                                 saldo_restante=rng.choice([None, None, round(rng.uniform(0, 500), 2)])))
+    db.session.commit()
+
+def close_some(client, rng):
+    # Os totais dos hunts fechados vêm do snapshot
+    for hunt in BonusHunt.query.filter(BonusHunt.fechado_em.is_(None)).all():
+        if rng.random() < 0.3:
+            response = client.post(f'/bonus-hunts/{hunt.id}/close', headers={'X-Requested-With': 'XMLHttpRequest'})
+            assert response.json['success'], response.json
+
+def count_queries(client, url):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+def check_totals():
+    mismatches = 0
+    hunts = BonusHunt.query.all()
+    resumos = BonusHunt.calcular_resumos(hunts)
+    for hunt in hunts:
+        # Mesmo os fechados são recalculados aqui, para comparar com o snapshot
+        expected = hunt.calcular_estatisticas(serializar_bonus=False)
+        for key in KEYS:
+            if not math.isclose(expected[key], resumos[hunt.id][key], rel_tol=1e-9, abs_tol=1e-9):
+                mismatches += 1
+                print(f"hunt {hunt.id} {key}: expected {expected[key]!r}, got {resumos[hunt.id][key]!r}")
+    print(f"totals checked for {len(hunts)} hunts: {mismatches} mismatches")
+    return mismatches == 0
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Slot(name='Check', provider='Check'))
+        db.session.commit()
+        client = app.test_client()
+        counts = []
+        total = 0
+        for hunts in HUNT_COUNTS:
+            add_hunts(hunts - total, rng)
+            close_some(client, rng)
+            total = hunts
+            queries = count_queries(client, '/bonus-hunts/')
+            last_page = count_queries(client, f'/bonus-hunts/?page={math.ceil(hunts / 20)}')
+            counts.append(queries)
+            print(f"{hunts:>5} hunts: {queries} queries (last page: {last_page})")
+        ok = max(counts) <= MAX_QUERIES
+        ok = check_totals() and ok
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,159 @@
+from app import create_app, db
+from app.image_fetcher import fetch_with_retries, queue_image_download
+from app.images import thumbnail_for
+from app.models.slot import Slot
+from config import Config
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Confirma o download de imagens (app/image_fetcher.py) contra um servidor
+# HTTP local que faz de CDN: imagens acima do limite são recusadas, com ou
+# sem Content-Length, sem nova tentativa; erros 5xx e ligações cortadas são
+# repetidos com backoff exponencial e os 4xx não; respostas que não são
+# imagens (text/html) são recusadas. No fim, um download agendado grava a
+# imagem na store, atualiza o slot e gera a miniatura. Corre numa base de
+# dados em memória e numa pasta static/ temporária.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    IMAGE_FETCH_MAX_BYTES = 64 * 1024
+    IMAGE_FETCH_RETRIES = 2
+    IMAGE_FETCH_BACKOFF = 0.1
+    IMAGE_FETCH_TIMEOUT = (2, 2)
+
+app = create_app(CheckConfig)
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), (200, 40, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+PNG = png_bytes()
+TOO_LARGE = CheckConfig.IMAGE_FETCH_MAX_BYTES + 1
+
+# Pedidos recebidos por caminho
+hits = {}
+hits_lock = threading.Lock()
+
+class StandInCDN(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, content_type, body, length=True):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if length:
+            self.send_header('Content-Length', str(len(body)))
+        else:
+            # Sem Content-Length: o corpo acaba quando a ligação fecha
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with hits_lock:
+            count = hits[self.path] = hits.get(self.path, 0) + 1
+        if self.path == '/image.png':
+            self.send(200, 'image/png', PNG)
+        elif self.path == '/octet-stream':
+            self.send(200, 'application/octet-stream', PNG)
+        elif self.path == '/large-declared.png':
+            self.send(200, 'image/png', b'\0' * TOO_LARGE)
+        elif self.path == '/large-undeclared.png':
+            self.protocol_version = 'HTTP/1.0'
+            self.send(200, 'image/png', b'\0' * TOO_LARGE, length=False)
+        elif self.path == '/flaky.png':
+            # Falha nas duas primeiras tentativas
+            if count <= 2:
+                self.send(503, 'text/plain', b'try again')
+            else:
+                self.send(200, 'image/png', PNG)
+        elif self.path == '/reset.png':
+            # Fecha a ligação sem responder
+            self.close_connection = True
+        elif self.path == '/down.png':
+            self.send(500, 'text/plain', b'error')
+        elif self.path == '/login.html':
+            self.send(200, 'text/html; charset=utf-8', b'<html><body>Sign in</body></html>')
+        elif self.path == '/text.png':
+            self.send(200, 'text/plain', PNG)
+        else:
+            self.send(404, 'text/plain', b'not found')
+
+# (caminho, deve descarregar, pedidos esperados, espera mínima em segundos)
+BACKOFF = CheckConfig.IMAGE_FETCH_BACKOFF
+ATTEMPTS = CheckConfig.IMAGE_FETCH_RETRIES + 1
+CASES = [
+    ('/image.png', True, 1, 0),
+    ('/octet-stream', True, 1, 0),
+    ('/large-declared.png', False, 1, 0),
+    ('/large-undeclared.png', False, 1, 0),
+    ('/flaky.png', True, 3, BACKOFF * (1 + 2)),
+    ('/reset.png', False, ATTEMPTS, BACKOFF * (2 ** (ATTEMPTS - 1) - 1)),
+    ('/down.png', False, ATTEMPTS, BACKOFF * (2 ** (ATTEMPTS - 1) - 1)),
+    ('/missing.png', False, 1, 0),
+    ('/login.html', False, 1, 0),
+    ('/text.png', False, 1, 0),
+]
+
+def check_fetches(base_url, folder):
+    ok = True
+    print(f"{'path':<24}{'result':>10}{'requests':>10}{'seconds':>9}")
+    for path, expected, expected_hits, min_wait in CASES:
+        target = os.path.join(folder, 'download')
+        start = time.perf_counter()
+        downloaded = fetch_with_retries(base_url + path, target)
+        elapsed = time.perf_counter() - start
+        if downloaded:
+            with open(target, 'rb') as f:
+                downloaded = f.read() == PNG
+        if os.path.exists(target):
+            os.remove(target)
+        good = downloaded == expected and hits.get(path) == expected_hits and elapsed >= min_wait
+        # Sem backoff a mais: cada espera é BACKOFF * 2 ** tentativa
+        good = good and elapsed < min_wait + 1
+        print(f"{path:<24}{'ok' if downloaded else 'refused':>10}{hits.get(path, 0):>10}{elapsed:>9.2f}  {'OK' if good else 'FAIL'}")
+        ok = ok and good
+    return ok
+
+def check_queued(base_url):
+    slot = Slot(name='Fetched Slot', provider='Provider')
+    db.session.add(slot)
+    db.session.commit()
+    image = queue_image_download(slot.id, base_url + '/image.png', 'png').result(timeout=30)
+    db.session.expire_all()
+    stored = image is not None and db.session.get(Slot, slot.id).image == image
+    stored = stored and os.path.isfile(os.path.join(app.static_folder, image))
+    print(f"queued download: Slot.image = {image}, file in the store: {stored}")
+    # A miniatura é gerada noutro processo, depois do download
+    thumbnail = os.path.join(app.static_folder, thumbnail_for(image)) if image else None
+    deadline = time.monotonic() + 30
+    while thumbnail and not os.path.isfile(thumbnail) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    print(f"thumbnail generated: {bool(thumbnail) and os.path.isfile(thumbnail)}")
+    return stored and os.path.isfile(thumbnail)
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInCDN)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    folder = tempfile.mkdtemp()
+    original_static_folder = app.static_folder
+    try:
+        app.static_folder = folder
+        with app.app_context():
+            db.create_all()
+            ok = check_fetches(base_url, folder)
+            ok = check_queued(base_url) and ok
+    finally:
+        app.static_folder = original_static_folder
+        server.shutdown()
+        shutil.rmtree(folder)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,101 @@
+from app import create_app, db
+from app.models.slot import Slot
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.pagination import KeysetPage, encode_cursor
+from app.search import search_slots_ranked
+from sqlalchemy import event
+import sys
+
+app = create_app()
+
+# Verifica com EXPLAIN QUERY PLAN que as queries mais frequentes usam um
+# índice e que as páginas seguintes da lista de slots (cursor) fazem SEARCH no
+# índice, sem B-tree temporária, tanto a partir de um valor como dentro do
+# bloco dos NULLs. Correr depois de `flask db upgrade`.
+
+SORTS = ['name', 'provider', 'rtp', 'volatility', 'potential', 'best_x', 'best_euro', 'creation_date']
+COLLATIONS = {'name': 'NOCASE', 'provider': 'NOCASE'}
+
+def capture(fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'sqlite_master' not in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+def uses_index(plan):
+    # Cada acesso a uma tabela tem de passar por um índice: secundário, a
+    # chave primária (rowid) ou o índice do FTS5. As subqueries (CO-ROUTINE)
+    # são resultados intermédios, não tabelas.
+    subqueries = {step.split(' ', 1)[1] for step in plan if step.startswith('CO-ROUTINE')}
+    scans = [step for step in plan if step.startswith(('SCAN', 'SEARCH')) and step.split(' ')[1] not in subqueries]
+    return bool(scans) and all('INDEX' in step or 'PRIMARY KEY' in step for step in scans)
+
+def seeks_index(plan):
+    # Página seguinte: o cursor posiciona-se no índice (SEARCH) e a ordem
+    # vem dele, sem ordenar à parte
+    scans = [step for step in plan if step.startswith(('SCAN', 'SEARCH'))]
+    return (bool(scans) and all(step.startswith('SEARCH') for step in scans)
+            and not any('TEMP B-TREE' in step for step in plan) and uses_index(plan))
+
+def slot_list_query():
+    # Como em list_slots: o histórico do slot (slot_stats) vem em LEFT JOIN
+    return Slot.query.outerjoin(Slot.stats)
+
+def hot_queries():
+    first_slot = Slot.query.order_by(Slot.id).first()
+    first_hunt = BonusHunt.query.order_by(BonusHunt.id).first()
+
+    for sort in SORTS:
+        for descending in (False, True):
+            label = f"list_slots sort={sort} {'desc' if descending else 'asc'}"
+            yield label, lambda sort=sort, descending=descending: KeysetPage(
+                slot_list_query(), getattr(Slot, sort), Slot.id, descending, 50, collation=COLLATIONS.get(sort))
+            column = getattr(Slot, sort)
+            values, nulls = Slot.query.filter(column.isnot(None)), Slot.query.filter(column.is_(None))
+            middle = values.order_by(column, Slot.id).offset(values.count() // 2).first()
+            null = nulls.order_by(Slot.id).offset(nulls.count() // 2).first()
+            cursors = {'cursor': middle and encode_cursor(getattr(middle, sort), middle.id),
+                       'cursor in NULLs': null and encode_cursor(None, null.id)}
+            for name, cursor in cursors.items():
+                if cursor:
+                    yield f'{label} ({name})', lambda sort=sort, descending=descending, cursor=cursor: KeysetPage(
+                        slot_list_query(), getattr(Slot, sort), Slot.id, descending, 50, cursor=cursor, collation=COLLATIONS.get(sort))
+
+    yield 'search_slots q=book', lambda: search_slots_ranked('book')
+    yield 'list_hunts', lambda: BonusHunt.query.order_by(BonusHunt.data_criacao.desc()).all()
+    yield 'active hunt', lambda: BonusHunt.query.filter_by(is_active=True).first()
+    if first_hunt:
+        yield 'hunt.bonuses', lambda: Bonus.query.filter_by(hunt_id=first_hunt.id).all()
+    if first_slot and first_slot.provider_id:
+        yield 'list_slots provider_id', lambda: KeysetPage(
+            slot_list_query().filter(Slot.provider_id == first_slot.provider_id), Slot.id, Slot.id, False, 50)
+    if first_slot:
+        yield 'bonuses by slot', lambda: Bonus.query.filter_by(slot_id=first_slot.id).all()
+
+def check_query_plans():
+    failures = 0
+    with app.app_context():
+        for label, fn in hot_queries():
+            for statement, parameters in capture(fn):
+                plan = query_plan(statement, parameters)
+                ok = seeks_index(plan) if '(cursor' in label else uses_index(plan)
+                failures += not ok
+                print(f"{'OK  ' if ok else 'FAIL'} {label}: {' | '.join(plan)}")
+            db.session.expunge_all()
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_query_plans() else 0)
@@ -0,0 +1,61 @@
+from app import create_app, db
+from app.exporter import export_table
+from app.importer import detect_format, import_file
+from app.models.slot import Slot
+from app.providers import rebuild_providers
+from app.utils import clean_rtp
+from config import Config
+import io
+import sys
+
+# Confirma que exportar o catálogo (CSV e NDJSON) e voltar a importar o mesmo
+# ficheiro não muda nenhum valor (rtp, volatility, potential, best_x,
+# best_euro), e que o RTP importado como percentagem ("96.5%", "96,48") é
+# dividido por 100 sem arredondar, enquanto uma fração (0.97) fica como está.
+# Corre numa base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+COLUMNS = ['name', 'provider', 'rtp', 'volatility', 'potential', 'best_x', 'best_euro']
+SLOTS = [
+    Slot(name='Fraction', provider='Provider A', rtp=0.97, volatility=5, potential=2500.5, best_x=1234.5, best_euro=5000),
+    Slot(name='Precise', provider='Provider A', rtp=0.9648, volatility=10, potential=12.125, best_x=0.4, best_euro=12),
+    Slot(name='Whole', provider='Provider B', rtp=1.0, volatility=1, potential=10000.0, best_x=100.0, best_euro=1),
+    Slot(name='Empty', provider='Provider B'),
+]
+RTP_INPUTS = [('96.5%', 0.965), ('96,48', 0.9648), ('0.97', 0.97), (0.9648, 0.9648), (96.48, 0.9648), ('-', None), ('', None)]
+
+def snapshot():
+    db.session.expire_all()
+    return {slot.id: tuple(getattr(slot, column) for column in COLUMNS) for slot in Slot.query.order_by(Slot.id)}
+
+def round_trip(format):
+    before = snapshot()
+    data = ''.join(export_table('slots', format))
+    stats = import_file(io.StringIO(data), detect_format(f'slots.{format}'))
+    after = snapshot()
+    changed = [(before[id], after.get(id)) for id in before if after.get(id) != before[id]]
+    print(f"{format}: {stats.updated} updated, {stats.inserted} inserted, {len(changed)} changed")
+    for old, new in changed:
+        print(f"  {old} -> {new}")
+    return not changed and stats.inserted == 0 and len(after) == len(before)
+
+if __name__ == "__main__":
+    ok = True
+    with app.app_context():
+        db.create_all()
+        rebuild_providers()
+        db.session.add_all(SLOTS)
+        db.session.commit()
+        for format in ('csv', 'ndjson'):
+            ok = round_trip(format) and ok
+            ok = round_trip(format) and ok
+        for value, expected in RTP_INPUTS:
+            cleaned = clean_rtp(value)
+            good = cleaned == expected or (expected is not None and cleaned is not None and abs(cleaned - expected) < 1e-12)
+            print(f"clean_rtp({value!r}) = {cleaned}  {'OK' if good else 'FAIL'}")
+            ok = ok and good
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,144 @@
+from app import create_app, db
+from app.assets import build_assets
+from app.catalog import catalog_version, get_page_cache, install_catalog_version
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot
+from app.providers import rebuild_providers
+from app.slot_stats import rebuild_slot_stats
+from config import Config
+from sqlalchemy import event, text
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Confirma a cache da lista de slots por versão do catálogo (app/catalog.py):
+# um pedido repetido é servido da cache com uma só query (a da versão) e um
+# If-None-Match com a ETag atual dá 304; criar, editar, apagar e importar
+# slots, um UPDATE feito "noutro processo" (SQL direto) e um payout (histórico
+# do slot) mudam a versão e a página; um `flask assets build` muda a ETag e
+# a página (os bundles anteriores são apagados) sem mudar a versão do
+# catálogo. Confirma também o limite da LRU e mede
+# o tempo de uma página renderizada contra uma servida da cache. Corre numa
+# base de dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SLOT_LIST_CACHE_SIZE = 8
+
+app = create_app(CheckConfig)
+
+SLOTS = 3000
+REPEAT = 20
+URL = '/slots/?sort=rtp&order=desc'
+
+def make_catalog(rng):
+    db.session.add_all(Slot(name=f'Slot {i}', provider=f'Provider {i % 40}', rtp=rng.uniform(0.9, 0.98),
+                            volatility=rng.randint(1, 10), potential=rng.choice([500, 2500.5, 10000]),
+                            best_x=rng.uniform(10, 5000), best_euro=rng.randint(10, 50000)) for i in range(SLOTS))
+    db.session.commit()
+
+def count_queries(client, url, headers=None):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        db.session.remove()
+    return response, len(statements)
+
+def timed(client, url):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        client.get(url)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def changes(client, bonus_id):
+    # (nome, alteração, texto que a página passa a ter / deixa de ter)
+    form = {'name': 'Cached Slot', 'provider': 'Provider 1', 'rtp': '99.9', 'volatility': '5', 'potential': '', 'best_x': '', 'best_euro': ''}
+    new_slot = lambda: Slot.query.filter_by(name='Cached Slot').one().id
+    csv_file = lambda: (io.BytesIO(b'name,provider,rtp\nImported Slot,Provider 2,99.8%\n'), 'slots.csv')
+    def other_process():
+        db.session.execute(text("UPDATE slots SET rtp = 0.9999 WHERE id = 1"))
+        db.session.commit()
+    return [
+        ('create', lambda: client.post('/slots/', data=form), 'Cached Slot', None),
+        ('edit', lambda: client.post(f'/slots/{new_slot()}', data={**form, 'rtp': '99.95'}), '99,95%', None),
+        ('delete', lambda: client.post(f'/slots/{new_slot()}/delete'), None, 'Cached Slot'),
+        ('import', lambda: client.post('/slots/import', data={'file': csv_file()}), 'Imported Slot', None),
+        ('other process', other_process, '99,99%', None),
+        ('payout', lambda: client.post(f'/bonus-hunts/update_payout/{bonus_id}', json={'payout': '250'}), '250,00x', None),
+    ]
+
+if __name__ == "__main__":
+    ok = True
+    with app.app_context():
+        db.create_all()
+        rebuild_slot_stats()
+        rebuild_providers()
+        install_catalog_version()
+        make_catalog(random.Random(0))
+        hunt = BonusHunt(nome='Cache', custo_inicial=100.0)
+        db.session.add(hunt)
+        # Slot 1 passa para o topo da lista por RTP com o UPDATE "de outro processo"
+        bonus = Bonus(hunt=hunt, slot_id=1, aposta=1.0)
+        db.session.add(bonus)
+        db.session.commit()
+        bonus_id = bonus.id
+        client = app.test_client()
+
+        first, rendered_queries = count_queries(client, URL)
+        second, cached_queries = count_queries(client, URL)
+        print(f"{URL}: rendered with {rendered_queries} queries, then served from cache with {cached_queries}")
+        ok = ok and cached_queries == 1 and first.data == second.data and first.headers['ETag'] == second.headers['ETag']
+
+        revalidated, revalidated_queries = count_queries(client, URL, {'If-None-Match': first.headers['ETag']})
+        print(f"If-None-Match with the current ETag: {revalidated.status_code} ({revalidated_queries} queries)")
+        ok = ok and revalidated.status_code == 304 and revalidated_queries == 1
+
+        for name, change, shown, gone in changes(client, bonus_id):
+            before = client.get(URL)
+            version = catalog_version()
+            change()
+            db.session.remove()
+            after = client.get(URL, headers={'If-None-Match': before.headers['ETag']})
+            html = after.get_data(as_text=True)
+            updated = (shown is None or shown in html) and (gone is None or gone not in html)
+            print(f"  {name:>13}: version {version} -> {catalog_version()}, revalidation {after.status_code}, page updated: {updated}")
+            ok = ok and catalog_version() > version and after.status_code == 200 and updated
+
+        # Build dos JS/CSS numa cópia dos estáticos
+        static_folder, original_static_folder = tempfile.mkdtemp(), app.static_folder
+        try:
+            for folder in ('js', 'css'):
+                shutil.copytree(os.path.join(app.static_folder, folder), os.path.join(static_folder, folder))
+            app.static_folder = static_folder
+            before = client.get(URL)
+            manifest = build_assets(static_folder)
+            after = client.get(URL, headers={'If-None-Match': before.headers['ETag']})
+            updated = f"/static/{manifest['js/app.js']}" in after.get_data(as_text=True)
+            print(f"  assets build: ETag {before.headers['ETag']} -> {after.headers['ETag']}, revalidation {after.status_code}, page updated: {updated}")
+            ok = ok and after.status_code == 200 and updated and after.headers['ETag'] != before.headers['ETag']
+        finally:
+            app.static_folder = original_static_folder
+            shutil.rmtree(static_folder)
+
+        for page in range(1, 20):
+            client.get(f'/slots/?page={page}')
+        print(f"LRU after 19 distinct pages: {len(get_page_cache())} entries (limit {app.config['SLOT_LIST_CACHE_SIZE']})")
+        ok = ok and len(get_page_cache()) <= app.config['SLOT_LIST_CACHE_SIZE']
+
+        app.config['SLOT_LIST_CACHE_SIZE'] = 0
+        render_ms = timed(client, URL)
+        app.config['SLOT_LIST_CACHE_SIZE'] = 8
+        client.get(URL)
+        cached_ms = timed(client, URL)
+        print(f"{URL}: {render_ms:.1f} ms rendered, {cached_ms:.2f} ms from the cache ({render_ms / cached_ms:.0f}x)")
+        ok = ok and cached_ms < render_ms
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,167 @@
+from app import create_app, db
+from app.models.bonus_hunt import BonusHunt, Bonus
+from app.models.slot import Slot, SlotStats
+from app.slot_stats import rebuild_slot_stats
+from config import Config
+from sqlalchemy import event, select, text
+import math
+import random
+import sys
+import time
+
+# Compara o histórico por slot mantido pelos triggers (app/slot_stats.py) com
+# a agregação completa sobre bonuses, depois de sequências aleatórias de
+# alterações pelo ORM, pelo SQL em massa (reset/apagar hunt) e por rollbacks.
+# Mede também a listagem de slots ordenada pelo histórico. Corre numa base de
+# dados em memória.
+
+class CheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+app = create_app(CheckConfig)
+
+SLOTS = 40
+SEQUENCES = 30
+STEPS = 80
+BENCH_SLOTS = 3000
+BENCH_BONUSES = 30000
+BENCH_REQUESTS = 20
+
+FULL_AGGREGATE = text("""
+    SELECT b.slot_id, count(*), sum(b.aposta), sum(b.payout),
+           max(CASE WHEN b.aposta <> 0 THEN b.payout / b.aposta ELSE 0 END),
+           min(CASE WHEN b.aposta <> 0 THEN b.payout / b.aposta ELSE 0 END),
+           max(h.data_criacao)
+    FROM bonuses b LEFT JOIN bonus_hunts h ON h.id = b.hunt_id
+    WHERE b.payout IS NOT NULL
+    GROUP BY b.slot_id
+""")
+
+def expected_stats():
+    return {row[0]: row[1:] for row in db.session.execute(FULL_AGGREGATE)}
+
+def actual_stats():
+    rows = db.session.execute(select(
+        SlotStats.slot_id, SlotStats.times_played, SlotStats.total_bet, SlotStats.total_paid,
+        SlotStats.max_x, SlotStats.min_x, SlotStats.last_played, SlotStats.avg_x))
+    return {row[0]: row[1:] for row in rows}
+
+def same(expected, actual):
+    if set(expected) != set(actual):
+        return False
+    for slot_id, (played, bet, paid, max_x, min_x, last) in expected.items():
+        a_played, a_bet, a_paid, a_max, a_min, a_last, a_avg = actual[slot_id]
+        # As somas vão acumulando arredondamentos (+/- de floats)
+        close = lambda a, b: math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+        avg = paid / bet if bet else None
+        if (played, max_x, min_x) != (a_played, a_max, a_min) or not close(bet, a_bet) or not close(paid, a_paid):
+            return False
+        if (avg is None) != (a_avg is None) or (avg is not None and not close(avg, a_avg)):
+            return False
+        if str(last) != str(a_last).replace('T', ' '):
+            return False
+    return True
+
+def random_step(rng, slots):
+    hunts = BonusHunt.query.all()
+    bonuses = Bonus.query.all()
+    action = rng.choice(['add', 'add', 'add', 'payout', 'payout', 'payout', 'update', 'move', 'delete',
+                         'reset', 'drop_hunt', 'new_hunt'])
+    if action == 'new_hunt' or not hunts:
+        db.session.add(BonusHunt(nome='Hunt', custo_inicial=1000.0))
+    elif action == 'add' or not bonuses:
+        db.session.add(Bonus(hunt=rng.choice(hunts), slot=rng.choice(slots), aposta=rng.choice([0.0, 0.5, 1.0, 2.0, 4.0]),
+                             payout=rng.choice([None, 0.0, round(rng.uniform(0, 800), 2)])))
+    elif action == 'payout':
+        rng.choice(bonuses).payout = rng.choice([None, 0.0, round(rng.uniform(0, 800), 2)])
+    elif action == 'update':
+        bonus = rng.choice(bonuses)
+        bonus.aposta = rng.choice([0.5, 1.0, 2.0, 4.0])
+        bonus.nota = 'nota'
+    elif action == 'move':
+        rng.choice(bonuses).slot = rng.choice(slots)
+    elif action == 'delete':
+        db.session.delete(rng.choice(bonuses))
+    elif action == 'reset':
+        rng.choice(hunts).reset_payouts()
+    else:
+        # Os bónus vão pelo ON DELETE CASCADE
+        rng.choice(hunts).apagar()
+
+    if rng.random() < 0.1:
+        db.session.rollback()
+    else:
+        db.session.commit()
+
+def check_sequences(seed):
+    rng = random.Random(seed)
+    slots = Slot.query.all()
+    failures, checks = 0, 0
+    for sequence in range(SEQUENCES):
+        for step in range(STEPS):
+            random_step(rng, slots)
+            checks += 1
+            if not same(expected_stats(), actual_stats()):
+                failures += 1
+                print(f"sequence {sequence} step {step}: slot_stats differs from the full aggregate")
+        db.session.remove()
+    history = len(actual_stats())
+    print(f"{checks} checks: {checks - failures} match the full aggregate, {failures} different "
+          f"({history} slots with history at the end)")
+    return failures == 0 and history > 0
+
+def count_statements(fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+def benchmark():
+    rng = random.Random(1)
+    slots = [Slot(name=f'Bench {i}', provider=f'Provider {i % 50}') for i in range(BENCH_SLOTS)]
+    db.session.add_all(slots)
+    hunt = BonusHunt(nome='Bench', custo_inicial=100000.0)
+    db.session.add(hunt)
+    db.session.flush()
+    db.session.execute(Bonus.__table__.insert(), [
+        {'hunt_id': hunt.id, 'slot_id': rng.choice(slots).id, 'aposta': 1.0, 'payout': round(rng.uniform(0, 500), 2)}
+        for _ in range(BENCH_BONUSES)
+    ])
+    db.session.commit()
+
+    start = time.perf_counter()
+    rebuild_slot_stats()
+    print(f"rebuild: {BENCH_BONUSES} bonuses in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    client = app.test_client()
+    ok = True
+    print(f"{'sort':>14}{'ms/page':>10}{'queries':>9}  reads bonuses")
+    for sort in ('name', 'times_played', 'avg_x', 'max_x', 'last_played'):
+        for mode in ('', 'cursor'):
+            url = f'/slots/?sort={sort}&order=desc&mode={mode}'
+            statements = count_statements(lambda: client.get(url))
+            start = time.perf_counter()
+            for _ in range(BENCH_REQUESTS):
+                response = client.get(url)
+            elapsed = (time.perf_counter() - start) / BENCH_REQUESTS * 1000
+            reads_bonuses = any('bonuses' in statement for statement in statements)
+            print(f"{sort + (' (c)' if mode else ''):>14}{elapsed:>10.1f}{len(statements):>9}  {reads_bonuses}")
+            ok = ok and response.status_code == 200 and not reads_bonuses
+    return ok
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        rebuild_slot_stats()
+        db.session.add_all(Slot(name=f'Check {i}', provider='Check') for i in range(SLOTS))
+        db.session.commit()
+        ok = check_sequences(0)
+        ok = benchmark() and ok
+    sys.exit(0 if ok else 1)
@@ -1,72 +1,30 @@
 from app import create_app, db
 from app.models.slot import Slot
-import re
-import math
+from app.utils import clean_number, clean_rtp, clean_volatility
 
 app = create_app()
 
-def clean_value(value, remove_char=''):
-    if value is None:
-        return None
-    if isinstance(value, str):
-        # Remove o símbolo especificado, como 'x'
-        value = value.strip(remove_char)
-        if value == '-':
-            return None
-        
-        # Remove todos os caracteres não numéricos, exceto ponto
-        value = re.sub(r'[^\d.]', '', value)
-
-        # Se houver mais de um ponto, remova o primeiro ponto
-        if value.count('.') > 1:
-            value = re.sub(r'\.(?=.*\.)', '', value)
-
-        # Identifica a posição do ponto
-        point_index = value.find('.')
-
-        if point_index != -1:
-            # Se o ponto estiver a uma ou duas casas do final, é uma casa decimal
-            if len(value) - point_index <= 3:
-                # Arredonda para o valor inteiro mais próximo
-                value = str(math.ceil(float(value)))
-            else:
-                # Remove o ponto de milhar
-                value = value.replace('.', '')
-
-        try:
-            # Converte para número inteiro
-            return int(value)
-        except ValueError:
-            print(f"Não foi possível converter '{value}' para int. Definindo como None.")
-            return None
-    return value
+# As regras de limpeza são as de app/utils.py, as mesmas da importação
+# (app/importer.py)
 
 def clean_database():
     with app.app_context():
         slots = Slot.query.all()
         for slot in slots:
             if slot.rtp is not None:
-                cleaned_rtp = clean_value(str(slot.rtp), '%')
-                slot.rtp = cleaned_rtp / 100 if cleaned_rtp is not None else None
+                slot.rtp = clean_rtp(slot.rtp)
 
-            if slot.volatilidade is not None:
-                if isinstance(slot.volatilidade, str):
-                    slot.volatilidade = slot.volatilidade.split('/')[0]
-                    try:
-                        slot.volatilidade = int(float(slot.volatilidade))
-                    except ValueError:
-                        print(f"Não foi possível converter volatilidade '{slot.volatilidade}' para int. Definindo como None.")
-                        slot.volatilidade = None
+            if slot.volatility is not None:
+                slot.volatility = clean_volatility(slot.volatility)
 
-            if slot.potencial is not None:
-                cleaned_potencial = clean_value(str(slot.potencial), 'x')
-                slot.potencial = cleaned_potencial if cleaned_potencial is not None else None
+            if slot.potential is not None:
+                slot.potential = clean_number(slot.potential, 'x')
 
-            if slot.melhor_x is not None:
-                slot.melhor_x = clean_value(str(slot.melhor_x), 'x')
+            if slot.best_x is not None:
+                slot.best_x = clean_number(slot.best_x, 'x')
 
-            if slot.melhor_euro is not None:
-                slot.melhor_euro = clean_value(str(slot.melhor_euro), '€')
+            if slot.best_euro is not None:
+                slot.best_euro = clean_number(slot.best_euro, '€')
 
         db.session.commit()
         print("Database cleaned successfully!")
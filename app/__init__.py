@@ -1,16 +1,30 @@
-from flask import Flask
+from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import sqlite3
 from config import Config
-from app.utils import custom_json_encoder
+from app.json_provider import FastJSONProvider
 
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
 
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # O SQLite só aplica as FKs (e o ON DELETE CASCADE dos bónus) com isto ligado
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # JSON com orjson quando está instalado (Decimal, datas e inf/nan). Tem
+    # de vir antes de o ambiente do Jinja ser criado: o |tojson guarda o dumps
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions with app
     db.init_app(app)
@@ -25,7 +39,29 @@ def create_app(config_class=Config):
     app.register_blueprint(bonus_hunts_blueprint, url_prefix='/bonus-hunts')
     app.register_blueprint(main_blueprint)
 
-    # Set up custom JSON encoding
-    app.json.encoder = custom_json_encoder
+    # Miniaturas das imagens dos slots nos templates
+    from app.images import thumbnail_or_original, is_content_addressed, IMMUTABLE_MAX_AGE
+    app.add_template_filter(thumbnail_or_original, 'thumbnail')
+
+    # Estáticos pré-comprimidos (flask assets compress) e compressão das
+    # respostas dinâmicas
+    from app.assets import assets_cli, send_static, asset_urls, is_fingerprinted
+    from app.compression import compress_response
+    app.view_functions['static'] = send_static
+    app.add_template_global(asset_urls)
+    app.cli.add_command(assets_cli)
+    app.after_request(compress_response)
+
+    @app.after_request
+    def cache_content_addressed(response):
+        # Ficheiros com o hash no nome (imagens e bundles de JS/CSS) nunca
+        # mudam: o browser/OBS não precisa de os revalidar
+        filename = request.view_args.get('filename', '') if request.endpoint == 'static' else ''
+        if filename and (is_content_addressed(filename) or is_fingerprinted(filename)):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
 
     return app
\ No newline at end of file
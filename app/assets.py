@@ -0,0 +1,231 @@
+from flask import current_app, send_from_directory, url_for
+from flask.cli import AppGroup
+from app.compression import choose_encoding
+import click
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+    import rcssmin
+except ImportError:
+    rjsmin = rcssmin = None
+
+# Ficheiros estáticos (JS/CSS).
+#
+# `flask assets build` junta os JS e os CSS carregados pelo base.html num
+# bundle de cada tipo, minifica-os (com o rjsmin/rcssmin, se estiverem
+# instalados) e grava-os em dist/ com o hash do conteúdo no nome, mais um
+# manifest (nome lógico -> ficheiro). O asset_urls() dos templates devolve o
+# ficheiro com hash, que é servido com cache imutável de um ano; sem manifest,
+# ou com algum ficheiro de origem mais recente do que ele, devolve os
+# ficheiros de origem.
+#
+# `flask assets compress` grava ao lado de cada ficheiro as versões .br e .gz
+# com a compressão máxima (o custo é pago uma vez, não a cada pedido). A rota
+# static passa a servir a variante que o cliente aceita, desde que seja mais
+# recente do que o original; caso contrário serve o original.
+
+# Bundle -> ficheiros de origem, pela ordem em que eram carregados
+BUNDLES = {
+    'css/app.css': ['css/style.css', 'css/bonus-hunt.css'],
+    'js/app.js': ['js/main.js', 'js/slots.js', 'js/bonus-hunts.js'],
+}
+DIST_DIR = 'dist'
+MANIFEST = 'dist/manifest.json'
+FINGERPRINTED = re.compile(r'^dist/(css|js)/[\w-]+\.[0-9a-f]{12}\.(css|js)$')
+
+PRECOMPRESSED_EXTENSIONS = ('.js', '.css')
+# Codificação -> extensão do ficheiro pré-comprimido, por ordem de preferência
+PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+
+assets_cli = AppGroup('assets', help='Static asset build steps.')
+
+
+def _fresh(path, source_mtime):
+    try:
+        return os.stat(path).st_mtime >= source_mtime
+    except OSError:
+        return False
+
+
+def is_fingerprinted(filename):
+    return FINGERPRINTED.match(filename) is not None
+
+
+def minify(text, kind):
+    if kind == 'js' and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    if kind == 'css' and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    return text
+
+
+def build_assets(static_folder):
+    """Grava os bundles em dist/ e o manifest, e apaga os bundles de builds
+    anteriores. Devolve o manifest."""
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        base, ext = os.path.splitext(name)
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                parts.append(minify(f.read(), ext[1:]).strip())
+        # Os scripts continuam a correr um a seguir ao outro no mesmo âmbito
+        # global; o ';' separa-os se algum não terminar com ponto e vírgula
+        data = ('\n;\n' if ext == '.js' else '\n').join(part for part in parts if part).encode() + b'\n'
+        filename = f'{DIST_DIR}/{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        path = os.path.join(static_folder, filename)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        manifest[name] = filename
+
+    current = set(manifest.values())
+    for root, _, files in os.walk(os.path.join(static_folder, DIST_DIR)):
+        for name in files:
+            filename = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+            source = re.sub(r'\.(br|gz)$', '', filename)
+            if is_fingerprinted(source) and source not in current:
+                os.remove(os.path.join(root, name))
+
+    path = os.path.join(static_folder, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+    return manifest
+
+
+# Manifest em memória por caminho: (mtime, conteúdo)
+_manifests = {}
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None, {}
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding='utf-8') as f:
+            cached = _manifests[path] = (mtime, json.load(f))
+    return cached
+
+
+def _bundle_file(static_folder, name):
+    mtime, manifest = load_manifest(static_folder)
+    filename = manifest.get(name)
+    # Origem alterada depois do build: serve-se a origem até ao próximo build
+    if filename and all(os.path.getmtime(os.path.join(static_folder, source)) <= mtime for source in BUNDLES[name]):
+        return filename
+    return None
+
+
+def asset_urls(name):
+    """URLs de um bundle de BUNDLES para os templates."""
+    filename = _bundle_file(current_app.static_folder, name)
+    if filename:
+        return [url_for('static', filename=filename)]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+def asset_version():
+    """Identifica os ficheiros que o asset_urls() devolve neste momento.
+
+    Entra na chave e na ETag das páginas em cache: um build novo apaga os
+    bundles anteriores, e uma página guardada (ou um 304) com os nomes antigos
+    deixaria de carregar o JS/CSS."""
+    static_folder = current_app.static_folder
+    files = [_bundle_file(static_folder, name) or '' for name in BUNDLES]
+    return hashlib.sha256('\n'.join(files).encode()).hexdigest()[:12]
+
+
+def send_static(filename):
+    """Substitui a view `static`: serve o .br/.gz quando existe e o cliente o aceita."""
+    static_folder = current_app.static_folder
+    if not filename.endswith(PRECOMPRESSED_EXTENSIONS):
+        return current_app.send_static_file(filename)
+
+    source = os.path.join(static_folder, filename)
+    try:
+        source_mtime = os.stat(source).st_mtime
+    except OSError:
+        return current_app.send_static_file(filename)
+
+    variants = [encoding for encoding, ext in PRECOMPRESSED.items() if _fresh(source + ext, source_mtime)]
+    encoding = choose_encoding(variants) if variants else None
+    if encoding is None:
+        response = current_app.send_static_file(filename)
+    else:
+        response = send_from_directory(static_folder, filename + PRECOMPRESSED[encoding],
+                                       mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=current_app.get_send_file_max_age(filename))
+        response.headers['Content-Encoding'] = encoding
+    if variants:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def compress_static(static_folder, force=False):
+    """Grava as versões .gz (e .br, com o módulo brotli) dos JS/CSS de
+    `static_folder`. Devolve (ficheiros comprimidos, bytes originais, bytes .br/.gz)."""
+    compressed, original_bytes, compressed_bytes = 0, 0, 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(PRECOMPRESSED_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            with open(source, 'rb') as f:
+                data = f.read()
+            if not data:
+                continue
+            source_mtime = os.stat(source).st_mtime
+            outputs = {'.gz': lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                outputs['.br'] = lambda: brotli.compress(data, quality=11)
+            for ext, encode in outputs.items():
+                target = source + ext
+                if force or not _fresh(target, source_mtime):
+                    encoded = encode()
+                    with open(target, 'wb') as f:
+                        f.write(encoded)
+                    compressed += 1
+                    original_bytes += len(data)
+                    compressed_bytes += len(encoded)
+    return compressed, original_bytes, compressed_bytes
+
+
+@assets_cli.command('compress')
+@click.option('--force', is_flag=True, help='Recompress files that are already up to date.')
+def compress_command(force):
+    """Precompress static JS/CSS into .br/.gz files."""
+    if brotli is None:
+        print("brotli is not installed: writing .gz files only.")
+    count, original_bytes, compressed_bytes = compress_static(current_app.static_folder, force=force)
+    if count:
+        print(f"{count} files written ({original_bytes} -> {compressed_bytes} bytes).")
+    else:
+        print("Precompressed assets are already up to date.")
+
+
+@assets_cli.command('build')
+def build_command():
+    """Bundle, minify and fingerprint the static JS/CSS loaded by base.html, then precompress them."""
+    if rjsmin is None:
+        print("rjsmin/rcssmin are not installed: bundles are not minified.")
+    manifest = build_assets(current_app.static_folder)
+    compress_static(os.path.join(current_app.static_folder, DIST_DIR))
+    for name, filename in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(current_app.static_folder, filename))
+        print(f"{name} -> {filename} ({size} bytes)")
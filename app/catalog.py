@@ -0,0 +1,129 @@
+from app import db
+from app.assets import asset_version
+from app.models.slot import CatalogVersion
+from flask import Response, current_app, g, make_response, request
+from sqlalchemy import select, text
+from collections import OrderedDict
+import hashlib
+import threading
+
+# Versão do catálogo de slots e cache das páginas da lista de slots.
+#
+# catalog_version.version é incrementada por triggers sempre que muda um slot
+# (criar, editar, apagar, importar, download de imagens) ou o histórico dos
+# bónus (slot_stats), ou seja, tudo o que a lista de slots mostra. Como está na
+# base de dados, vale também para os outros processos (workers, `flask slots
+# import`). Sem a linha (base de dados criada sem as migrações e sem
+# install_catalog_version()) não há cache.
+#
+# As páginas ficam numa LRU limitada por (parâmetros, versão) e saem com uma
+# ETag da versão, por isso um browser com a página atual recebe um 304.
+
+VERSION_TRIGGERS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS catalog_version_{table}_{suffix} AFTER {operation} ON {table} BEGIN
+        UPDATE catalog_version SET version = version + 1;
+    END
+    """
+    for table in ('slots', 'slot_stats')
+    for suffix, operation in (('ai', 'INSERT'), ('ad', 'DELETE'), ('au', 'UPDATE'))
+]
+
+VERSION_TRIGGERS_DROP = [
+    f"DROP TRIGGER IF EXISTS catalog_version_{table}_{suffix}"
+    for table in ('slots', 'slot_stats')
+    for suffix in ('ai', 'ad', 'au')
+]
+
+
+def create_version_triggers(connection):
+    for statement in VERSION_TRIGGERS_DDL:
+        connection.execute(text(statement))
+
+
+def drop_version_triggers(connection):
+    for statement in VERSION_TRIGGERS_DROP:
+        connection.execute(text(statement))
+
+
+def install_catalog_version():
+    """Cria a linha da versão e os triggers (a migração f3a7c2e9b184 faz o mesmo)."""
+    with db.engine.begin() as connection:
+        connection.execute(text("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)"))
+        create_version_triggers(connection)
+
+
+def catalog_version():
+    return db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar()
+
+
+class PageCache:
+    """LRU de páginas renderizadas, partilhada pelas threads do processo."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.version = None
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            page = self._pages.get((key, version))
+            if page is not None:
+                self._pages.move_to_end((key, version))
+            return page
+
+    def set(self, key, version, page):
+        with self._lock:
+            if version != self.version:
+                # As páginas de versões anteriores já não voltam a ser pedidas
+                self._pages.clear()
+                self.version = version
+            self._pages[(key, version)] = page
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def __len__(self):
+        return len(self._pages)
+
+
+_page_cache = None
+
+
+def get_page_cache():
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache(current_app.config['SLOT_LIST_CACHE_SIZE'])
+    return _page_cache
+
+
+def cached_page(key, render):
+    """Resposta de uma página que só depende de `key` e do catálogo: 304 se o
+    browser já a tiver, da cache ou, na falta dela, de render()."""
+    version = catalog_version()
+    if version is None or current_app.debug or not current_app.config['SLOT_LIST_CACHE_SIZE']:
+        return render()
+    # A página leva os URLs dos JS/CSS, que mudam (e os anteriores deixam de
+    # existir) com cada `flask assets build`
+    key = (asset_version(), key)
+    etag = f"catalog-{version}-{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        cache = get_page_cache()
+        page = cache.get(key, version)
+        if page is None:
+            page = render()
+            if g.get('uncacheable_page'):
+                # P. ex. miniaturas ainda por gerar: a página vai mudar sem
+                # mudar a versão
+                return page
+            cache.set(key, version, page)
+        response = make_response(page)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
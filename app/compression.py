@@ -0,0 +1,62 @@
+from flask import current_app, request
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressão das respostas dinâmicas (JSON e HTML) acima de
+# COMPRESS_MIN_SIZE bytes, com brotli (se estiver instalado) ou gzip,
+# conforme o Accept-Encoding do cliente. Os ficheiros estáticos são
+# comprimidos antes, por `flask assets compress` (ver app/assets.py).
+#
+# Ficam de fora as respostas em stream (SSE, exportações) e os ficheiros
+# (send_file), que não passam pelo get_data().
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html'}
+
+
+def available_encodings():
+    # Por ordem de preferência, quando o cliente aceita as duas
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(encodings):
+    """Codificação aceite pelo cliente com maior qualidade; em caso de
+    empate, a primeira de `encodings`."""
+    accepted = [(request.accept_encodings[encoding], -index, encoding) for index, encoding in enumerate(encodings)]
+    quality, _, encoding = max(accepted, default=(0, 0, None))
+    return encoding if quality > 0 else None
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config['COMPRESS_ENABLED'] or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    # A resposta varia com o Accept-Encoding mesmo quando sai sem compressão
+    response.vary.add('Accept-Encoding')
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if (response.content_length or 0) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    encoding = choose_encoding(available_encodings())
+    if encoding is None:
+        return response
+    response.set_data(compress(response.get_data(), encoding, config))
+    response.headers['Content-Encoding'] = encoding
+    # O conteúdo é o mesmo, os bytes não: a ETag passa a fraca (If-None-Match
+    # compara ETags fracas)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
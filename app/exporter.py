@@ -0,0 +1,133 @@
+from flask import Response, current_app, stream_with_context
+from app import db
+from app.models.slot import Slot
+from app.models.bonus_hunt import BonusHunt, Bonus, MELHORES_PIORES
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+import csv
+import io
+import math
+
+# Exportação das tabelas em NDJSON ou CSV. As linhas são lidas do cursor em
+# blocos (yield_per) e escritas à medida que chegam, por isso a memória usada
+# não depende do tamanho da tabela.
+
+YIELD_PER = 1000
+# Os hunts trazem todos os seus bónus (para as estatísticas): blocos menores
+HUNTS_YIELD_PER = 100
+# Junta as linhas em pedaços deste tamanho antes de as enviar
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+SLOT_COLUMNS = [column.name for column in Slot.__table__.columns]
+BONUS_COLUMNS = [column.name for column in Bonus.__table__.columns]
+HUNT_COLUMNS = [column.name for column in BonusHunt.__table__.columns]
+# Chaves de calcular_estatisticas(); os melhores/piores bónus vão só pelo id
+STAT_COLUMNS = [
+    'saldo_restante', 'investimento', 'total_ganho', 'lucro_prejuizo',
+    'num_bonus', 'num_bonus_abertos', 'num_bonus_nao_abertos',
+    'media_aposta_inicial', 'media_aposta',
+    'break_even_x_inicial', 'break_even_euro_inicial', 'break_even_x', 'break_even_euro',
+    'avg_x', 'avg_euro',
+    'best_bonus_x_id', 'best_bonus_euro_id', 'worst_bonus_x_id', 'worst_bonus_euro_id',
+]
+
+
+def _table_rows(table):
+    statement = select(table).order_by(table.c.id).execution_options(yield_per=YIELD_PER)
+    for row in db.session.execute(statement):
+        yield dict(row._mapping)
+
+
+def iter_slots():
+    return _table_rows(Slot.__table__)
+
+
+def iter_bonuses():
+    return _table_rows(Bonus.__table__)
+
+
+def iter_hunts():
+    statement = (select(BonusHunt)
+                 .options(selectinload(BonusHunt.bonuses), selectinload(BonusHunt.snapshot))
+                 .order_by(BonusHunt.id)
+                 .execution_options(yield_per=HUNTS_YIELD_PER))
+    for hunt in db.session.scalars(statement):
+        row = {column: getattr(hunt, column) for column in HUNT_COLUMNS}
+        # Os hunts fechados não são recalculados: vêm do snapshot
+        if hunt.fechado:
+            estatisticas = dict(hunt.snapshot.estatisticas)
+            for key in MELHORES_PIORES:
+                estatisticas[key] = estatisticas[key]['id'] if estatisticas[key] else None
+        else:
+            # Passa por todos os hunts: não os deixa na cache das estatísticas
+            estatisticas = hunt.calcular_estatisticas(serializar_bonus=False, cache=False)
+        for key, value in estatisticas.items():
+            if key.endswith(('_bonus_x', '_bonus_euro')):
+                key = f"{key}_id"
+            if key in STAT_COLUMNS:
+                row[key] = value
+        yield row
+
+
+EXPORTS = {
+    'slots': (iter_slots, SLOT_COLUMNS),
+    'bonus_hunts': (iter_hunts, HUNT_COLUMNS + STAT_COLUMNS),
+    'bonuses': (iter_bonuses, BONUS_COLUMNS),
+}
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Como no JSON da app (app/json_provider.py): o break-even sem bónus por
+    # abrir é infinito e sai como null (célula vazia no CSV)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _ndjson_lines(rows, columns):
+    for row in rows:
+        yield current_app.json.dumps({column: _export_value(row.get(column)) for column in columns},
+                                      ensure_ascii=False, sort_keys=False) + '\n'
+
+
+def _csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_export_value(row.get(column)) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_table(table, format):
+    """Gera o conteúdo de `table` em `format` ('ndjson' ou 'csv'), aos pedaços."""
+    iter_table, columns = EXPORTS[table]
+    lines = _csv_lines if format == 'csv' else _ndjson_lines
+    chunk, size = [], 0
+    for line in lines(iter_table(), columns):
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_response(table, format):
+    return Response(
+        stream_with_context(export_table(table, format)),
+        mimetype=FORMATS[format],
+        headers={'Content-Disposition': f'attachment; filename={table}.{format}'}
+    )
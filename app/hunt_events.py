@@ -0,0 +1,158 @@
+from flask import current_app
+from app import db
+from app.models.bonus_hunt import BonusHunt
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+import queue
+import threading
+
+# Stream (Server-Sent Events) do hunt ativo para overlays do OBS e browsers.
+#
+# Uma única thread por processo vigia o hunt ativo: acorda a cada commit
+# deste processo e, para apanhar alterações feitas noutros processos,
+# a cada HUNT_STREAM_POLL segundos. Quando a revisão (ou o hunt ativo) muda,
+# lê o estado uma vez e entrega-o a todos os subscritores. Cada evento leva
+# o estado completo, por isso um subscritor lento só precisa do último.
+
+
+class HuntEvent:
+    def __init__(self, id, data):
+        self.id = id
+        self.data = data
+
+    def encode(self):
+        return f"id: {self.id}\nevent: hunt\ndata: {self.data}\n\n"
+
+
+def event_id(hunt_id, revisao):
+    return f"{hunt_id}:{revisao}" if hunt_id is not None else 'none'
+
+
+def hunt_state(hunt):
+    """Estado do hunt enviado aos subscritores (URLs das imagens relativos)."""
+    state = hunt.to_dict(external=False)
+    state['bonus_atual'] = next((bonus for bonus in state['bonuses'] if bonus['id'] == hunt.bonus_atual_id), None)
+    return state
+
+
+class HuntBroadcaster:
+    def __init__(self, app):
+        self.app = app
+        self.latest = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='hunt-stream', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        self._wake.set()
+
+    def notify(self):
+        self._wake.set()
+
+    def _publish(self, hunt_event):
+        with self._lock:
+            self.latest = hunt_event
+            for subscriber in self._subscribers:
+                # Só interessa o estado mais recente: substitui o que ainda
+                # não tiver sido enviado
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                subscriber.put_nowait(hunt_event)
+
+    def _read_active(self):
+        active = db.session.execute(
+            select(BonusHunt.id, BonusHunt.revisao).where(BonusHunt.is_active.is_(True)).order_by(BonusHunt.id).limit(1)
+        ).first()
+        current = event_id(*active) if active else event_id(None, None)
+        if self.latest is not None and self.latest.id == current:
+            return None
+        if active is None:
+            return HuntEvent(current, 'null')
+        with self.app.test_request_context():
+            hunt = BonusHunt.com_bonus().filter_by(id=active.id).one()
+            # O JSON da app: inf/nan saem como null, que o JSON.parse aceita
+            return HuntEvent(event_id(hunt.id, hunt.revisao), self.app.json.dumps(hunt_state(hunt)))
+
+    def _run(self):
+        poll = self.app.config['HUNT_STREAM_POLL']
+        with self.app.app_context():
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        # Sem ninguém a ouvir não se consulta a base de dados;
+                        # o próximo subscritor volta a arrancar a thread
+                        self._thread = None
+                        self.latest = None
+                        return
+                try:
+                    hunt_event = self._read_active()
+                    if hunt_event is not None:
+                        self._publish(hunt_event)
+                except Exception as e:
+                    print(f"Error reading the active hunt for the stream: {e}")
+                finally:
+                    db.session.remove()
+                self._wake.wait(poll)
+                self._wake.clear()
+
+
+_broadcaster = None
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = HuntBroadcaster(current_app._get_current_object())
+    return _broadcaster
+
+
+def stream_active_hunt(last_event_id=None):
+    """Devolve o gerador do stream SSE; `last_event_id` evita reenviar um
+    estado que o cliente já tem."""
+    # O gerador corre depois de o pedido acabar, fora do contexto da app
+    return _stream(get_broadcaster(), last_event_id)
+
+
+def _stream(broadcaster, last_event_id):
+    heartbeat = broadcaster.app.config['HUNT_STREAM_HEARTBEAT']
+    subscriber = broadcaster.subscribe()
+    broadcaster.notify()
+    try:
+        yield f"retry: {broadcaster.app.config['HUNT_STREAM_RETRY_MS']}\n\n"
+        sent = last_event_id
+        latest = broadcaster.latest
+        if latest is not None and latest.id != sent:
+            yield latest.encode()
+            sent = latest.id
+        while True:
+            try:
+                hunt_event = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comentário SSE: mantém a ligação viva através de proxies
+                yield ": heartbeat\n\n"
+                continue
+            if hunt_event.id != sent:
+                yield hunt_event.encode()
+                sent = hunt_event.id
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_commit(session):
+    if _broadcaster is not None:
+        _broadcaster.notify()
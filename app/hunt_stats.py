@@ -0,0 +1,330 @@
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session, attributes
+import heapq
+import math
+import threading
+
+# Estatísticas dos hunts mantidas de forma incremental.
+#
+# Cada hunt tem um HuntStats com os valores dos bónus, as contagens e heaps
+# dos melhores e piores bónus. Em vez de recarregar e percorrer os bónus do
+# hunt pelo ORM a cada pedido, os bónus alterados num commit são aplicados
+# ao HuntStats do hunt. As alterações são recolhidas no flush e só aplicadas
+# depois do commit; num rollback são descartadas.
+#
+# As somas têm de dar exatamente os mesmos floats que o cálculo original
+# (sum() pela ordem dos bónus), por isso não são atualizadas bónus a bónus:
+# são refeitas pela ordem do id, sobre os valores já em memória, na primeira
+# leitura depois de uma alteração.
+#
+# Cada flush que altera um hunt ou os seus bónus incrementa
+# BonusHunt.revisao no próprio UPDATE (revisao = revisao + 1), por isso
+# dois processos a editar o mesmo hunt nunca repetem uma revisão. Um
+# HuntStats só é usado se tiver a mesma revisão que o hunt e só avança se a
+# revisão escrita for a seguinte à que conhecia; alterações feitas noutro
+# processo obrigam a reconstruí-lo.
+#
+# Só os HUNT_STATS_CACHE_SIZE hunts usados mais recentemente ficam em cache
+# (LRU); uma exportação, que passa por todos os hunts, não os guarda.
+
+PENDING_KEY = 'hunt_stats_pending'
+BUMPED_KEY = 'hunt_stats_bumped'
+
+_engines = OrderedDict()
+_lock = threading.Lock()
+
+
+def multiplicador(aposta, payout):
+    # Mesma regra que Bonus.multiplicador
+    if payout is not None and aposta:
+        return payout / aposta
+    return 0
+
+
+def _top(heap, valid):
+    # Remoção preguiçosa: as entradas de bónus alterados/apagados só saem
+    # do heap quando chegam ao topo
+    while heap and not valid(heap[0]):
+        heapq.heappop(heap)
+    return heap[0] if heap else None
+
+
+class HuntStats:
+    """Agregados de um hunt, atualizados bónus a bónus."""
+
+    def __init__(self, bonuses=(), revisao=None):
+        self.revisao = revisao
+        # id -> (aposta, payout, saldo_restante), pela ordem do id
+        self._bonuses = {}
+        self._ordered = True
+        self._sums = None
+        self.num_abertos = 0
+        # Desempate pelo id, como max()/min() sobre hunt.bonuses (ordem de id)
+        self._best_x = []       # (-multiplicador, id)
+        self._worst_x = []      # (multiplicador, id)
+        self._best_euro = []    # (-payout, id)
+        self._worst_euro = []   # (payout, id)
+        self._saldos = []       # -id dos bónus com saldo_restante
+        for bonus in bonuses:
+            self.set(bonus.id, bonus.aposta, bonus.payout, bonus.saldo_restante)
+
+    def __len__(self):
+        return len(self._bonuses)
+
+    def set(self, bonus_id, aposta, payout, saldo_restante):
+        """Adiciona o bónus ou substitui os valores que já tinha."""
+        previous = self._bonuses.get(bonus_id)
+        if previous is None:
+            if self._bonuses and bonus_id < next(reversed(self._bonuses)):
+                self._ordered = False
+        elif previous[1] is not None:
+            self.num_abertos -= 1
+        # Um bónus que já existia mantém o lugar na ordem
+        self._bonuses[bonus_id] = (aposta, payout, saldo_restante)
+        self._sums = None
+        if payout is not None:
+            x = multiplicador(aposta, payout)
+            self.num_abertos += 1
+            heapq.heappush(self._best_x, (-x, bonus_id))
+            heapq.heappush(self._worst_x, (x, bonus_id))
+            heapq.heappush(self._best_euro, (-payout, bonus_id))
+            heapq.heappush(self._worst_euro, (payout, bonus_id))
+        if saldo_restante is not None:
+            heapq.heappush(self._saldos, -bonus_id)
+        self._compact()
+
+    def remove(self, bonus_id):
+        values = self._bonuses.pop(bonus_id, None)
+        if values is None:
+            return
+        self._sums = None
+        if values[1] is not None:
+            self.num_abertos -= 1
+
+    def sums(self):
+        """(total_apostas, total_ganho, total_apostas_nao_abertas,
+        soma_multiplicadores), com as mesmas somas e pela mesma ordem que o
+        cálculo original."""
+        if self._sums is None:
+            if not self._ordered:
+                self._bonuses = dict(sorted(self._bonuses.items()))
+                self._ordered = True
+            values = self._bonuses.values()
+            self._sums = (
+                sum(aposta for aposta, _, _ in values),
+                sum(payout for _, payout, _ in values if payout is not None),
+                sum(aposta for aposta, payout, _ in values if payout is None),
+                sum(multiplicador(aposta, payout) for aposta, payout, _ in values if payout is not None),
+            )
+        return self._sums
+
+    def _compact(self):
+        # Limita o lixo deixado pela remoção preguiçosa
+        if len(self._saldos) + len(self._best_x) > 4 * len(self._bonuses) + 64:
+            opened = [(id, aposta, payout) for id, (aposta, payout, _) in self._bonuses.items() if payout is not None]
+            self._best_x = [(-multiplicador(aposta, payout), id) for id, aposta, payout in opened]
+            self._worst_x = [(multiplicador(aposta, payout), id) for id, aposta, payout in opened]
+            self._best_euro = [(-payout, id) for id, aposta, payout in opened]
+            self._worst_euro = [(payout, id) for id, aposta, payout in opened]
+            self._saldos = [-id for id, (_, _, saldo) in self._bonuses.items() if saldo is not None]
+            for heap in (self._best_x, self._worst_x, self._best_euro, self._worst_euro, self._saldos):
+                heapq.heapify(heap)
+
+    def _valid_x(self, sign):
+        def valid(entry):
+            values = self._bonuses.get(entry[1])
+            return values is not None and values[1] is not None and sign * entry[0] == multiplicador(values[0], values[1])
+        return valid
+
+    def _valid_euro(self, sign):
+        def valid(entry):
+            values = self._bonuses.get(entry[1])
+            return values is not None and values[1] is not None and sign * entry[0] == values[1]
+        return valid
+
+    def _valid_saldo(self, entry):
+        values = self._bonuses.get(-entry)
+        return values is not None and values[2] is not None
+
+    def _top_id(self, heap, valid):
+        entry = _top(heap, valid)
+        return entry[1] if entry else None
+
+    def estatisticas(self, custo_inicial):
+        """Mesmo dicionário que BonusHunt.calcular_estatisticas, com os ids dos melhores/piores bónus."""
+        num_bonus = len(self._bonuses)
+        num_bonus_abertos = self.num_abertos
+        num_bonus_nao_abertos = num_bonus - num_bonus_abertos
+        total_apostas, total_ganho, total_apostas_nao_abertas, soma_multiplicadores = self.sums()
+
+        saldo_restante = custo_inicial - total_apostas
+        ultimo_saldo = _top(self._saldos, self._valid_saldo)
+        if ultimo_saldo is not None:
+            saldo_restante = self._bonuses[-ultimo_saldo][2]
+
+        investimento = custo_inicial - saldo_restante
+        media_aposta_inicial = total_apostas / num_bonus if num_bonus > 0 else 0
+        break_even_x_inicial = int(investimento / media_aposta_inicial) if media_aposta_inicial > 0 else float('inf')
+        break_even_euro_inicial = int(investimento / num_bonus) if num_bonus > 0 else investimento
+
+        media_aposta = total_apostas_nao_abertas / num_bonus_nao_abertos if num_bonus_nao_abertos > 0 else 0
+        valor_restante = investimento - total_ganho
+        break_even_x = int(valor_restante / media_aposta) if total_apostas_nao_abertas > 0 else math.inf
+        break_even_euro = int(valor_restante / num_bonus_nao_abertos) if num_bonus_nao_abertos > 0 else 0
+
+        avg_x = int(soma_multiplicadores / num_bonus_abertos) if num_bonus_abertos else 0
+        avg_euro = int(total_ganho / num_bonus_abertos) if num_bonus_abertos else 0
+
+        return {
+            'custo_inicial': custo_inicial,
+            'saldo_restante': saldo_restante,
+            'investimento': investimento,
+            'total_ganho': total_ganho,
+            'lucro_prejuizo': total_ganho - investimento,
+            'num_bonus': num_bonus,
+            'num_bonus_abertos': num_bonus_abertos,
+            'num_bonus_nao_abertos': num_bonus_nao_abertos,
+            'media_aposta_inicial': media_aposta_inicial,
+            'media_aposta': media_aposta,
+            'break_even_x_inicial': break_even_x_inicial,
+            'break_even_euro_inicial': break_even_euro_inicial,
+            'break_even_x': break_even_x,
+            'break_even_euro': break_even_euro,
+            'avg_x': avg_x,
+            'avg_euro': avg_euro,
+            'best_bonus_x': self._top_id(self._best_x, self._valid_x(-1)),
+            'best_bonus_euro': self._top_id(self._best_euro, self._valid_euro(-1)),
+            'worst_bonus_x': self._top_id(self._worst_x, self._valid_x(1)),
+            'worst_bonus_euro': self._top_id(self._worst_euro, self._valid_euro(1)),
+        }
+
+
+def _has_pending(hunt):
+    # Alterações ainda não commitadas a este hunt: o HuntStats em cache
+    # não as reflete
+    session = object_session(hunt)
+    if session is None:
+        return False
+    if any(op[1] == hunt.id for op in session.info.get(PENDING_KEY, ())):
+        return True
+    from app.models.bonus_hunt import Bonus
+    return hunt in session.new or any(
+        isinstance(obj, Bonus) and (obj.hunt_id == hunt.id or obj.__dict__.get('hunt') is hunt)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    )
+
+
+def stats_for(hunt, cache=True):
+    """Estatísticas de `hunt` a partir do HuntStats em cache (criado na
+    primeira vez). Com cache=False um HuntStats novo não é guardado."""
+    with _lock:
+        engine = _engines.get(hunt.id)
+        if engine is not None and engine.revisao == hunt.revisao and not _has_pending(hunt):
+            if cache:
+                _engines.move_to_end(hunt.id)
+            return engine.estatisticas(hunt.custo_inicial)
+
+    engine = HuntStats(hunt.bonuses, revisao=hunt.revisao)
+    maxsize = current_app.config['HUNT_STATS_CACHE_SIZE']
+    if cache and maxsize and hunt.id is not None and not _has_pending(hunt):
+        with _lock:
+            _engines[hunt.id] = engine
+            _engines.move_to_end(hunt.id)
+            while len(_engines) > maxsize:
+                _engines.popitem(last=False)
+    return engine.estatisticas(hunt.custo_inicial)
+
+
+def invalidate_stats(hunt_id=None):
+    """Descarta o HuntStats de um hunt (ou de todos), para alterações feitas fora do ORM."""
+    with _lock:
+        if hunt_id is None:
+            _engines.clear()
+        else:
+            _engines.pop(hunt_id, None)
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_revisions(session, flush_context, instances):
+    from app.models.bonus_hunt import BonusHunt, Bonus
+    hunts = set()
+    new, dirty, deleted = session.new, session.dirty, session.deleted
+    with session.no_autoflush:
+        for obj in (*new, *dirty, *deleted):
+            if obj in dirty and not session.is_modified(obj):
+                continue
+            if isinstance(obj, Bonus):
+                hunt = obj.__dict__.get('hunt')
+                if hunt is None and obj.hunt_id is not None:
+                    hunt = session.get(BonusHunt, obj.hunt_id)
+            elif isinstance(obj, BonusHunt):
+                hunt = obj
+            else:
+                continue
+            if hunt is not None and hunt not in new and hunt not in deleted:
+                hunts.add(hunt)
+
+    bumped = session.info.setdefault(BUMPED_KEY, [])
+    for hunt in hunts:
+        # A revisão lida pode já ter mudado noutro processo: o valor novo só
+        # se sabe depois do UPDATE
+        bumped.append((hunt, hunt.revisao))
+        hunt.revisao = BonusHunt.revisao + 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    from app.models.bonus_hunt import BonusHunt, Bonus
+    pending = session.info.setdefault(PENDING_KEY, [])
+    for hunt, anterior in session.info.pop(BUMPED_KEY, ()):
+        # O atributo expirou com o UPDATE: lê a revisão que ficou na base de dados
+        pending.append(('revisao', hunt.id, anterior, hunt.revisao))
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Bonus):
+            # Bónus mudado de hunt: o hunt antigo é recalculado de raiz
+            for old_hunt_id in attributes.get_history(obj, 'hunt_id').deleted or ():
+                if old_hunt_id is not None and old_hunt_id != obj.hunt_id:
+                    pending.append(('drop', old_hunt_id))
+            # Os valores como o ORM os volta a ler da base de dados (REAL)
+            values = (None if value is None else float(value) for value in (obj.aposta, obj.payout, obj.saldo_restante))
+            pending.append(('set', obj.hunt_id, obj.id, *values))
+    for obj in session.deleted:
+        if isinstance(obj, Bonus):
+            pending.append(('remove', obj.hunt_id, obj.id))
+        elif isinstance(obj, BonusHunt):
+            pending.append(('drop', obj.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    with _lock:
+        for op, hunt_id, *values in pending:
+            if op == 'drop':
+                _engines.pop(hunt_id, None)
+                continue
+            engine = _engines.get(hunt_id)
+            if engine is None:
+                continue
+            if op == 'revisao':
+                # Revisões intermédias vindas de outro processo: o HuntStats
+                # não as viu e tem de ser reconstruído
+                anterior, nova = values
+                if engine.revisao == anterior and nova == anterior + 1:
+                    engine.revisao = nova
+                else:
+                    _engines.pop(hunt_id, None)
+            elif op == 'set':
+                engine.set(*values)
+            else:
+                engine.remove(*values)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(BUMPED_KEY, None)
@@ -0,0 +1,120 @@
+from flask import current_app
+from app import db
+from app.images import new_upload_path, store_image, queue_thumbnail
+from app.models.slot import Slot
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import os
+import requests
+import time
+
+# Downloads de imagens a partir de image_link, feitos fora do pedido HTTP.
+# O slot é gravado logo e a imagem é preenchida quando o download acaba.
+
+CHUNK_SIZE = 64 * 1024
+# Tipos aceites além de image/*: alguns CDNs servem as imagens sem tipo
+GENERIC_CONTENT_TYPES = {'', 'application/octet-stream', 'binary/octet-stream'}
+
+_session = None
+_executor = None
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class NotAnImage(Exception):
+    pass
+
+
+def get_session():
+    # Uma única Session partilhada pelas threads: reutiliza as ligações
+    # (keep-alive) aos mesmos CDNs em vez de abrir uma por imagem
+    global _session
+    if _session is None:
+        pool_size = current_app.config['IMAGE_FETCH_WORKERS']
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        _session = requests.Session()
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+        _session.headers['User-Agent'] = 'mat3usDashboard image fetcher'
+    return _session
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=current_app.config['IMAGE_FETCH_WORKERS'],
+                                       thread_name_prefix='image-fetch')
+    return _executor
+
+
+def download_image(session, url, path, max_bytes, timeout):
+    """Faz stream de `url` para `path`, abortando se passar de `max_bytes`."""
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        # P. ex. uma página de erro ou de login servida com 200
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith('image/') and content_type not in GENERIC_CONTENT_TYPES:
+            raise NotAnImage(f"content type {content_type}")
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ImageTooLarge(f"{length} bytes (limit {max_bytes})")
+        written = 0
+        with open(path, 'wb') as file:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ImageTooLarge(f"more than {max_bytes} bytes")
+                file.write(chunk)
+
+
+def fetch_with_retries(url, path):
+    config = current_app.config
+    retries = config['IMAGE_FETCH_RETRIES']
+    for attempt in range(retries + 1):
+        try:
+            download_image(get_session(), url, path, config['IMAGE_FETCH_MAX_BYTES'], config['IMAGE_FETCH_TIMEOUT'])
+            return True
+        except (ImageTooLarge, NotAnImage) as e:
+            print(f"Error downloading image {url}: {e}")
+            return False
+        except requests.HTTPError as e:
+            # Erros 4xx não vão mudar com uma nova tentativa
+            if e.response is not None and e.response.status_code < 500:
+                print(f"Error downloading image {url}: {e}")
+                return False
+            error = e
+        except requests.RequestException as e:
+            error = e
+        if attempt < retries:
+            time.sleep(config['IMAGE_FETCH_BACKOFF'] * 2 ** attempt)
+    print(f"Error downloading image {url} after {retries + 1} attempts: {error}")
+    return False
+
+
+def _fetch_slot_image(app, slot_id, url, ext):
+    with app.app_context():
+        path = new_upload_path()
+        try:
+            if not fetch_with_retries(url, path):
+                return None
+            image = store_image(path, ext)
+            queue_thumbnail(image)
+            db.session.query(Slot).filter_by(id=slot_id).update({'image': image})
+            db.session.commit()
+            return image
+        except Exception as e:
+            # Corre numa thread do pool: sem isto o erro ficava perdido no Future
+            db.session.rollback()
+            print(f"Error saving image {url} for slot {slot_id}: {e}")
+            return None
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def queue_image_download(slot_id, url, ext):
+    """Agenda o download de `url` e a atualização de Slot.image; devolve o Future."""
+    app = current_app._get_current_object()
+    return get_executor().submit(_fetch_slot_image, app, slot_id, url, ext)
@@ -0,0 +1,147 @@
+from flask import current_app, g
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+
+# Imagens guardadas pelo hash SHA-256 do conteúdo: images/store/ab/abcd….jpg.
+# Ficheiros iguais ficam deduplicados e, como o URL muda sempre que o
+# conteúdo muda, podem ser servidos com Cache-Control: immutable. As
+# miniaturas não: têm o nome do original e são regeneradas no mesmo URL
+# (flask slots thumbnails --force, outro THUMBNAIL_SIZE).
+IMAGE_STORE_DIR = 'images/store'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+CONTENT_ADDRESSED = re.compile(r'^images/store/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$')
+
+# Miniaturas das imagens dos slots. A miniatura fica na pasta thumbs/ ao lado
+# do original (images/store/<ab>/thumbs/ para as imagens da store), com o
+# mesmo nome e extensão .webp (ou .jpg se o Pillow não tiver suporte para
+# WebP).
+THUMBNAILS_DIR = 'thumbs'
+THUMBNAIL_SIZE = (160, 160)
+THUMBNAIL_FORMAT, THUMBNAIL_EXT = ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+THUMBNAIL_QUALITY = 80
+
+_executor = None
+
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def store_path(digest, ext):
+    return f"{IMAGE_STORE_DIR}/{digest[:2]}/{digest}.{ext.lower()}"
+
+
+def is_content_addressed(filename):
+    return CONTENT_ADDRESSED.match(filename) is not None
+
+
+def new_upload_path():
+    """Ficheiro temporário dentro da store, para depois ser movido com store_image()."""
+    folder = os.path.join(current_app.static_folder, IMAGE_STORE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=folder, suffix='.upload')
+    os.close(fd)
+    return path
+
+
+def store_image(path, ext):
+    """Move o ficheiro `path` para a store e devolve o caminho relativo a static/.
+
+    Se já existir uma imagem com o mesmo conteúdo, o ficheiro novo é
+    descartado e reutiliza-se a existente.
+    """
+    image = store_path(file_hash(path), ext)
+    destination = os.path.join(current_app.static_folder, image)
+    if os.path.exists(destination):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(path, destination)
+    return image
+
+
+def thumbnail_for(image):
+    """Caminho (relativo a static/) da miniatura de `image`."""
+    folder, filename = os.path.split(image.lstrip('/'))
+    stem = os.path.splitext(filename)[0]
+    return f"{folder}/{THUMBNAILS_DIR}/{stem}.{THUMBNAIL_EXT}"
+
+
+def thumbnail_or_original(image):
+    # Enquanto a miniatura não estiver gerada, serve-se o original
+    if not image:
+        return image
+    thumbnail = thumbnail_for(image)
+    if os.path.exists(os.path.join(current_app.static_folder, thumbnail)):
+        return thumbnail
+    if os.path.exists(os.path.join(current_app.static_folder, image.lstrip('/'))):
+        # Miniatura por gerar: a página muda quando existir e não fica em
+        # cache (app/catalog.py)
+        g.uncacheable_page = True
+    return image.lstrip('/')
+
+
+def make_thumbnail(source, destination, force=False):
+    """Gera a miniatura de `source` em `destination`. Corre nos processos do pool."""
+    try:
+        if not force and os.path.exists(destination) and os.path.getmtime(destination) >= os.path.getmtime(source):
+            return False
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with Image.open(source) as img:
+            img = ImageOps.exif_transpose(img)
+            has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            img = img.convert('RGBA' if has_alpha and THUMBNAIL_FORMAT == 'WEBP' else 'RGB')
+            img.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+            # Escreve para um ficheiro temporário e troca no fim, para que
+            # ninguém sirva uma miniatura a meio de ser escrita
+            tmp = f"{destination}.{os.getpid()}.tmp"
+            img.save(tmp, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+            os.replace(tmp, destination)
+        return True
+    except Exception as e:
+        print(f"Error creating thumbnail for {source}: {e}")
+        return False
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn em vez de fork: o servidor corre com threads e um fork
+        # a meio de um pedido pode herdar locks ocupados
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config.get('THUMBNAIL_WORKERS'),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def queue_thumbnail(image):
+    """Agenda a criação da miniatura de `image` (relativo a static/) sem bloquear o pedido."""
+    static_folder = current_app.static_folder
+    source = os.path.join(static_folder, image.lstrip('/'))
+    destination = os.path.join(static_folder, thumbnail_for(image))
+    return get_executor().submit(make_thumbnail, source, destination, True)
+
+
+def backfill_thumbnails(images, force=False, workers=None):
+    """Gera em paralelo as miniaturas de `images` (caminhos relativos a static/).
+
+    Devolve o número de miniaturas criadas.
+    """
+    static_folder = current_app.static_folder
+    images = [image.lstrip('/') for image in images
+              if os.path.isfile(os.path.join(static_folder, image.lstrip('/')))]
+    sources = [os.path.join(static_folder, image) for image in images]
+    destinations = [os.path.join(static_folder, thumbnail_for(image)) for image in images]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return sum(executor.map(make_thumbnail, sources, destinations, [force] * len(images), chunksize=32))
@@ -0,0 +1,197 @@
+from app import db
+from app.models.slot import Slot
+from app.providers import provider_key, resolve_providers
+from app.utils import clean_number, clean_rtp, clean_volatility
+from sqlalchemy import bindparam, insert, or_, select, update, func
+import csv
+import io
+import json
+import time
+
+# Importação em massa do catálogo a partir de CSV ou JSON (array ou NDJSON).
+# O ficheiro é lido em stream e gravado em lotes: cada lote é um único
+# executemany de INSERTs e outro de UPDATEs, numa transação. Os providers
+# de cada lote são resolvidos de uma vez (app/providers.py).
+
+BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Colunas aceites e a normalização de cada uma (app/utils.py, as mesmas
+# regras do _aux/limpar_simbolos_db.py). Os valores no formato da exportação
+# voltam a ser importados sem mudar
+NORMALIZERS = {
+    'rtp': clean_rtp,
+    'volatility': clean_volatility,
+    'potential': lambda value: clean_number(value, 'x'),
+    'best_x': lambda value: clean_number(value, 'x'),
+    'best_euro': lambda value: clean_number(value, '€'),
+    'image': lambda value: (value.strip() or None) if isinstance(value, str) else value,
+}
+UPDATABLE_COLUMNS = list(NORMALIZERS)
+
+
+def iter_csv_rows(stream):
+    yield from csv.DictReader(stream)
+
+
+def iter_json_rows(stream):
+    """Lê objetos de um array JSON ou de NDJSON sem carregar o ficheiro todo."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        # Salta espaços, vírgulas e os parênteses do array
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+
+        if position < len(buffer):
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Objeto cortado a meio do chunk: lê mais e tenta de novo
+                if eof:
+                    raise
+            else:
+                yield row
+                continue
+        elif eof:
+            return
+
+        chunk = stream.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def detect_format(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'csv': 'csv', 'json': 'json', 'ndjson': 'json', 'jsonl': 'json'}.get(ext)
+
+
+def iter_rows(stream, format):
+    if format == 'csv':
+        return iter_csv_rows(stream)
+    if format == 'json':
+        return iter_json_rows(stream)
+    raise ValueError(f"Unsupported import format: {format}")
+
+
+def name_key(name):
+    """Chave de comparação dos nomes de slots: sem distinguir maiúsculas,
+    também fora do ASCII."""
+    return name.lower()
+
+
+def normalize_row(row):
+    """Devolve o dicionário com as colunas de Slot, ou None se faltar name/provider."""
+    row = {key.strip().lower(): value for key, value in row.items() if key}
+    name = (row.get('name') or '').strip()
+    provider = (row.get('provider') or '').strip()
+    if not name or not provider:
+        return None
+    values = {'name': name, 'provider': provider}
+    for column, normalize in NORMALIZERS.items():
+        values[column] = normalize(row.get(column))
+    return values
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed > 0 else 0
+
+    def to_dict(self):
+        return {
+            'read': self.read,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second),
+        }
+
+
+def _flush(batch, stats):
+    providers = resolve_providers({values['provider'] for values in batch.values()})
+    db.session.flush()
+
+    # Procura de uma vez os slots existentes com os mesmos nomes (usa o
+    # índice ix_slots_name_nocase) e separa inserts de updates. O NOCASE do
+    # SQLite só ignora maiúsculas em ASCII: os nomes com outros caracteres
+    # ("Ç"/"ç") são procurados entre os slots do mesmo provider (índice
+    # ix_slots_provider_id). Dos dois lados a chave é name_key()
+    names = list({values['name'] for values in batch.values()})
+    unicode_providers = list({providers[key].id for (_, key), values in batch.items() if not values['name'].isascii()})
+    condition = Slot.name.collate('NOCASE').in_(names)
+    if unicode_providers:
+        condition = or_(condition, Slot.provider_id.in_(unicode_providers))
+    existing = {}
+    for id, name, provider_id in db.session.execute(select(Slot.id, Slot.name, Slot.provider_id).where(condition)):
+        existing[(name_key(name), provider_id)] = id
+
+    inserts, updates = [], []
+    for (name, key), values in batch.items():
+        provider = providers[key]
+        values.update(provider=provider.name, provider_id=provider.id)
+        if (name, provider.id) in existing:
+            updates.append({'slot_id': existing[(name, provider.id)], **{f'new_{c}': values[c] for c in UPDATABLE_COLUMNS}})
+        else:
+            inserts.append(values)
+
+    if inserts:
+        db.session.execute(insert(Slot), inserts)
+    if updates:
+        # Valores em falta no ficheiro não apagam os que já existem
+        db.session.execute(
+            update(Slot.__table__)
+            .where(Slot.__table__.c.id == bindparam('slot_id'))
+            .values({c: func.coalesce(bindparam(f'new_{c}'), Slot.__table__.c[c]) for c in UPDATABLE_COLUMNS}),
+            updates
+        )
+    db.session.commit()
+    stats.inserted += len(inserts)
+    stats.updated += len(updates)
+
+
+def import_slots(rows, batch_size=BATCH_SIZE):
+    """Faz upsert por (name, provider) das linhas de `rows`, em lotes."""
+    stats = ImportStats()
+    batch = {}
+    try:
+        for row in rows:
+            stats.read += 1
+            values = normalize_row(row)
+            if values is None:
+                stats.skipped += 1
+                continue
+            # Linhas repetidas dentro do mesmo lote: fica a última
+            batch[(name_key(values['name']), provider_key(values['provider']))] = values
+            if len(batch) >= batch_size:
+                _flush(batch, stats)
+                batch = {}
+        if batch:
+            _flush(batch, stats)
+    except Exception:
+        db.session.rollback()
+        raise
+    return stats
+
+
+def import_file(stream, format, batch_size=BATCH_SIZE):
+    """`stream` pode ser binário (upload) ou texto (ficheiro aberto)."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return import_slots(iter_rows(stream, format), batch_size=batch_size)
@@ -0,0 +1,97 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON da app (jsonify, |tojson, stream do hunt ativo).
+#
+# Com o orjson instalado (e JSON_ORJSON ligado) a serialização é feita por
+# ele; sem ele usa-se o json da biblioteca padrão com as mesmas regras:
+# Decimal -> float, datetime/date -> ISO 8601 e floats não finitos (inf,
+# nan) -> null, que é o que o orjson faz e o que JSON.parse aceita.
+
+
+def json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+def _finite(obj):
+    # Só usado quando o json padrão encontra um inf/nan: o caso normal não
+    # percorre o objeto
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    if isinstance(obj, Decimal):
+        return _finite(float(obj))
+    return obj
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(json_default)
+
+    # Argumentos do json.dumps que o orjson consegue reproduzir, com alguns
+    # valores apenas (ver _orjson_option); com outros argumentos ou valores
+    # (ou com objetos que o orjson recusa, como ints acima de 64 bits)
+    # usa-se o json padrão
+    ORJSON_KWARGS = {'sort_keys', 'indent', 'separators', 'ensure_ascii'}
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get('JSON_ORJSON', True)
+
+    def _orjson_option(self, sort_keys=None, indent=None, separators=None, ensure_ascii=False):
+        # O orjson não escapa o que não é ASCII, só indenta com 2 espaços e
+        # usa sempre os separadores compactos (ou ': ' com indentação)
+        if ensure_ascii or indent not in (None, 2):
+            return None
+        if separators is not None and tuple(separators) != ((',', ': ') if indent else (',', ':')):
+            return None
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and kwargs.keys() <= self.ORJSON_KWARGS:
+            option = self._orjson_option(**kwargs)
+            if option is not None:
+                try:
+                    return orjson.dumps(obj, default=json_default, option=option).decode()
+                except TypeError:
+                    pass
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs['allow_nan'] = False
+        try:
+            return json.dumps(obj, **kwargs)
+        except ValueError:
+            return json.dumps(_finite(obj), **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            # Bytes diretamente para a resposta, sem passar por str
+            option = self._orjson_option(indent=2 if indent else None)
+            data = orjson.dumps(obj, default=json_default, option=option) + b'\n'
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(data, mimetype=self.mimetype)
@@ -1,10 +1,15 @@
 from app import db
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func, case
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, func, case, select, update, delete, text
+from sqlalchemy.orm import relationship, aliased, selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.hybrid import hybrid_property
 from decimal import Decimal
 from flask import url_for
-import math
+from app.images import thumbnail_or_original
+from app.hunt_stats import stats_for, invalidate_stats
+from datetime import datetime
+
+MELHORES_PIORES = ('best_bonus_x', 'best_bonus_euro', 'worst_bonus_x', 'worst_bonus_euro')
 
 class BonusHunt(db.Model):
     __tablename__ = 'bonus_hunts'
@@ -12,93 +17,164 @@ class BonusHunt(db.Model):
     id = Column(Integer, primary_key=True)
     nome = Column(String, nullable=False)
     custo_inicial = Column(Float, nullable=False)
-    data_criacao = Column(DateTime, default=func.current_timestamp())
-    is_active = Column(db.Boolean, default=False)
-    bonus_atual_id = Column(db.Integer, db.ForeignKey('bonuses.id'), nullable=True)
+    data_criacao = Column(DateTime, default=func.current_timestamp(), index=True)
+    is_active = Column(db.Boolean, default=False, index=True)
+    bonus_atual_id = Column(db.Integer, db.ForeignKey('bonuses.id', ondelete='SET NULL'), nullable=True)
+    # Incrementada a cada alteração do hunt ou dos seus bónus (ver
+    # app/hunt_stats.py); os clientes usam-na para aplicar só as diferenças
+    revisao = Column(Integer, nullable=False, default=0, server_default='0')
+    # Preenchida ao fechar o hunt: a partir daí é servido do HuntSnapshot
+    fechado_em = Column(DateTime, nullable=True)
 
-    bonuses = relationship('Bonus', back_populates='hunt', cascade='all, delete-orphan', foreign_keys='Bonus.hunt_id')
+    # Ordem de inserção: as estatísticas dependem dela (último saldo_restante, desempates)
+    # Os bónus são apagados pela base de dados (ON DELETE CASCADE)
+    bonuses = relationship('Bonus', back_populates='hunt', cascade='all, delete-orphan', foreign_keys='Bonus.hunt_id',
+                           order_by='Bonus.id', passive_deletes=True)
     bonus_atual = relationship('Bonus', foreign_keys=[bonus_atual_id], post_update=True)
+    snapshot = relationship('HuntSnapshot', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
+
+    # No máximo um hunt ativo
+    __table_args__ = (
+        Index('ux_bonus_hunts_active', 'is_active', unique=True, sqlite_where=text('is_active = 1')),
+    )
 
     def __init__(self, nome, custo_inicial):
         self.nome = nome
         self.custo_inicial = custo_inicial
 
+    @classmethod
+    def com_bonus(cls):
+        """Query que carrega os bónus e os respetivos slots de uma vez, em vez
+        de um SELECT por bónus ao serializar ou ao renderizar o hunt."""
+        return cls.query.options(selectinload(cls.bonuses).joinedload(Bonus.slot))
+
+    def carregar_bonus(self):
+        """O mesmo que com_bonus() para um hunt já carregado (p. ex. depois de
+        ver se está fechado)."""
+        bonuses = Bonus.query.options(joinedload(Bonus.slot)).filter(Bonus.hunt_id == self.id).order_by(Bonus.id).all()
+        set_committed_value(self, 'bonuses', bonuses)
+        return self
+
+    # As operações seguintes são um só UPDATE/DELETE na base de dados, sem
+    # carregar os bónus. Não passam pelo flush, por isso incrementam a revisão
+    # no próprio SQL; o HuntStats em cache deixa de bater com a revisão e é
+    # reconstruído. O commit fica para quem chama.
+
     def set_active(self):
-        # Desativar todos os outros hunts
-        db.session.query(BonusHunt).update({'is_active': False})
-        # Ativar o hunt atual
+        # Só o hunt que estava ativo muda
+        db.session.execute(
+            update(BonusHunt).where(BonusHunt.is_active.is_(True), BonusHunt.id != self.id)
+            .values(is_active=False, revisao=BonusHunt.revisao + 1)
+        )
         self.is_active = True
-        db.session.commit()
-
-    def calcular_estatisticas(self):
-        total_ganho = sum(b.payout for b in self.bonuses if b.payout is not None)
-        total_apostas = sum(b.aposta for b in self.bonuses)
-        num_bonus = len(self.bonuses)
-        num_bonus_abertos = sum(1 for b in self.bonuses if b.payout is not None)
-        
-        saldo_restante = self.custo_inicial - total_apostas
-        for bonus in self.bonuses:
-            if bonus.saldo_restante is not None:
-                saldo_restante = bonus.saldo_restante
-        
-        investimento = self.custo_inicial - saldo_restante
-        media_aposta_inicial = total_apostas / num_bonus if num_bonus > 0 else 0
-        break_even_x_inicial = int(investimento / media_aposta_inicial) if media_aposta_inicial > 0 else float('inf')
-        break_even_euro_inicial = int(investimento / num_bonus) if num_bonus > 0 else investimento
-
-        bonuses_nao_abertos = [b for b in self.bonuses if b.payout is None]
-        total_apostas_nao_abertas = sum(b.aposta for b in bonuses_nao_abertos)
-        num_bonus_nao_abertos = len(bonuses_nao_abertos)
-
-        media_aposta = total_apostas_nao_abertas / num_bonus_nao_abertos if num_bonus_nao_abertos > 0 else 0
-        valor_restante = investimento - total_ganho
-        break_even_x = int(valor_restante / media_aposta) if total_apostas_nao_abertas > 0 else math.inf
-        break_even_euro = int(valor_restante / num_bonus_nao_abertos) if num_bonus_nao_abertos > 0 else 0
-
-        bonuses_abertos = [b for b in self.bonuses if b.payout is not None]
-        avg_x = int(sum(b.multiplicador for b in bonuses_abertos) / len(bonuses_abertos)) if bonuses_abertos else 0
-        avg_euro = int(sum(b.payout for b in bonuses_abertos) / len(bonuses_abertos)) if bonuses_abertos else 0
-
-        best_x = max(bonuses_abertos, key=lambda b: b.multiplicador) if bonuses_abertos else None
-        best_euro = max(bonuses_abertos, key=lambda b: b.payout) if bonuses_abertos else None
-        worst_x = min(bonuses_abertos, key=lambda b: b.multiplicador) if bonuses_abertos else None
-        worst_euro = min(bonuses_abertos, key=lambda b: b.payout) if bonuses_abertos else None
 
-        return {
-            'custo_inicial': self.custo_inicial,
-            'saldo_restante': saldo_restante,
-            'investimento': investimento,
-            'total_ganho': total_ganho,
-            'lucro_prejuizo': total_ganho - investimento,
-            'num_bonus': num_bonus,
-            'num_bonus_abertos': num_bonus_abertos,
-            'num_bonus_nao_abertos': num_bonus - num_bonus_abertos,
-            'media_aposta_inicial': media_aposta_inicial,
-            'media_aposta': media_aposta,
-            'break_even_x_inicial': break_even_x_inicial,
-            'break_even_euro_inicial': break_even_euro_inicial,
-            'break_even_x': break_even_x,
-            'break_even_euro': break_even_euro,
-            'avg_x': avg_x,
-            'avg_euro': avg_euro,
-            'best_bonus_x': best_x.to_dict() if best_x else None,
-            'best_bonus_euro': best_euro.to_dict() if best_euro else None,
-            'worst_bonus_x': worst_x.to_dict() if worst_x else None,
-            'worst_bonus_euro': worst_euro.to_dict() if worst_euro else None,
-        }
+    def reset_payouts(self):
+        db.session.execute(update(Bonus).where(Bonus.hunt_id == self.id).values(payout=None))
+        db.session.execute(update(BonusHunt).where(BonusHunt.id == self.id).values(revisao=BonusHunt.revisao + 1))
+
+    def apagar(self):
+        # Os bónus vão com o hunt (ON DELETE CASCADE)
+        db.session.execute(delete(BonusHunt).where(BonusHunt.id == self.id))
+        invalidate_stats(self.id)
+
+    @property
+    def fechado(self):
+        return self.fechado_em is not None
+
+    def etag(self):
+        # A revisão muda com qualquer alteração ao hunt, incluindo fechar/reabrir
+        return f'hunt-{self.id}-{self.revisao}'
+
+    def fechar(self):
+        """Congela os bónus e as estatísticas finais. Até ser reaberto, o hunt
+        é servido do snapshot, sem recalcular nada."""
+        self.bonus_atual_id = None
+        dados = self.to_dict(external=False)
+        self.snapshot = HuntSnapshot(bonuses=dados['bonuses'], estatisticas=dados['estatisticas'])
+        self.fechado_em = datetime.now()
+        invalidate_stats(self.id)
+
+    def reabrir(self):
+        self.snapshot = None
+        self.fechado_em = None
 
-    def to_dict(self):
-        estatisticas = self.calcular_estatisticas()
-        
-        def handle_infinite(value):
-            if isinstance(value, float):
-                if math.isinf(value) or value > 1e300:
-                    return "Infinity"
-                return value
-            return value
+    def calcular_estatisticas(self, serializar_bonus=True, cache=True):
+        # Os agregados são mantidos de forma incremental (app/hunt_stats.py)
+        # em vez de percorrer todos os bónus a cada pedido.
+        # serializar_bonus=False devolve só o id dos melhores/piores bónus
+        # (sem to_dict(), que precisa de um pedido para os URLs das imagens)
+        # cache=False não guarda o hunt na cache (p. ex. numa exportação)
+        estatisticas = stats_for(self, cache=cache)
+        if serializar_bonus:
+            # Os (até) quatro bónus e os seus slots numa só query
+            ids = {estatisticas[key] for key in MELHORES_PIORES} - {None}
+            bonuses = {bonus.id: bonus for bonus in db.session.scalars(
+                select(Bonus).options(joinedload(Bonus.slot)).where(Bonus.id.in_(ids))
+            )} if ids else {}
+            for key in MELHORES_PIORES:
+                if estatisticas[key] is not None:
+                    estatisticas[key] = bonuses[estatisticas[key]].to_dict()
+        return estatisticas
 
-        estatisticas = {k: handle_infinite(v) for k, v in estatisticas.items()}
+    @staticmethod
+    def calcular_resumos(hunts):
+        """Investimento, total ganho e nº de bónus de vários hunts numa só query.
 
+        Usado na listagem, onde calcular_estatisticas() por hunt obrigava a
+        carregar os bónus de cada um (1 + N queries).
+        """
+        # Os hunts fechados vêm do snapshot
+        fechados = [hunt.id for hunt in hunts if hunt.fechado]
+        snapshots = dict(db.session.execute(
+            select(HuntSnapshot.hunt_id, HuntSnapshot.estatisticas).where(HuntSnapshot.hunt_id.in_(fechados))
+        ).all()) if fechados else {}
+
+        hunt_ids = [hunt.id for hunt in hunts if not hunt.fechado]
+        totais = select(
+            Bonus.hunt_id,
+            func.sum(Bonus.aposta).label('total_apostas'),
+            func.sum(Bonus.payout).label('total_ganho'),
+            func.count(Bonus.id).label('num_bonus'),
+            func.count(Bonus.payout).label('num_bonus_abertos'),
+            # O saldo_restante que conta é o do último bónus que o tem
+            func.max(case((Bonus.saldo_restante.isnot(None), Bonus.id))).label('ultimo_saldo_id'),
+        ).where(Bonus.hunt_id.in_(hunt_ids)).group_by(Bonus.hunt_id).subquery()
+        ultimo_saldo = aliased(Bonus)
+        rows = db.session.execute(
+            select(totais, ultimo_saldo.saldo_restante)
+            .outerjoin(ultimo_saldo, ultimo_saldo.id == totais.c.ultimo_saldo_id)
+        ) if hunt_ids else ()
+        rows = {row.hunt_id: row for row in rows}
+
+        resumos = {}
+        for hunt in hunts:
+            if hunt.id in snapshots:
+                estatisticas = snapshots[hunt.id]
+                resumos[hunt.id] = {key: estatisticas[key] for key in ('investimento', 'total_ganho', 'num_bonus', 'num_bonus_abertos')}
+                continue
+            row = rows.get(hunt.id)
+            total_apostas = row.total_apostas if row else 0
+            saldo_restante = row.saldo_restante if row and row.saldo_restante is not None else hunt.custo_inicial - total_apostas
+            resumos[hunt.id] = {
+                'investimento': hunt.custo_inicial - saldo_restante,
+                'total_ganho': (row.total_ganho or 0) if row else 0,
+                'num_bonus': row.num_bonus if row else 0,
+                'num_bonus_abertos': row.num_bonus_abertos if row else 0,
+            }
+        return resumos
+
+    def to_dict(self, external=True):
+        if self.fechado:
+            # O snapshot tem URLs relativos: é gerado uma vez e serve qualquer host
+            bonuses, estatisticas = self.snapshot.bonuses, self.snapshot.estatisticas
+        else:
+            bonuses = [b.to_dict(external=external) for b in self.bonuses]
+            # Os melhores/piores bónus já estão na lista, sem mais queries
+            por_id = {bonus['id']: bonus for bonus in bonuses}
+            # Os break-even infinitos saem como null (ver app/json_provider.py)
+            estatisticas = self.calcular_estatisticas(serializar_bonus=False)
+            for key in MELHORES_PIORES:
+                estatisticas[key] = por_id.get(estatisticas[key])
         return {
             'id': self.id,
             'nome': self.nome,
@@ -106,16 +182,32 @@ class BonusHunt(db.Model):
             'data_criacao': self.data_criacao.isoformat(),
             'is_active': self.is_active,
             'bonus_atual_id': self.bonus_atual_id,
-            'bonuses': [b.to_dict() for b in self.bonuses],
+            'revisao': self.revisao,
+            'fechado_em': self.fechado_em.isoformat() if self.fechado_em else None,
+            'bonuses': bonuses,
             'estatisticas': estatisticas
         }
 
+    def to_delta(self, bonuses=(), removidos=()):
+        """Resposta das alterações de bónus: só os bónus alterados, os ids
+        removidos e as estatísticas novas, em vez do hunt inteiro."""
+        return {
+            'id': self.id,
+            'custo_inicial': self.custo_inicial,
+            'is_active': self.is_active,
+            'bonus_atual_id': self.bonus_atual_id,
+            'revisao': self.revisao,
+            'bonuses': [b.to_dict() for b in bonuses],
+            'removidos': list(removidos),
+            'estatisticas': self.calcular_estatisticas()
+        }
+
 class Bonus(db.Model):
     __tablename__ = 'bonuses'
 
     id = Column(Integer, primary_key=True)
-    slot_id = Column(Integer, ForeignKey('slots.id'), nullable=False)
-    hunt_id = Column(Integer, ForeignKey('bonus_hunts.id'), nullable=False)
+    slot_id = Column(Integer, ForeignKey('slots.id'), nullable=False, index=True)
+    hunt_id = Column(Integer, ForeignKey('bonus_hunts.id', ondelete='CASCADE'), nullable=False, index=True)
     aposta = Column(Float, nullable=False)
     payout = Column(Float, nullable=True)
     saldo_restante = Column(Float, nullable=True)
@@ -138,7 +230,9 @@ class Bonus(db.Model):
             else_=0
         )
 
-    def to_dict(self):
+    def to_dict(self, external=True):
+        # external=False gera URLs relativos, para quando não há um pedido
+        # de onde tirar o host (ver app/hunt_events.py)
         return {
             'id': self.id,
             'aposta': float(self.aposta) if self.aposta is not None else None,
@@ -151,6 +245,16 @@ class Bonus(db.Model):
                 'id': self.slot.id,
                 'name': self.slot.name,
                 'provider': self.slot.provider,
-                'image': url_for('static', filename=self.slot.image, _external=True) if self.slot.image else None
+                'image': url_for('static', filename=self.slot.image, _external=external) if self.slot.image else None,
+                'thumbnail': url_for('static', filename=thumbnail_or_original(self.slot.image), _external=external) if self.slot.image else None
             } if self.slot else None
-        }
\ No newline at end of file
+        }
+
+class HuntSnapshot(db.Model):
+    """Estado final de um hunt fechado: a lista de bónus e as estatísticas
+    serializadas (o mesmo que BonusHunt.to_dict())."""
+    __tablename__ = 'bonus_hunt_snapshots'
+
+    hunt_id = Column(Integer, ForeignKey('bonus_hunts.id', ondelete='CASCADE'), primary_key=True)
+    bonuses = Column(db.JSON, nullable=False)
+    estatisticas = Column(db.JSON, nullable=False)
\ No newline at end of file
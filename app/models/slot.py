@@ -1,5 +1,6 @@
 from app import db
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, ForeignKey
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 class Slot(db.Model):
@@ -7,7 +8,11 @@ class Slot(db.Model):
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
+    # Nome canónico do provider (providers.name), mantido aqui para o índice
+    # FTS5 e para ordenar pelo índice; a referência é provider_id (ver
+    # app/providers.py)
     provider = Column(String, nullable=False)
+    provider_id = Column(Integer, ForeignKey('providers.id'))
     rtp = Column(Float)
     volatility = Column(Integer)
     potential = Column(Float)
@@ -17,5 +22,92 @@ class Slot(db.Model):
     creation_date = Column(DateTime, default=func.current_timestamp())
     active = Column(Boolean, default=True)
 
+    provider_ref = relationship('Provider')
+    # Histórico dos bónus abertos deste slot (ver app/slot_stats.py)
+    stats = relationship('SlotStats', uselist=False, viewonly=True)
+
+    # Índices para as ordenações de list_slots; o id entra como desempate
+    # para a paginação por cursor. name/provider são ordenados sem
+    # distinção de maiúsculas (COLLATE NOCASE).
+    __table_args__ = (
+        Index('ix_slots_name_nocase', name.collate('NOCASE'), id),
+        Index('ix_slots_provider_nocase', provider.collate('NOCASE'), id),
+        Index('ix_slots_rtp', rtp, id),
+        Index('ix_slots_volatility', volatility, id),
+        Index('ix_slots_potential', potential, id),
+        Index('ix_slots_best_x', best_x, id),
+        Index('ix_slots_best_euro', best_euro, id),
+        Index('ix_slots_creation_date', creation_date, id),
+        Index('ix_slots_provider_id', provider_id, id),
+    )
+
+    def __repr__(self):
+        return f'<Slot {self.name}>'
+
+
+class Provider(db.Model):
+    """Provider normalizado: variantes do mesmo nome ("PearFiction", "Pear
+    Fiction Studios") partilham a mesma `key` e a mesma linha."""
+    __tablename__ = 'providers'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    key = Column(String, nullable=False, unique=True)
+    # Nº de slots do provider, mantido por triggers na tabela slots
+    slot_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        Index('ix_providers_name_nocase', name.collate('NOCASE')),
+    )
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'slot_count': self.slot_count}
+
+    def __repr__(self):
+        return f'<Provider {self.name}>'
+
+
+class SlotStats(db.Model):
+    """Resumo dos bónus abertos de um slot, em todos os hunts.
+
+    Mantido pelos triggers da tabela bonuses (app/slot_stats.py); só existe
+    uma linha para slots com pelo menos um bónus aberto.
+    """
+    __tablename__ = 'slot_stats'
+
+    slot_id = Column(Integer, ForeignKey('slots.id', ondelete='CASCADE'), primary_key=True)
+    times_played = Column(Integer, nullable=False)
+    total_bet = Column(Float, nullable=False)
+    total_paid = Column(Float, nullable=False)
+    # total_paid / total_bet
+    avg_x = Column(Float)
+    max_x = Column(Float)
+    min_x = Column(Float)
+    # Data do hunt mais recente em que o slot foi aberto
+    last_played = Column(DateTime)
+
+    # Para ordenar a lista de slots por estas colunas
+    __table_args__ = (
+        Index('ix_slot_stats_times_played', times_played, slot_id),
+        Index('ix_slot_stats_total_bet', total_bet, slot_id),
+        Index('ix_slot_stats_total_paid', total_paid, slot_id),
+        Index('ix_slot_stats_avg_x', avg_x, slot_id),
+        Index('ix_slot_stats_max_x', max_x, slot_id),
+        Index('ix_slot_stats_min_x', min_x, slot_id),
+        Index('ix_slot_stats_last_played', last_played, slot_id),
+    )
+
+    def __repr__(self):
+        return f'<SlotStats {self.slot_id}>'
+
+
+class CatalogVersion(db.Model):
+    """Versão do catálogo de slots: uma só linha, incrementada pelos triggers
+    de slots e slot_stats (app/catalog.py)."""
+    __tablename__ = 'catalog_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+
     def __repr__(self):
-        return f'<Slot {self.name}>'
\ No newline at end of file
+        return f'<CatalogVersion {self.version}>'
\ No newline at end of file
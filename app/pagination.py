@@ -0,0 +1,144 @@
+from app import db
+from sqlalchemy import String, and_, func, literal, select, tuple_, type_coerce
+from collections import OrderedDict
+from datetime import datetime
+import base64
+import json
+import math
+import threading
+import time
+
+# Contagens em cache por filtro, para que páginas em modo cursor não
+# precisem de um COUNT(*) a cada pedido. A chave leva o texto pesquisado,
+# por isso a cache é uma LRU de COUNT_CACHE_SIZE entradas e as expiradas
+# saem a cada inserção.
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 256
+_count_cache = OrderedDict()
+_count_lock = threading.Lock()
+
+
+def encode_cursor(value, id):
+    if isinstance(value, datetime):
+        # Mesmo formato de texto que o SQLite guarda (CURRENT_TIMESTAMP)
+        value = value.isoformat(' ')
+    raw = json.dumps([value, id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado ou que não é de uma página desta ordenação."""
+
+
+def _cursor_types(column):
+    # Tipos que encode_cursor produz para os valores de `column`
+    if isinstance(column.type, (db.String, db.DateTime)):
+        return (str,)
+    if isinstance(column.type, (db.Integer, db.Float, db.Numeric)):
+        return (int, float)
+    return (str, int, float)
+
+
+def decode_cursor(cursor, column=None):
+    """(valor, id) de um cursor de encode_cursor. O valor tem de ser do tipo
+    de `column`: uma lista ou um objeto chegariam ao SQL como bind."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    types = _cursor_types(column) if column is not None else (str, int, float)
+    if not isinstance(id, int) or isinstance(id, bool):
+        raise InvalidCursor('Invalid cursor')
+    if value is not None and (not isinstance(value, types) or isinstance(value, bool)
+                              or isinstance(value, float) and not math.isfinite(value)):
+        raise InvalidCursor('Invalid cursor')
+    return value, id
+
+
+def cached_count(query, key):
+    """COUNT(*) de `query`, reutilizado durante COUNT_CACHE_TTL segundos."""
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and now - cached[1] < COUNT_CACHE_TTL:
+            _count_cache.move_to_end(key)
+            return cached[0]
+    total = db.session.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    ).scalar()
+    with _count_lock:
+        for expired in [k for k, (_, at) in _count_cache.items() if now - at >= COUNT_CACHE_TTL]:
+            del _count_cache[expired]
+        _count_cache[key] = (total, now)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+
+def invalidate_count_cache():
+    with _count_lock:
+        _count_cache.clear()
+
+
+def _segments(column, value, id_column, id, descending, collation=None):
+    # Condições das linhas depois do cursor, pela ordem do SQLite (NULLs
+    # primeiro em ASC e por último em DESC). Cada uma é uma query à parte:
+    # a comparação por row value, (coluna, id) > (valor, id), é um SEARCH no
+    # índice (coluna, id), o que um OR com o ramo dos NULLs impediria. O
+    # COLLATE vai no valor: na coluna, o SQLite não usa o índice NOCASE.
+    if value is None:
+        if descending:
+            return [and_(column.is_(None), id_column < id)]
+        return [and_(column.is_(None), id_column > id), column.isnot(None)]
+    bound = literal(value).collate(collation) if collation else literal(value)
+    if descending:
+        return [tuple_(column, id_column) < tuple_(bound, id), column.is_(None)]
+    return [tuple_(column, id_column) > tuple_(bound, id)]
+
+
+class KeysetPage:
+    """Página obtida por keyset (cursor) em vez de OFFSET.
+
+    O custo de cada página é o de ler `per_page + 1` linhas a partir do
+    índice, independentemente de quão fundo se está na listagem.
+    `value` lê o valor de ordenação de uma linha, quando `column` não é um
+    atributo da própria linha (p. ex. uma coluna de uma tabela em join).
+    Um cursor inválido levanta InvalidCursor.
+    """
+
+    def __init__(self, query, column, id_column, descending, per_page, cursor=None, total=None, collation=None,
+                 value=None):
+        self.per_page = per_page
+        self.total = total
+        self.cursor = cursor
+
+        sort_column = column.collate(collation) if collation else column
+        compare_column = column
+        if isinstance(column.type, db.DateTime):
+            # Comparar como texto: o bind de um datetime leva microssegundos
+            # e deixaria de bater com os valores guardados pelo SQLite.
+            compare_column = type_coerce(column, String)
+
+        if descending:
+            query = query.order_by(sort_column.desc(), id_column.desc())
+        else:
+            query = query.order_by(sort_column.asc(), id_column.asc())
+
+        decoded = decode_cursor(cursor, column) if cursor else None
+        if decoded is None:
+            rows = query.limit(per_page + 1).all()
+        else:
+            rows = []
+            for condition in _segments(compare_column, decoded[0], id_column, decoded[1], descending, collation):
+                rows += query.filter(condition).limit(per_page + 1 - len(rows)).all()
+                if len(rows) > per_page:
+                    break
+        self.items = rows[:per_page]
+        self.has_next = len(rows) > per_page
+        self.next_cursor = None
+        if self.has_next:
+            last = self.items[-1]
+            sort_value = value(last) if value else getattr(last, column.key)
+            self.next_cursor = encode_cursor(sort_value, getattr(last, id_column.key))
@@ -0,0 +1,127 @@
+from app import db
+from app.models.slot import Slot, Provider
+from sqlalchemy import event, func, select, text, update
+from sqlalchemy.orm import Session, attributes
+import re
+
+# Providers normalizados (tabela providers).
+#
+# Cada nome é reduzido a uma chave (minúsculas, só letras e números, sem
+# sufixos genéricos como "Gaming" ou "Studios"), por isso "PearFiction" e
+# "Pear Fiction Studios" são o mesmo provider. Os slots guardam o provider_id
+# e, em slots.provider, o nome canónico. Ao gravar um slot pelo ORM o
+# provider é resolvido no flush; o importador resolve-os por lote.
+#
+# providers.slot_count é mantido por triggers na tabela slots e serve as
+# facetas e o autocomplete sem contar slots a cada pedido.
+
+GENERIC_SUFFIXES = {'gaming', 'games', 'studio', 'studios', 'entertainment', 'technologies', 'interactive'}
+
+COUNT_TRIGGERS_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_count_ai AFTER INSERT ON slots BEGIN
+        UPDATE providers SET slot_count = slot_count + 1 WHERE id = new.provider_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_count_ad AFTER DELETE ON slots BEGIN
+        UPDATE providers SET slot_count = slot_count - 1 WHERE id = old.provider_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_count_au AFTER UPDATE OF provider_id ON slots BEGIN
+        UPDATE providers SET slot_count = slot_count - 1 WHERE id = old.provider_id;
+        UPDATE providers SET slot_count = slot_count + 1 WHERE id = new.provider_id;
+    END
+    """,
+]
+
+COUNT_TRIGGERS_DROP = [
+    "DROP TRIGGER IF EXISTS providers_count_ai",
+    "DROP TRIGGER IF EXISTS providers_count_ad",
+    "DROP TRIGGER IF EXISTS providers_count_au",
+]
+
+
+def provider_key(name):
+    words = re.findall(r'[a-z0-9]+', name.lower())
+    while len(words) > 1 and words[-1] in GENERIC_SUFFIXES:
+        words.pop()
+    return ''.join(words) or name.strip().lower()
+
+
+def resolve_providers(names, session=None):
+    """Devolve {chave: Provider} para os nomes dados, criando os que faltam."""
+    session = session or db.session
+    names = {provider_key(name): name.strip() for name in names}
+    providers = {provider.key: provider for provider in session.scalars(
+        select(Provider).where(Provider.key.in_(list(names)))
+    )} if names else {}
+    for key, name in names.items():
+        if key not in providers:
+            providers[key] = Provider(name=name, key=key)
+            session.add(providers[key])
+    return providers
+
+
+@event.listens_for(Session, 'before_flush')
+def _resolve_slot_providers(session, flush_context, instances):
+    slots = [obj for obj in session.new if isinstance(obj, Slot)]
+    slots += [obj for obj in session.dirty if isinstance(obj, Slot)
+              and attributes.get_history(obj, 'provider').has_changes()]
+    slots = [slot for slot in slots if slot.provider]
+    if not slots:
+        return
+    with session.no_autoflush:
+        providers = resolve_providers({slot.provider for slot in slots}, session)
+    for slot in slots:
+        provider = providers[provider_key(slot.provider)]
+        slot.provider_ref = provider
+        slot.provider = provider.name
+
+
+def provider_filter(query):
+    """Condição sobre Slot equivalente a procurar `query` no nome do provider,
+    resolvida na tabela providers (pequena) em vez de percorrer os slots."""
+    ids = select(Provider.id).where(func.lower(Provider.name).like(f"%{query.lower()}%"))
+    return Slot.provider_id.in_(ids)
+
+
+def provider_facets(query='', limit=None):
+    """Providers com slots, do que tem mais para o que tem menos."""
+    stmt = select(Provider).where(Provider.slot_count > 0).order_by(Provider.slot_count.desc(), Provider.name)
+    if query:
+        stmt = stmt.where(func.lower(Provider.name).like(f"%{query.lower()}%"))
+    if limit:
+        stmt = stmt.limit(limit)
+    return db.session.scalars(stmt).all()
+
+
+def create_count_triggers(connection):
+    for statement in COUNT_TRIGGERS_DDL:
+        connection.execute(text(statement))
+
+
+def drop_count_triggers(connection):
+    for statement in COUNT_TRIGGERS_DROP:
+        connection.execute(text(statement))
+
+
+def rebuild_providers():
+    """Liga ao provider os slots que ainda não o têm, (re)cria os triggers e
+    recalcula as contagens. Devolve o número de providers com slots."""
+    orphans = db.session.execute(select(Slot.id, Slot.provider).where(Slot.provider_id.is_(None))).all()
+    if orphans:
+        providers = resolve_providers({provider for _, provider in orphans})
+        db.session.flush()
+        db.session.execute(update(Slot), [
+            {'id': id, 'provider_id': providers[provider_key(name)].id, 'provider': providers[provider_key(name)].name}
+            for id, name in orphans
+        ])
+    db.session.commit()
+    with db.engine.begin() as connection:
+        create_count_triggers(connection)
+        connection.execute(text(
+            "UPDATE providers SET slot_count = (SELECT count(*) FROM slots WHERE slots.provider_id = providers.id)"
+        ))
+        return connection.execute(text("SELECT count(*) FROM providers WHERE slot_count > 0")).scalar()
@@ -0,0 +1,127 @@
+from app import db
+from app.models.slot import Slot
+from sqlalchemy import bindparam, case, func, select, text, literal_column
+
+# Índice FTS5 com tokenizer trigram sobre name/provider da tabela slots.
+# Como é uma tabela "external content", o texto não é duplicado: o índice
+# guarda apenas os trigramas e aponta para slots.id através do rowid.
+FTS_TABLE = 'slots_fts'
+
+# Com o tokenizer trigram, termos com menos de 3 caracteres não produzem
+# nenhum trigrama, por isso essas pesquisas continuam a usar o LIKE.
+MIN_FTS_QUERY_LENGTH = 3
+
+SEARCH_INDEX_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, provider,
+        content='slots', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON slots BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, provider) VALUES (new.id, new.name, new.provider);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON slots BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, provider) VALUES ('delete', old.id, old.name, old.provider);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, provider ON slots BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, provider) VALUES ('delete', old.id, old.name, old.provider);
+        INSERT INTO {FTS_TABLE}(rowid, name, provider) VALUES (new.id, new.name, new.provider);
+    END
+    """,
+]
+
+SEARCH_INDEX_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+_index_ready = False
+
+
+def create_search_index(connection):
+    """Cria a tabela FTS5 e os triggers que a mantêm sincronizada com slots."""
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection):
+    for statement in SEARCH_INDEX_DROP:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index():
+    """(Re)cria o índice e repopula-o a partir do conteúdo atual de slots."""
+    global _index_ready
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    _index_ready = True
+
+
+def search_index_ready():
+    # Só guardamos o resultado positivo: assim que alguém correr
+    # `flask slots reindex` o índice passa a ser usado sem reiniciar a app.
+    global _index_ready
+    if not _index_ready:
+        _index_ready = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+    return _index_ready
+
+
+def _fts_phrase(column, query):
+    # Uma frase entre aspas com o tokenizer trigram faz match por substring.
+    # As aspas do próprio termo têm de ser duplicadas.
+    return '{%s} : "%s"' % (column, query.replace('"', '""'))
+
+
+def slot_filter(column, query):
+    """Condição equivalente a `lower(Slot.<column>) LIKE '%query%'`.
+
+    Usa o índice FTS5 quando está disponível e o termo é longo o suficiente
+    para gerar trigramas; caso contrário recorre ao LIKE sobre a tabela slots.
+    """
+    if len(query) >= MIN_FTS_QUERY_LENGTH and search_index_ready():
+        matches = select(literal_column('rowid')) \
+            .select_from(text(FTS_TABLE)) \
+            .where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(
+                bindparam('fts_query', _fts_phrase(column, query), unique=True)))
+        return Slot.id.in_(matches)
+    return func.lower(getattr(Slot, column)).contains(query.lower(), autoescape=True)
+
+
+def search_slots_ranked(query, limit=10):
+    """Devolve até `limit` slots com nomes distintos que contêm `query`.
+
+    A deduplicação por nome (case-insensitive), a ordenação
+    (exato > prefixo > substring) e o LIMIT são feitos na base de dados: o
+    SQLite continua a ler e a ordenar todos os matches, mas só as linhas
+    que vão para a resposta chegam ao Python.
+    """
+    q = query.lower()
+    name_lower = func.lower(Slot.name)
+    rank = case((name_lower == q, 0), (name_lower.startswith(q, autoescape=True), 1), else_=2)
+
+    # De cada grupo de nomes iguais fica o slot com o id mais baixo (o mesmo
+    # que a deduplicação antiga mantinha): row_number() escolhe a linha e as
+    # colunas vêm todas dela
+    row = func.row_number().over(partition_by=name_lower, order_by=(rank, Slot.id)).label('row')
+    ranked = select(Slot.id, Slot.name, Slot.provider, Slot.image, rank.label('rank'),
+                    name_lower.label('name_lower'), row) \
+        .where(slot_filter('name', query)) \
+        .subquery()
+    stmt = select(ranked.c.id, ranked.c.name, ranked.c.provider, ranked.c.image) \
+        .where(ranked.c.row == 1) \
+        .order_by(ranked.c.rank, ranked.c.name_lower) \
+        .limit(limit)
+    return db.session.execute(stmt).all()
@@ -0,0 +1,122 @@
+from app import db
+from sqlalchemy import text
+
+# Resumo por slot (tabela slot_stats) dos bónus já abertos em todos os hunts:
+# vezes jogado, total apostado/pago, multiplicador médio, melhor, pior e
+# data do último hunt.
+#
+# É mantido por triggers na tabela bonuses, por isso apanha as alterações
+# feitas pelo ORM, pelo SQL em massa (reset/apagar hunt) e pelo ON DELETE
+# CASCADE. Cada bónus que entra soma-se à linha do slot; um bónus que sai
+# subtrai-se e só quando era o melhor/pior (ou o mais recente) é que esses
+# valores voltam a ser lidos dos bónus do slot (pelo índice de slot_id).
+# `flask slots rollup` reconstrói tudo de uma vez.
+
+STATS_TABLE = 'slot_stats'
+
+
+def _multiplier(row):
+    # Mesma regra que Bonus.multiplicador
+    return f"CASE WHEN {row}.aposta <> 0 THEN {row}.payout / {row}.aposta ELSE 0 END"
+
+
+def _hunt_date(row):
+    return f"(SELECT data_criacao FROM bonus_hunts WHERE id = {row}.hunt_id)"
+
+
+def _add(row):
+    return f"""
+        INSERT INTO {STATS_TABLE} (slot_id, times_played, total_bet, total_paid, avg_x, max_x, min_x, last_played)
+        SELECT {row}.slot_id, 1, {row}.aposta, {row}.payout, {row}.payout / nullif({row}.aposta, 0),
+               {_multiplier(row)}, {_multiplier(row)}, {_hunt_date(row)}
+        WHERE {row}.payout IS NOT NULL
+        ON CONFLICT (slot_id) DO UPDATE SET
+            times_played = times_played + 1,
+            total_bet = total_bet + excluded.total_bet,
+            total_paid = total_paid + excluded.total_paid,
+            avg_x = (total_paid + excluded.total_paid) / nullif(total_bet + excluded.total_bet, 0),
+            max_x = max(max_x, excluded.max_x),
+            min_x = min(min_x, excluded.min_x),
+            last_played = coalesce(max(last_played, excluded.last_played), last_played, excluded.last_played);
+    """
+
+
+def _remove(row):
+    return f"""
+        UPDATE {STATS_TABLE} SET
+            times_played = times_played - 1,
+            total_bet = total_bet - {row}.aposta,
+            total_paid = total_paid - {row}.payout,
+            avg_x = (total_paid - {row}.payout) / nullif(total_bet - {row}.aposta, 0)
+        WHERE slot_id = {row}.slot_id AND {row}.payout IS NOT NULL;
+        UPDATE {STATS_TABLE} SET (max_x, min_x, last_played) = (
+            SELECT max({_multiplier('b')}), min({_multiplier('b')}), max(h.data_criacao)
+            FROM bonuses b LEFT JOIN bonus_hunts h ON h.id = b.hunt_id
+            WHERE b.slot_id = {row}.slot_id AND b.payout IS NOT NULL
+        )
+        WHERE slot_id = {row}.slot_id AND {row}.payout IS NOT NULL AND (
+            max_x = {_multiplier(row)} OR min_x = {_multiplier(row)}
+            OR NOT EXISTS (SELECT 1 FROM bonus_hunts WHERE id = {row}.hunt_id AND data_criacao < last_played)
+        );
+        DELETE FROM {STATS_TABLE} WHERE slot_id = {row}.slot_id AND times_played <= 0;
+    """
+
+
+STATS_TRIGGERS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_ai AFTER INSERT ON bonuses BEGIN
+        {_add('new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_ad AFTER DELETE ON bonuses BEGIN
+        {_remove('old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_au AFTER UPDATE OF slot_id, hunt_id, aposta, payout ON bonuses BEGIN
+        {_remove('old')}
+        {_add('new')}
+    END
+    """,
+]
+
+STATS_TRIGGERS_DROP = [
+    f"DROP TRIGGER IF EXISTS {STATS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {STATS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {STATS_TABLE}_au",
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {STATS_TABLE}",
+    f"""
+    INSERT INTO {STATS_TABLE} (slot_id, times_played, total_bet, total_paid, avg_x, max_x, min_x, last_played)
+    SELECT b.slot_id, count(*), sum(b.aposta), sum(b.payout), sum(b.payout) / nullif(sum(b.aposta), 0),
+           max({_multiplier('b')}), min({_multiplier('b')}), max(h.data_criacao)
+    FROM bonuses b LEFT JOIN bonus_hunts h ON h.id = b.hunt_id
+    WHERE b.payout IS NOT NULL
+    GROUP BY b.slot_id
+    """,
+]
+
+
+def create_stats_triggers(connection):
+    for statement in STATS_TRIGGERS_DDL:
+        connection.execute(text(statement))
+
+
+def drop_stats_triggers(connection):
+    for statement in STATS_TRIGGERS_DROP:
+        connection.execute(text(statement))
+
+
+def rebuild_slot_stats():
+    """(Re)cria os triggers e recalcula slot_stats a partir de todos os bónus.
+
+    Devolve o número de slots com histórico.
+    """
+    with db.engine.begin() as connection:
+        create_stats_triggers(connection)
+        for statement in REBUILD_SQL:
+            connection.execute(text(statement))
+        return connection.execute(text(f"SELECT count(*) FROM {STATS_TABLE}")).scalar()
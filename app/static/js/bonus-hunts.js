@@ -1,3 +1,7 @@
+// Revisão do hunt que está na página: as respostas trazem só as diferenças
+// (delta) e a revisão nova; se faltar alguma, pede-se o estado completo.
+let huntRevision = null;
+
 document.addEventListener('DOMContentLoaded', function () {
     // Funções comuns a todas as páginas
     setupCreateHuntForm();
@@ -14,6 +18,8 @@ document.addEventListener('DOMContentLoaded', function () {
                const huntData = JSON.parse(document.getElementById('hunt-data').textContent);
                updateStatistics(huntData);
                updateBonusTable(huntData);
+               huntRevision = huntData.revisao;
+               loadProjection(huntData.id);
     //    setupSlotSearch();
     //    setupBonusActions();
     //    setupSaveBonusEdit();
@@ -199,6 +205,12 @@ function setupBonusActions() {
                 handlePayoutInput(e);
             }
         });
+
+        bonusTable.addEventListener('paste', function (e) {
+            if (e.target.classList.contains('payout-input')) {
+                handlePayoutPaste(e);
+            }
+        });
     }
 }
 
@@ -241,7 +253,7 @@ function activateBonus(bonusId) {
         })
         .then(data => {
             if (data.success) {
-                updateBonusTable(data.hunt);
+                applyHuntDelta(data.delta);
                 focusPayoutInput(bonusId);
             } else {
                 throw new Error(data.error || 'Unknown error occurred');
@@ -263,7 +275,7 @@ function deactivateBonus(bonusId) {
         })
         .then(data => {
             if (data.success) {
-                updateBonusTable(data.hunt);
+                applyHuntDelta(data.delta);
             } else {
                 throw new Error(data.error || 'Unknown error occurred');
             }
@@ -320,8 +332,7 @@ function updatePayout(bonusId, payout) {
     })
     .then(data => {
         if (data.success) {
-            updateBonusTable(data.hunt);
-            updateStatistics(data.hunt);
+            applyHuntDelta(data.delta);
             if (data.next_bonus_id) {
                 activateBonus(data.next_bonus_id);
             }
@@ -335,38 +346,188 @@ function updatePayout(bonusId, payout) {
     });
 }
 
+// Valor colado ("1.234,56 €", "1,234.56", "250") no formato que o servidor
+// aceita ("1234.56"): o último separador seguido de 1 ou 2 dígitos é o
+// decimal, os outros pontos/vírgulas são separadores de milhares.
+function parsePastedAmount(text) {
+    const value = text.replace(/[€\s]/g, '');
+    const match = value.match(/^(.*)[.,](\d{1,2})$/);
+    if (match) {
+        return match[1].replace(/[.,]/g, '') + '.' + match[2];
+    }
+    return value.replace(/[.,]/g, '');
+}
+
+// Colar uma coluna de payouts no campo do bónus ativo: a primeira linha vai
+// para esse bónus e as seguintes para os próximos bónus ainda sem payout,
+// pela ordem da tabela. Tudo num só pedido.
+function handlePayoutPaste(e) {
+    const lines = (e.clipboardData || window.clipboardData).getData('text')
+        .split(/\r?\n/)
+        .map(parsePastedAmount)
+        .filter(line => line !== '');
+    if (lines.length < 2) {
+        return;
+    }
+    e.preventDefault();
+
+    const bonusId = e.target.dataset.bonusId;
+    const rows = Array.from(document.querySelectorAll('#bonus-table tbody tr'));
+    const start = rows.findIndex(row => row.dataset.bonusId === bonusId);
+    const targets = [bonusId].concat(rows.slice(start + 1)
+        .filter(row => row.querySelector('.payout-cell').textContent.trim() === '')
+        .map(row => row.dataset.bonusId));
+
+    if (lines.length > targets.length) {
+        alert(`Pasted ${lines.length} payouts but only ${targets.length} bonuses are left to open`);
+        return;
+    }
+    updatePayouts(lines.map((payout, i) => ({ bonus_id: targets[i], payout: payout })));
+}
+
+function updatePayouts(bonuses) {
+    const huntId = document.querySelector('.bonus-hunt-view').dataset.huntId;
+    fetch(`/bonus-hunts/${huntId}/payouts`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: JSON.stringify({ bonuses: bonuses })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            applyHuntDelta(data.delta);
+            if (data.next_bonus_id) {
+                activateBonus(data.next_bonus_id);
+            }
+        } else {
+            throw new Error(data.error || 'Unknown error occurred');
+        }
+    })
+    .catch(error => {
+        console.error('Error updating payouts:', error);
+        alert('Error updating payouts: ' + error.message);
+    });
+}
+
 // Função para atualizar a tabela de bônus
 function updateBonusTable(hunt) {
     const rows = document.querySelectorAll('#bonus-table tbody tr');
+    const bonuses = new Map(hunt.bonuses.map(b => [b.id.toString(), b]));
     rows.forEach(row => {
-        const bonusId = row.dataset.bonusId;
-        const bonus = hunt.bonuses.find(b => b.id.toString() === bonusId);
+        const bonus = bonuses.get(row.dataset.bonusId);
         if (bonus) {
-            const isActive = bonus.id === hunt.bonus_atual_id;
-            row.classList.toggle('active-bonus', isActive);
-            const playButton = row.querySelector('.play-bonus-btn');
-            playButton.classList.toggle('btn-outline-success', !isActive);
-            playButton.classList.toggle('btn-success', isActive);
-
-            row.querySelector('td:nth-child(3)').textContent = formatCurrency(bonus.aposta);
-
-            const payoutCell = row.querySelector('.payout-cell');
-            if (isActive) {
-                payoutCell.innerHTML = `<input type="number" step="0.01" name="payout" value="${bonus.payout !== null ? formatNumber(bonus.payout) : ''}" class="form-control payout-input" data-bonus-id="${bonus.id}">`;
-                const payoutInput = payoutCell.querySelector('.payout-input');
-                payoutInput.addEventListener('keydown', handlePayoutInput);
-            } else {
-                payoutCell.textContent = bonus.payout !== null ? formatCurrency(bonus.payout) : '';
-            }
-
-            row.querySelector('td:nth-child(5)').textContent = bonus.payout !== null ? formatMultiplier(bonus.multiplicador) : '';
-            row.querySelector('td:nth-child(6)').textContent = bonus.nota || '';
-            row.querySelector('td:nth-child(7)').textContent = bonus.padrinho || '';
+            updateBonusRow(row, bonus, hunt.bonus_atual_id);
+            bonuses.delete(row.dataset.bonusId);
+        } else {
+            row.remove();
         }
     });
+    bonuses.forEach(bonus => {
+        appendNewBonusRow(bonus);
+        updateBonusRow(document.querySelector(`tr[data-bonus-id="${bonus.id}"]`), bonus, hunt.bonus_atual_id);
+    });
     updateStatistics(hunt);
 }
 
+function updateBonusRow(row, bonus, bonusAtualId) {
+    const isActive = bonus.id === bonusAtualId;
+    row.classList.toggle('active-bonus', isActive);
+    // Hunts fechados não têm botões de ações
+    const playButton = row.querySelector('.play-bonus-btn');
+    if (playButton) {
+        playButton.classList.toggle('btn-outline-success', !isActive);
+        playButton.classList.toggle('btn-success', isActive);
+    }
+
+    row.querySelector('td:nth-child(3)').textContent = formatCurrency(bonus.aposta);
+
+    const payoutCell = row.querySelector('.payout-cell');
+    if (isActive) {
+        payoutCell.innerHTML = `<input type="number" step="0.01" name="payout" value="${bonus.payout !== null ? formatNumber(bonus.payout) : ''}" class="form-control payout-input" data-bonus-id="${bonus.id}" title="Paste a column of payouts to fill the next bonuses">`;
+        const payoutInput = payoutCell.querySelector('.payout-input');
+        payoutInput.addEventListener('keydown', handlePayoutInput);
+    } else {
+        payoutCell.textContent = bonus.payout !== null ? formatCurrency(bonus.payout) : '';
+    }
+
+    row.querySelector('td:nth-child(5)').textContent = bonus.payout !== null ? formatMultiplier(bonus.multiplicador) : '';
+    row.querySelector('td:nth-child(6)').textContent = bonus.nota || '';
+    row.querySelector('td:nth-child(7)').textContent = bonus.padrinho || '';
+}
+
+// Aplica a resposta de uma alteração: só as linhas dos bónus alterados ou
+// removidos e as estatísticas. Com uma revisão em falta (alteração feita
+// noutro separador, por exemplo) pede o estado completo.
+function applyHuntDelta(delta) {
+    if (huntRevision !== null && delta.revisao <= huntRevision) {
+        return;
+    }
+    if (huntRevision !== null && delta.revisao !== huntRevision + 1) {
+        refreshHunt(delta.id);
+        return;
+    }
+
+    delta.removidos.forEach(bonusId => removeBonusRow(bonusId));
+    delta.bonuses.forEach(bonus => {
+        let row = document.querySelector(`tr[data-bonus-id="${bonus.id}"]`);
+        if (!row) {
+            appendNewBonusRow(bonus);
+            row = document.querySelector(`tr[data-bonus-id="${bonus.id}"]`);
+        }
+        updateBonusRow(row, bonus, delta.bonus_atual_id);
+    });
+    updateStatistics(delta);
+    huntRevision = delta.revisao;
+    loadProjection(delta.id);
+}
+
+function refreshHunt(huntId) {
+    fetch(`/bonus-hunts/${huntId}/data`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(hunt => {
+            updateBonusTable(hunt);
+            huntRevision = hunt.revisao;
+            loadProjection(hunt.id);
+        })
+        .catch(error => {
+            console.error('Error refreshing hunt:', error);
+        });
+}
+
+
+// Projeção do resultado final (só em hunts abertos); o servidor guarda-a em
+// cache por revisão, por isso pedir de novo sem alterações é barato.
+function loadProjection(huntId) {
+    if (!document.getElementById('projection-card')) {
+        return;
+    }
+    fetch(`/bonus-hunts/${huntId}/projection`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                document.getElementById('projection-profit').textContent = 'N/A';
+                document.getElementById('projection-percentiles').textContent = 'N/A';
+                document.getElementById('projection-info').textContent = data.error;
+                return;
+            }
+            document.getElementById('projection-profit').textContent = formatNumber(data.probabilidade_lucro * 100) + '%';
+            document.getElementById('projection-percentiles').textContent =
+                `${formatCurrency(data.p10)} / ${formatCurrency(data.p50)} / ${formatCurrency(data.p90)}`;
+            document.getElementById('projection-info').textContent =
+                `${data.bonus_por_abrir} bonuses left, ${data.simulacoes} simulations`;
+        })
+        .catch(error => {
+            console.error('Error loading projection:', error);
+        });
+}
 
 function activateNextBonus(hunt) {
     const nextBonus = hunt.bonuses.find(b => b.payout === null);
@@ -405,8 +566,7 @@ function handleAddBonus(e) {
         .then(({ data, isJson }) => {
             if (isJson) {
                 if (data.success) {
-                    updateBonusTable(data.hunt);
-                    appendNewBonusRow(data.newBonus);
+                    applyHuntDelta(data.delta);
                     form.reset();
                 } else {
                     throw new Error(data.error || 'Unknown error occurred');
@@ -471,9 +631,7 @@ function deleteBonus(bonusId) {
     })
     .then(data => {
         if (data.success) {
-            updateBonusTable(data.hunt);
-            updateStatistics(data.hunt);
-            removeBonusRow(bonusId);
+            applyHuntDelta(data.delta);
             console.log('Bonus deleted and UI updated.');
         } else {
             throw new Error(data.error || 'Unknown error occurred');
@@ -509,8 +667,7 @@ function setupSaveBonusEdit() {
             })
             .then(data => {
                 if (data.success) {
-                    updateBonusTable(data.hunt);
-                    updateStatistics(data.hunt);
+                    applyHuntDelta(data.delta);
                     $('#editBonusModal').modal('hide');
                 } else {
                     throw new Error(data.error || 'Unknown error occurred');
@@ -535,9 +692,9 @@ function updateStatistics(hunt) {
     document.getElementById('num-bonus-abertos').textContent = hunt.estatisticas.num_bonus_abertos;
     document.getElementById('media-aposta-inicial').textContent = formatCurrency(hunt.estatisticas.media_aposta_inicial);
     document.getElementById('media-aposta').textContent = formatCurrency(hunt.estatisticas.media_aposta);
-    document.getElementById('break-even-x-inicial').textContent = formatMultiplier(hunt.estatisticas.break_even_x_inicial);
+    document.getElementById('break-even-x-inicial').textContent = formatBreakEven(hunt.estatisticas.break_even_x_inicial);
     document.getElementById('break-even-euro-inicial').textContent = formatCurrency(hunt.estatisticas.break_even_euro_inicial);
-    document.getElementById('break-even-x').textContent = formatMultiplier(hunt.estatisticas.break_even_x);
+    document.getElementById('break-even-x').textContent = formatBreakEven(hunt.estatisticas.break_even_x);
     document.getElementById('break-even-euro').textContent = formatCurrency(hunt.estatisticas.break_even_euro);
     document.getElementById('avg-x').textContent = formatMultiplier(hunt.estatisticas.avg_x);
     document.getElementById('avg-euro').textContent = formatCurrency(hunt.estatisticas.avg_euro);
@@ -555,6 +712,11 @@ function formatMultiplier(value) {
     return value != null ? value.toFixed(0) + 'x' : '';
 }
 
+// Break-even sem bónus por abrir é infinito: o JSON traz null
+function formatBreakEven(value) {
+    return value === null ? '∞' : formatMultiplier(value);
+}
+
 // Função de formatação de número atualizada
 function formatNumber(value, decimals = 1) {
     return value != null ? Number(value).toFixed(decimals) : '';
@@ -581,7 +743,7 @@ function appendNewBonusRow(bonus) {
             <td>${bonusTable.children.length + 1}</td>
             <td>
                 <div style="display: flex; align-items: center;">
-                    <img src="${bonus.slot.image}" alt="${bonus.slot.name}" style="width: 50px; height: 50px; margin-right: 10px;" />
+                    <img src="${bonus.slot.thumbnail || bonus.slot.image}" alt="${bonus.slot.name}" style="width: 50px; height: 50px; margin-right: 10px;" />
                     <div>
                         ${bonus.slot.name}<br>
                         <small><i>${bonus.slot.provider}</i></small>
@@ -657,7 +819,7 @@ function setupSlotSearch() {
                             suggestionItem.className = 'list-group-item list-group-item-action';
                             suggestionItem.innerHTML = `
                                 <div style="display: flex; align-items: center;">
-                                    <img class="lazyload" data-src="${slot.image}" alt="${slot.name}" style="width: 50px; height: 50px; margin-right: 10px;" />
+                                    <img class="lazyload" data-src="${slot.thumbnail || slot.image}" alt="${slot.name}" style="width: 50px; height: 50px; margin-right: 10px;" />
                                     <div>
                                         <span>${slot.name}</span><br>
                                         <small><i>${slot.provider}</i></small>
@@ -232,7 +232,8 @@ function deleteSlot(id) {
 function search() {
     const searchName = document.getElementById('search_name').value;
     const searchProvider = document.getElementById('search_provider').value;
-    window.location.href = `/slots?search_name=${encodeURIComponent(searchName)}&search_provider=${encodeURIComponent(searchProvider)}`;
+    const providerId = document.getElementById('provider_id').value;
+    window.location.href = `/slots?search_name=${encodeURIComponent(searchName)}&search_provider=${encodeURIComponent(searchProvider)}&provider_id=${encodeURIComponent(providerId)}`;
 }
 
 
@@ -1,7 +1,80 @@
-from flask import json
-from decimal import Decimal
+import math
+import re
 
-def custom_json_encoder(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
\ No newline at end of file
+def clean_value(value, remove_char=''):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Remove o símbolo especificado, como 'x'
+        value = value.strip().strip(remove_char)
+        if value in ('', '-'):
+            return None
+        
+        # Remove todos os caracteres não numéricos, exceto ponto
+        value = re.sub(r'[^\d.]', '', value)
+
+        # Se houver mais de um ponto, remova o primeiro ponto
+        if value.count('.') > 1:
+            value = re.sub(r'\.(?=.*\.)', '', value)
+
+        # Identifica a posição do ponto
+        point_index = value.find('.')
+
+        if point_index != -1:
+            # Se o ponto estiver a uma ou duas casas do final, é uma casa decimal
+            if len(value) - point_index <= 3:
+                # Arredonda para o valor inteiro mais próximo
+                value = str(math.ceil(float(value)))
+            else:
+                # Remove o ponto de milhar
+                value = value.replace('.', '')
+
+        try:
+            # Converte para número inteiro
+            return int(value)
+        except ValueError:
+            print(f"Não foi possível converter '{value}' para int. Definindo como None.")
+            return None
+    return value
+
+# Número simples, como o str() de um float ("2500.5", "0.9648"): o formato
+# da exportação (app/exporter.py) e o que os formulários aceitam
+PLAIN_NUMBER = re.compile(r'^-?\d+(\.\d+)?$')
+
+def clean_number(value, remove_char=''):
+    """Como clean_value, mas os números (e o texto de um número simples)
+    ficam como estão, sem arredondar: exportar e voltar a importar não muda
+    os valores."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and PLAIN_NUMBER.match(value.strip()):
+        text = value.strip()
+        return float(text) if '.' in text else int(text)
+    return clean_value(value, remove_char)
+
+def clean_rtp(value):
+    """RTP como fração (0.965). Valores até 1 já são uma fração e ficam como
+    estão; os maiores são percentagens ("96.5%", "96,5") e são divididos por
+    100, sem arredondar."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        text = value.strip().rstrip('%').strip().replace(',', '.')
+        if text in ('', '-'):
+            return None
+        try:
+            value = float(text)
+        except ValueError:
+            value = clean_value(text)
+            if value is None:
+                return None
+    return value if value <= 1 else value / 100
+
+def clean_volatility(value):
+    if value is None or value == '':
+        return None
+    try:
+        return int(float(str(value).split('/')[0]))
+    except ValueError:
+        print(f"Não foi possível converter volatilidade '{value}' para int. Definindo como None.")
+        return None
\ No newline at end of file
@@ -1,10 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify, make_response, current_app
 from app import db
+from app.assets import asset_version
 from app.models.bonus_hunt import BonusHunt, Bonus
 from app.models.slot import Slot
+from app.exporter import export_table, export_response, FORMATS as EXPORT_FORMATS
+from app.hunt_events import stream_active_hunt
+from app.projection import project
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+import click
 
-bonus_hunts = Blueprint('bonus_hunts', __name__)
+bonus_hunts = Blueprint('bonus_hunts', __name__, cli_group='bonus-hunts')
 
 @bonus_hunts.route('/create', methods=['POST'])
 def create_hunt():
@@ -48,12 +54,7 @@ def delete_hunt(id):
             if hunt.is_active:
                 return jsonify({'success': False, 'error': 'Cannot delete an active Bonus Hunt'}), 400
             
-            # Delete all associated bonuses first
-            for bonus in hunt.bonuses:
-                db.session.delete(bonus)
-            
-            # Now delete the hunt
-            db.session.delete(hunt)
+            hunt.apagar()
             db.session.commit()
             
             return jsonify({'success': True, 'message': 'Bonus Hunt deleted successfully'})
@@ -66,12 +67,7 @@ def delete_hunt(id):
             if hunt.is_active:
                 flash('Cannot delete an active Bonus Hunt', 'error')
             else:
-                # Delete all associated bonuses first
-                for bonus in hunt.bonuses:
-                    db.session.delete(bonus)
-                
-                # Now delete the hunt
-                db.session.delete(hunt)
+                hunt.apagar()
                 db.session.commit()
                 flash('Bonus Hunt deleted successfully', 'success')
         except SQLAlchemyError as e:
@@ -81,16 +77,130 @@ def delete_hunt(id):
     
 @bonus_hunts.route('/')
 def list_hunts():
-    hunts = BonusHunt.query.order_by(BonusHunt.data_criacao.desc()).all()
-    for hunt in hunts:
-        hunt.estatisticas = hunt.calcular_estatisticas()
-    return render_template('bonus_hunts/list.html', hunts=hunts)
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+    pagination = BonusHunt.query.order_by(BonusHunt.data_criacao.desc(), BonusHunt.id.desc()) \
+                                .paginate(page=page, per_page=per_page, error_out=False)
+    # Os totais da página vêm de uma única query agregada, em vez de
+    # carregar os bónus de cada hunt
+    resumos = BonusHunt.calcular_resumos(pagination.items)
+    for hunt in pagination.items:
+        hunt.estatisticas = resumos[hunt.id]
+    return render_template('bonus_hunts/list.html', hunts=pagination.items, pagination=pagination)
+
+@bonus_hunts.route('/export')
+def export_hunts():
+    format = request.args.get('format', 'ndjson')
+    if format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Unsupported export format, use ndjson or csv'}), 400
+    return export_response('bonus_hunts', format)
+
+@bonus_hunts.route('/bonuses/export')
+def export_bonuses():
+    format = request.args.get('format', 'ndjson')
+    if format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Unsupported export format, use ndjson or csv'}), 400
+    return export_response('bonuses', format)
+
+def closed_hunt_response(hunt, render, page=True):
+    # Um hunt fechado só muda quando é reaberto: responde do snapshot e com
+    # ETag, para o browser/OBS revalidar sem voltar a descarregar a página.
+    # A página (não o JSON) também muda com um build novo dos JS/CSS
+    # (app/assets.py)
+    etag = f'{hunt.etag()}-{asset_version()}' if page else hunt.etag()
+    # Comparação fraca: a compressão (app/compression.py) marca a ETag como fraca
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+def closed_hunt_error(hunt):
+    return jsonify({'success': False, 'error': 'This Bonus Hunt is closed, reopen it to make changes'}), 400
 
 @bonus_hunts.route('/<int:id>')
 def view_hunt(id):
     hunt = BonusHunt.query.get_or_404(id)
-    hunt.estatisticas = hunt.calcular_estatisticas()
-    return render_template('bonus_hunts/view.html', hunt=hunt)
+    if hunt.fechado:
+        return closed_hunt_response(hunt, lambda: render_template('bonus_hunts/view.html', hunt=hunt, dados=hunt.to_dict(external=False)))
+    hunt.carregar_bonus()
+    return render_template('bonus_hunts/view.html', hunt=hunt, dados=hunt.to_dict(external=False))
+
+@bonus_hunts.route('/active/stream')
+def active_hunt_stream():
+    # Server-Sent Events com o estado do hunt ativo, para os overlays.
+    # O EventSource reenvia o último id recebido ao voltar a ligar.
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(stream_active_hunt(last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bonus_hunts.route('/<int:id>/data')
+def hunt_data(id):
+    # Estado completo, usado pelo cliente quando falha uma revisão
+    hunt = BonusHunt.query.get_or_404(id)
+    if hunt.fechado:
+        return closed_hunt_response(hunt, lambda: jsonify(hunt.to_dict()), page=False)
+    return jsonify(hunt.carregar_bonus().to_dict())
+
+@bonus_hunts.route('/<int:id>/projection')
+def hunt_projection(id):
+    # Simulação dos bónus por abrir; em cache até o hunt mudar de revisão
+    hunt = BonusHunt.query.get_or_404(id)
+    simulations = request.args.get('simulations', type=int)
+    if simulations is not None and not 1 <= simulations <= current_app.config['PROJECTION_MAX_SIMULATIONS']:
+        return jsonify({'success': False, 'error': f"simulations must be between 1 and {current_app.config['PROJECTION_MAX_SIMULATIONS']}"}), 400
+    projecao = project(hunt, simulations)
+    if projecao is None:
+        return jsonify({'success': False, 'error': 'No opened bonuses yet to base the projection on'}), 400
+    return jsonify({'success': True, **projecao})
+
+@bonus_hunts.route('/<int:id>/close', methods=['POST'])
+def close_hunt(id):
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        try:
+            hunt = BonusHunt.query.get_or_404(id)
+            if not hunt.fechado:
+                hunt.carregar_bonus().fechar()
+                db.session.commit()
+            return jsonify({'success': True})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+    else:
+        try:
+            hunt = BonusHunt.query.get_or_404(id)
+            if not hunt.fechado:
+                hunt.carregar_bonus().fechar()
+                db.session.commit()
+            flash('Bonus Hunt closed successfully', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error closing Bonus Hunt: {str(e)}', 'error')
+        return redirect(url_for('bonus_hunts.view_hunt', id=id))
+
+@bonus_hunts.route('/<int:id>/reopen', methods=['POST'])
+def reopen_hunt(id):
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        try:
+            hunt = BonusHunt.query.get_or_404(id)
+            hunt.reabrir()
+            db.session.commit()
+            return jsonify({'success': True})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 500
+    else:
+        try:
+            hunt = BonusHunt.query.get_or_404(id)
+            hunt.reabrir()
+            db.session.commit()
+            flash('Bonus Hunt reopened successfully', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error reopening Bonus Hunt: {str(e)}', 'error')
+        return redirect(url_for('bonus_hunts.view_hunt', id=id))
 
 @bonus_hunts.route('/<int:id>/activate', methods=['POST'])
 def activate_hunt(id):
@@ -119,8 +229,9 @@ def reset_hunt(id):
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         try:
             hunt = BonusHunt.query.get_or_404(id)
-            for bonus in hunt.bonuses:
-                bonus.payout = None
+            if hunt.fechado:
+                return closed_hunt_error(hunt)
+            hunt.reset_payouts()
             db.session.commit()
             return jsonify({'success': True})
         except Exception as e:
@@ -129,8 +240,10 @@ def reset_hunt(id):
     else:
         try:
             hunt = BonusHunt.query.get_or_404(id)
-            for bonus in hunt.bonuses:
-                bonus.payout = None
+            if hunt.fechado:
+                flash('Cannot reset a closed Bonus Hunt', 'error')
+                return redirect(url_for('bonus_hunts.list_hunts'))
+            hunt.reset_payouts()
             db.session.commit()
             flash('Bonus Hunt reset successfully', 'success')
         except Exception as e:
@@ -143,8 +256,12 @@ def edit_hunt(id):
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         try:
             hunt = BonusHunt.query.get_or_404(id)
+            custo_inicial = float(request.form['custo_inicial'])
+            # O nome pode mudar; o saldo inicial entra nas estatísticas do snapshot
+            if hunt.fechado and custo_inicial != hunt.custo_inicial:
+                return closed_hunt_error(hunt)
             hunt.nome = request.form['nome']
-            hunt.custo_inicial = float(request.form['custo_inicial'])
+            hunt.custo_inicial = custo_inicial
             db.session.commit()
             return jsonify({'success': True, 'message': 'Bonus Hunt updated successfully'})
         except Exception as e:
@@ -154,8 +271,12 @@ def edit_hunt(id):
         # Handle non-AJAX request
         try:
             hunt = BonusHunt.query.get_or_404(id)
+            custo_inicial = float(request.form['custo_inicial'])
+            if hunt.fechado and custo_inicial != hunt.custo_inicial:
+                flash('Cannot change the starting balance of a closed Bonus Hunt', 'error')
+                return redirect(url_for('bonus_hunts.list_hunts'))
             hunt.nome = request.form['nome']
-            hunt.custo_inicial = float(request.form['custo_inicial'])
+            hunt.custo_inicial = custo_inicial
             db.session.commit()
             flash('Bonus Hunt updated successfully', 'success')
         except Exception as e:
@@ -167,8 +288,10 @@ def edit_hunt(id):
 @bonus_hunts.route('/update_payout/<int:bonus_id>', methods=['POST'])
 def update_payout(bonus_id):
     try:
-        bonus = Bonus.query.get_or_404(bonus_id)
+        bonus = Bonus.query.options(joinedload(Bonus.hunt)).get_or_404(bonus_id)
         hunt = bonus.hunt
+        if hunt.fechado:
+            return closed_hunt_error(hunt)
         data = request.json
         payout = data.get('payout')
         
@@ -179,12 +302,12 @@ def update_payout(bonus_id):
         
         db.session.commit()
         
-        next_bonus = next((b for b in hunt.bonuses if b.payout is None and b.id != bonus.id), None)
+        next_bonus = Bonus.query.filter(Bonus.hunt_id == hunt.id, Bonus.payout.is_(None), Bonus.id != bonus.id) \
+                                .order_by(Bonus.id).first()
         
-        hunt.estatisticas = hunt.calcular_estatisticas()
         return jsonify({
             'success': True, 
-            'hunt': hunt.to_dict(),
+            'delta': hunt.to_delta([bonus]),
             'next_bonus_id': next_bonus.id if next_bonus else None
         })
     except ValueError as e:
@@ -193,9 +316,63 @@ def update_payout(bonus_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
 
+BATCH_FIELDS = ('payout', 'aposta', 'saldo_restante', 'nota')
+
+def _batch_value(field, value):
+    if field == 'nota':
+        return value
+    if field == 'aposta':
+        return float(value)
+    return None if value == '' or value is None else float(value)
+
+@bonus_hunts.route('/<int:id>/payouts', methods=['POST'])
+def update_payouts(id):
+    # Vários bónus de uma vez (p. ex. uma coluna de payouts colada): uma só
+    # transação, um só cálculo das estatísticas e um só delta
+    hunt = BonusHunt.query.get_or_404(id)
+    if hunt.fechado:
+        return closed_hunt_error(hunt)
+    try:
+        data = request.json
+        items = data.get('bonuses') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'Expected a non-empty list of bonuses'}), 400
+
+        ids = [int(item['bonus_id']) for item in items]
+        bonuses = {bonus.id: bonus for bonus in Bonus.query.filter(Bonus.hunt_id == hunt.id, Bonus.id.in_(ids))}
+        missing = [bonus_id for bonus_id in ids if bonus_id not in bonuses]
+        if missing:
+            return jsonify({'success': False, 'error': f'Bonus not found in this hunt: {missing}'}), 400
+
+        for bonus_id, item in zip(ids, items):
+            for field in BATCH_FIELDS:
+                if field in item:
+                    setattr(bonuses[bonus_id], field, _batch_value(field, item[field]))
+
+        db.session.commit()
+
+        # O commit expira os bónus: recarrega-os (e os slots) numa só query
+        alterados = Bonus.query.options(joinedload(Bonus.slot)).filter(Bonus.id.in_(bonuses)).order_by(Bonus.id).all()
+        next_bonus = Bonus.query.filter(Bonus.hunt_id == hunt.id, Bonus.payout.is_(None), Bonus.id.notin_(ids)) \
+                                .order_by(Bonus.id).first()
+
+        return jsonify({
+            'success': True,
+            'delta': hunt.to_delta(alterados),
+            'next_bonus_id': next_bonus.id if next_bonus else None
+        })
+    except (KeyError, TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'Invalid value: {str(e)}'}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
 @bonus_hunts.route('/<int:id>/add_bonus', methods=['POST'])
 def add_bonus(id):
     hunt = BonusHunt.query.get_or_404(id)
+    if hunt.fechado:
+        return closed_hunt_error(hunt)
     try:
         slot = Slot.query.get(request.form['slot_id'])
         if not slot:
@@ -212,13 +389,11 @@ def add_bonus(id):
         db.session.add(bonus)
         db.session.commit()
         
-        hunt.estatisticas = hunt.calcular_estatisticas()
-        
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return jsonify({
                 'success': True,
                 'newBonus': bonus.to_dict(),
-                'hunt': hunt.to_dict()
+                'delta': hunt.to_delta([bonus])
             })
         else:
             return redirect(url_for('bonus_hunts.view_hunt', id=hunt.id))
@@ -231,20 +406,26 @@ def add_bonus(id):
 @bonus_hunts.route('/delete_bonus/<int:bonus_id>', methods=['POST'])
 def delete_bonus(bonus_id):
     try:
-        bonus = Bonus.query.get_or_404(bonus_id)
+        bonus = Bonus.query.options(joinedload(Bonus.hunt)).get_or_404(bonus_id)
         hunt = bonus.hunt
+        if hunt.fechado:
+            return closed_hunt_error(hunt)
+        if hunt.bonus_atual_id == bonus.id:
+            hunt.bonus_atual_id = None
         db.session.delete(bonus)
         db.session.commit()
-        hunt.estatisticas = hunt.calcular_estatisticas()
-        return jsonify({'success': True, 'hunt': hunt.to_dict()})
-    except Exception as e:
+        return jsonify({'success': True, 'delta': hunt.to_delta(removidos=[bonus_id])})
+    except SQLAlchemyError as e:
         db.session.rollback()
-        
+        return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
 @bonus_hunts.route('/update_bonus/<int:bonus_id>', methods=['POST'])
 def update_bonus(bonus_id):
     try:
-        bonus = Bonus.query.get_or_404(bonus_id)
+        bonus = Bonus.query.options(joinedload(Bonus.hunt)).get_or_404(bonus_id)
         hunt = bonus.hunt
+        if hunt.fechado:
+            return closed_hunt_error(hunt)
         
         bonus.aposta = float(request.form['aposta'])
         bonus.saldo_restante = float(request.form['saldo_restante']) if request.form['saldo_restante'] else None
@@ -256,8 +437,7 @@ def update_bonus(bonus_id):
         # O multiplicador será calculado automaticamente pela propriedade híbrida
         
         db.session.commit()
-        hunt.estatisticas = hunt.calcular_estatisticas()
-        return jsonify({'success': True, 'hunt': hunt.to_dict()})
+        return jsonify({'success': True, 'delta': hunt.to_delta([bonus])})
     except ValueError as e:
         return jsonify({'success': False, 'error': f'Invalid value: {str(e)}'}), 400
     except SQLAlchemyError as e:
@@ -267,12 +447,16 @@ def update_bonus(bonus_id):
 @bonus_hunts.route('/activate_bonus/<int:bonus_id>', methods=['POST'])
 def activate_bonus(bonus_id):
     try:
-        bonus = Bonus.query.get_or_404(bonus_id)
+        bonus = Bonus.query.options(joinedload(Bonus.hunt)).get_or_404(bonus_id)
         hunt = bonus.hunt
+        if hunt.fechado:
+            return closed_hunt_error(hunt)
+        # O bónus que estava ativo também muda (perde o campo de payout)
+        anterior = hunt.bonus_atual
         hunt.bonus_atual_id = bonus.id
         db.session.commit()
-        hunt.estatisticas = hunt.calcular_estatisticas()
-        return jsonify({'success': True, 'hunt': hunt.to_dict()})
+        alterados = [anterior, bonus] if anterior is not None and anterior.id != bonus.id else [bonus]
+        return jsonify({'success': True, 'delta': hunt.to_delta(alterados)})
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
@@ -280,14 +464,24 @@ def activate_bonus(bonus_id):
 @bonus_hunts.route('/deactivate_bonus/<int:bonus_id>', methods=['POST'])
 def deactivate_bonus(bonus_id):
     try:
-        bonus = Bonus.query.get_or_404(bonus_id)
+        bonus = Bonus.query.options(joinedload(Bonus.hunt)).get_or_404(bonus_id)
         hunt = bonus.hunt
+        if hunt.fechado:
+            return closed_hunt_error(hunt)
         if hunt.bonus_atual_id == bonus.id:
             hunt.bonus_atual_id = None
             db.session.commit()
-        hunt.estatisticas = hunt.calcular_estatisticas()
-        return jsonify({'success': True, 'hunt': hunt.to_dict()})
+        return jsonify({'success': True, 'delta': hunt.to_delta([bonus])})
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
 
+
+@bonus_hunts.cli.command('export')
+@click.argument('table', type=click.Choice(['hunts', 'bonuses']), default='hunts')
+@click.option('--format', 'format', type=click.Choice(list(EXPORT_FORMATS)), default='ndjson', show_default=True)
+@click.option('-o', '--output', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default: stdout).')
+def export_command(table, format, output):
+    """Export the bonus hunts (with their statistics) or all bonuses as NDJSON or CSV."""
+    for chunk in export_table('bonus_hunts' if table == 'hunts' else 'bonuses', format):
+        output.write(chunk)
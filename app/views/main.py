@@ -1,7 +1,25 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify, current_app, abort
+from app import db
+from app.models.slot import Slot
+from sqlalchemy import select
 
 main = Blueprint('main', __name__)
 
 @main.route('/')
 def index():
-    return render_template('index.html')
\ No newline at end of file
+    return render_template('index.html')
+
+@main.route('/health')
+def health():
+    # Só com HEALTH_CHECK ligado: confirma que a base de dados responde e tem a tabela slots
+    if not current_app.config['HEALTH_CHECK']:
+        abort(404)
+    try:
+        db.session.execute(select(Slot.id).limit(1)).all()
+    except Exception as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.status_code = 503
+    else:
+        response = jsonify({'success': True, 'status': 'ok'})
+    response.cache_control.no_store = True
+    return response
\ No newline at end of file
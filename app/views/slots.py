@@ -1,53 +1,55 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
-from werkzeug.utils import secure_filename
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, abort
 import os
-import requests
+import time
+import click
 from app import db
-from app.models.slot import Slot
-from sqlalchemy import func
+from app.models.slot import Slot, SlotStats
+from app.search import slot_filter, search_slots_ranked, rebuild_search_index
+from app.pagination import KeysetPage, InvalidCursor, cached_count, invalidate_count_cache
+from app.catalog import cached_page, catalog_version
+from app.images import new_upload_path, store_image, queue_thumbnail, thumbnail_or_original, backfill_thumbnails
+from app.image_fetcher import queue_image_download
+from app.importer import import_file, detect_format
+from app.exporter import export_table, export_response, FORMATS as EXPORT_FORMATS
+from app.slot_stats import rebuild_slot_stats
+from app.providers import provider_filter, provider_facets, rebuild_providers
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
 import traceback
 
 slots = Blueprint('slots', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+SORTABLE_COLUMNS = {'name', 'provider', 'rtp', 'volatility', 'potential', 'best_x', 'best_euro', 'creation_date'}
+# Colunas do histórico dos bónus (tabela slot_stats, em LEFT JOIN)
+STATS_SORT_COLUMNS = {'times_played', 'total_bet', 'total_paid', 'avg_x', 'max_x', 'min_x', 'last_played'}
+# Colunas de texto ordenadas sem distinção de maiúsculas (ver índices em Slot)
+SORT_COLLATIONS = {'name': 'NOCASE', 'provider': 'NOCASE'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def download_image_from_url(url, filename):
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            with open(filename, 'wb') as file:
-                file.write(response.content)
-            return True
-        else:
-            print(f"Error downloading image: Status {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"Error downloading image: {e}")
-        return False
-
 def handle_image(slot, form):
+    """Trata do upload de imagem do formulário.
+
+    Devolve (url, extensão) quando a imagem vem de um image_link: o download
+    só é agendado depois do commit, quando o slot já tem id.
+    """
     if 'image' in request.files and request.files['image']:
         file = request.files['image']
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(current_app.root_path, 'static', 'images', 'slots', filename)
-            file.save(file_path)
-            slot.image = f'images/slots/{filename}'
+            upload_path = new_upload_path()
+            file.save(upload_path)
+            slot.image = store_image(upload_path, file.filename.rsplit('.', 1)[1])
+            queue_thumbnail(slot.image)
     elif 'image_link' in form and form['image_link']:
         image_link = form['image_link']
         ext = image_link.rsplit('.', 1)[1].lower()
         if ext in ALLOWED_EXTENSIONS:
-            filename = secure_filename(image_link.rsplit('/', 1)[1])
-            file_path = os.path.join(current_app.root_path, 'static', 'images', 'slots', filename)
-            if download_image_from_url(image_link, file_path):
-                slot.image = f'images/slots/{filename}'
-            else:
-                flash('Unable to download image from the provided link.', 'danger')
+            return image_link, ext
         else:
             flash('Unsupported image format.', 'danger')
+    return None
 
 @slots.route('/suggestions')
 def suggestions():
@@ -55,7 +57,7 @@ def suggestions():
     search_type = request.args.get('type', '')
 
     if search_type == 'name':
-        suggestions = Slot.query.filter(func.lower(Slot.name).like(f"%{query.lower()}%")) \
+        suggestions = Slot.query.filter(slot_filter('name', query)) \
                                 .with_entities(Slot.name) \
                                 .distinct() \
                                 .order_by(Slot.name) \
@@ -63,13 +65,8 @@ def suggestions():
                                 .all()
         suggestions = [s[0] for s in suggestions]
     elif search_type == 'provider':
-        suggestions = Slot.query.filter(func.lower(Slot.provider).like(f"%{query.lower()}%")) \
-                                .with_entities(Slot.provider) \
-                                .distinct() \
-                                .order_by(Slot.provider) \
-                                .limit(10) \
-                                .all()
-        suggestions = [s[0] for s in suggestions]
+        # Da tabela providers, com os que têm mais slots primeiro
+        suggestions = [provider.name for provider in provider_facets(query, limit=10)]
     else:
         suggestions = []
 
@@ -78,27 +75,70 @@ def suggestions():
 @slots.route('/')
 def list_slots():
     page = request.args.get('page', 1, type=int)
-    per_page = 50
     sort = request.args.get('sort', 'name')
     order = request.args.get('order', 'asc')
     search_name = request.args.get('search_name', '')
     search_provider = request.args.get('search_provider', '')
+    provider_id = request.args.get('provider_id', type=int)
+    mode = request.args.get('mode')
+    cursor = request.args.get('cursor')
+
+    if sort not in SORTABLE_COLUMNS | STATS_SORT_COLUMNS:
+        sort = 'name'
+
+    # A página só muda com o catálogo: fica em cache pela versão (app/catalog.py)
+    params = (page, sort, order, search_name, search_provider, provider_id, mode, cursor)
+    return cached_page(params, lambda: render_slot_list(*params))
+
+def render_slot_list(page, sort, order, search_name, search_provider, provider_id, mode, cursor):
+    per_page = 50
     
-    query = Slot.query
+    # O histórico vem no mesmo SELECT; slots sem bónus abertos ficam com NULL
+    query = Slot.query.outerjoin(Slot.stats).options(contains_eager(Slot.stats))
+    if sort in STATS_SORT_COLUMNS:
+        column, value = getattr(SlotStats, sort), lambda slot: getattr(slot.stats, sort, None)
+    else:
+        column, value = getattr(Slot, sort), None
     
     if search_name:
-        query = query.filter(Slot.name.ilike(f'%{search_name}%'))
+        query = query.filter(slot_filter('name', search_name))
     
     if search_provider:
-        query = query.filter(Slot.provider.ilike(f'%{search_provider}%'))
-    
-    if order == 'asc':
-        query = query.order_by(getattr(Slot, sort).asc())
+        query = query.filter(provider_filter(search_provider))
+
+    if provider_id:
+        query = query.filter(Slot.provider_id == provider_id)
+
+    if mode == 'cursor':
+        # Paginação por keyset: sem OFFSET e com a contagem total em cache,
+        # cada página custa o mesmo que a primeira. A versão do catálogo na
+        # chave invalida as contagens também nos outros processos.
+        total = cached_count(query, (catalog_version(), search_name.lower(), search_provider.lower(), provider_id))
+        try:
+            pagination = KeysetPage(query, column, Slot.id, order != 'asc', per_page,
+                                    cursor=cursor, total=total, collation=SORT_COLLATIONS.get(sort), value=value)
+        except InvalidCursor as e:
+            abort(400, description=str(e))
     else:
-        query = query.order_by(getattr(Slot, sort).desc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    return render_template('slots/list.html', pagination=pagination, sort=sort, order=order, search_name=search_name, search_provider=search_provider)
+        sort_column = column
+        if sort in SORT_COLLATIONS:
+            sort_column = sort_column.collate(SORT_COLLATIONS[sort])
+
+        if order == 'asc':
+            query = query.order_by(sort_column.asc(), Slot.id.asc())
+        else:
+            query = query.order_by(sort_column.desc(), Slot.id.desc())
+
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return render_template('slots/list.html', pagination=pagination, sort=sort, order=order, search_name=search_name, search_provider=search_provider,
+                           provider_id=provider_id, providers=provider_facets(), mode=mode)
+
+@slots.route('/providers')
+def list_providers():
+    # Facetas: nº de slots por provider, das contagens mantidas na tabela providers
+    query = request.args.get('query', '')
+    limit = request.args.get('limit', type=int)
+    return jsonify({'providers': [provider.to_dict() for provider in provider_facets(query, limit=limit)]})
 
 @slots.route('/create_form')
 def create_slot_form():
@@ -116,10 +156,13 @@ def create_slot():
             best_x=float(request.form['best_x']) if request.form.get('best_x') else None,
             best_euro=int(float(request.form['best_euro'])) if request.form.get('best_euro') else None
         )
-        handle_image(slot, request.form)
+        pending_image = handle_image(slot, request.form)
         db.session.add(slot)
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Slot created successfully!'})
+        invalidate_count_cache()
+        if pending_image:
+            queue_image_download(slot.id, *pending_image)
+        return jsonify({'success': True, 'message': 'Slot created successfully!', 'image_pending': bool(pending_image)})
     except Exception as e:
         db.session.rollback()
         print(f"Error creating slot: {str(e)}")
@@ -138,9 +181,12 @@ def edit_slot(id):
             slot.best_x = float(request.form['best_x']) if request.form.get('best_x') else None
             slot.best_euro = int(float(request.form['best_euro'])) if request.form.get('best_euro') else None
 
-            handle_image(slot, request.form)
+            pending_image = handle_image(slot, request.form)
             db.session.commit()
-            return jsonify({'success': True, 'message': 'Slot updated successfully!'})
+            invalidate_count_cache()
+            if pending_image:
+                queue_image_download(slot.id, *pending_image)
+            return jsonify({'success': True, 'message': 'Slot updated successfully!', 'image_pending': bool(pending_image)})
         except Exception as e:
             db.session.rollback()
             print(f"Error updating slot: {str(e)}")
@@ -154,31 +200,111 @@ def delete_slot(id):
         slot = Slot.query.get_or_404(id)
         db.session.delete(slot)
         db.session.commit()
+        invalidate_count_cache()
         return jsonify({'success': True, 'message': 'Slot deleted successfully!'})
+    except IntegrityError:
+        # As FKs estão ativas: um slot com bónus não pode ser apagado
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'This slot has bonuses in a Bonus Hunt and cannot be deleted'}), 400
     except Exception as e:
         db.session.rollback()
         print(f"Error deleting slot: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
     
 
+@slots.route('/import', methods=['POST'])
+def import_slots():
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    format = request.form.get('format') or detect_format(file.filename)
+    if format not in ('csv', 'json'):
+        return jsonify({'success': False, 'error': 'Unsupported file format, use CSV or JSON'}), 400
+    try:
+        stats = import_file(file.stream, format)
+        invalidate_count_cache()
+        return jsonify({'success': True, 'stats': stats.to_dict()})
+    except Exception as e:
+        print(f"Error importing slots: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@slots.route('/export')
+def export_slots():
+    format = request.args.get('format', 'ndjson')
+    if format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Unsupported export format, use ndjson or csv'}), 400
+    return export_response('slots', format)
+
+
 @slots.route('/search')
 def search_slots():
     query = request.args.get('q', '')
-    slots = Slot.query.filter(func.lower(Slot.name).like(f"%{query.lower()}%")).all()
-    
-    # Remove duplicates and limit to 10 results
-    unique_slots = {}
-    for slot in slots:
-        if slot.name.lower() not in unique_slots:
-            unique_slots[slot.name.lower()] = slot
-            if len(unique_slots) == 10:
-                break
-    
+    slots = search_slots_ranked(query, limit=10)
+
     result = [{
         'id': slot.id,
         'name': slot.name,
         'provider': slot.provider,
-        'image': url_for('static', filename=slot.image.lstrip('/'), _external=True) if slot.image else None
-    } for slot in unique_slots.values()]
+        'image': url_for('static', filename=slot.image.lstrip('/'), _external=True) if slot.image else None,
+        'thumbnail': url_for('static', filename=thumbnail_or_original(slot.image), _external=True) if slot.image else None
+    } for slot in slots]
     
-    return jsonify(result)
\ No newline at end of file
+    return jsonify(result)
+
+
+@slots.cli.command('reindex')
+def reindex_command():
+    """Rebuild the FTS5 search index over slot names and providers."""
+    rebuild_search_index()
+    print(f"Search index rebuilt ({Slot.query.count()} slots).")
+
+
+@slots.cli.command('rollup')
+def rollup_command():
+    """Rebuild the per-slot history (slot_stats) from every opened bonus."""
+    start = time.perf_counter()
+    count = rebuild_slot_stats()
+    print(f"Slot history rebuilt ({count} slots with opened bonuses, {time.perf_counter() - start:.1f}s).")
+
+
+@slots.cli.command('providers')
+def providers_command():
+    """Link slots without a provider_id, recreate the count triggers and recount slots per provider."""
+    count = rebuild_providers()
+    print(f"Providers rebuilt ({count} providers with slots).")
+
+
+@slots.cli.command('thumbnails')
+@click.option('--force', is_flag=True, help='Regenerate thumbnails that are already up to date.')
+@click.option('--workers', type=int, default=None, help='Number of worker processes (default: one per CPU).')
+def thumbnails_command(force, workers):
+    """Generate the WebP thumbnails for every slot image."""
+    start = time.perf_counter()
+    images = [image for (image,) in db.session.query(Slot.image).filter(Slot.image.isnot(None)).distinct()]
+    created = backfill_thumbnails(images, force=force, workers=workers)
+    print(f"{created} thumbnails created, {len(images) - created} already up to date or missing ({time.perf_counter() - start:.1f}s).")
+
+
+@slots.cli.command('import')
+@click.argument('file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'json']), help='File format (default: from the extension).')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows per transaction.')
+def import_command(file, format, batch_size):
+    """Import or update slots from a CSV or JSON/NDJSON file, matched by (name, provider)."""
+    format = format or detect_format(file.name)
+    if format is None:
+        raise click.UsageError('Cannot detect the file format, use --format.')
+    stats = import_file(file, format, batch_size=batch_size)
+    invalidate_count_cache()
+    print(f"{stats.read} rows read: {stats.inserted} inserted, {stats.updated} updated, {stats.skipped} skipped "
+          f"in {stats.elapsed:.2f}s ({stats.rows_per_second:,.0f} rows/s).")
+
+
+@slots.cli.command('export')
+@click.option('--format', 'format', type=click.Choice(list(EXPORT_FORMATS)), default='ndjson', show_default=True)
+@click.option('-o', '--output', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default: stdout).')
+def export_command(format, output):
+    """Export the slot catalog as NDJSON or CSV."""
+    for chunk in export_table('slots', format):
+        output.write(chunk)
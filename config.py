@@ -3,5 +3,44 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'chave-secreta-padrao'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'slots.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'slots.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Processos usados para gerar miniaturas (None = um por CPU)
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 0)) or None
+    # Downloads de imagens a partir de image_link (em background)
+    IMAGE_FETCH_WORKERS = int(os.environ.get('IMAGE_FETCH_WORKERS', 4))
+    IMAGE_FETCH_TIMEOUT = (5, 20)  # (ligação, leitura) em segundos
+    IMAGE_FETCH_MAX_BYTES = 10 * 1024 * 1024
+    IMAGE_FETCH_RETRIES = 2
+    IMAGE_FETCH_BACKOFF = 0.5
+    # Stream SSE do hunt ativo (/bonus-hunts/active/stream)
+    HUNT_STREAM_POLL = 1.0  # segundos entre verificações de alterações feitas noutros processos
+    HUNT_STREAM_HEARTBEAT = 15
+    HUNT_STREAM_RETRY_MS = 3000
+    JSON_ORJSON = True  # usa o orjson, se estiver instalado (app/json_provider.py)
+    # Projeção Monte Carlo (/bonus-hunts/<id>/projection)
+    PROJECTION_SIMULATIONS = 100000
+    PROJECTION_MAX_SIMULATIONS = 1000000
+    PROJECTION_BATCH_SIZE = 20000  # simulações por lote (memória: lote x bónus por abrir)
+    PROJECTION_MIN_SAMPLES = 5  # amostras mínimas para usar o histórico do slot/provider/faixa
+    # Compressão das respostas JSON/HTML (app/compression.py)
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024  # bytes; abaixo disto não compensa
+    COMPRESS_BR_QUALITY = 5  # 0-11; os estáticos pré-comprimidos usam 11
+    COMPRESS_GZIP_LEVEL = 6
+    # Páginas da lista de slots em cache por versão do catálogo (app/catalog.py); 0 desliga
+    SLOT_LIST_CACHE_SIZE = 256
+    # Hunts com as estatísticas em memória (app/hunt_stats.py), os usados mais recentemente; 0 desliga
+    HUNT_STATS_CACHE_SIZE = 64
+    # Servidor de produção (gunicorn.conf.py, ou wsgi.py com o waitress)
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:8000')
+    # Poucos processos e várias threads: o SQLite só tem um escritor de cada
+    # vez e cada stream SSE ocupa uma thread enquanto estiver ligado
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 0)) or min(os.cpu_count() or 1, 4)
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 30))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 20))  # segundos para acabar os pedidos em curso num reload
+    SERVER_KEEPALIVE = 5
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 0))  # recicla cada worker ao fim de N pedidos (0 = nunca)
+    # GET /health (teste à base de dados para balanceadores/monitorização), desligado por omissão
+    HEALTH_CHECK = os.environ.get('HEALTH_CHECK', '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,32 @@
+from config import Config
+
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Reload: `kill -HUP <master>` recria os workers com a mesma versão do código
+# (com preload_app o código não é relido). Para uma versão nova, `kill -USR2
+# <master>` arranca um master novo ao lado do antigo e `kill -QUIT <antigo>`
+# termina o antigo depois de acabar os pedidos em curso.
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+# gthread: cada stream SSE (/bonus-hunts/active/stream) ocupa uma thread e
+# não o worker inteiro
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+# A app é criada uma vez no master e herdada pelos workers (fork): arranque
+# mais rápido, menos memória e erros de importação logo no arranque
+preload_app = True
+timeout = Config.SERVER_TIMEOUT
+# Os streams SSE não acabam sozinhos: ao fim deste tempo são fechados e o
+# EventSource volta a ligar-se (com o Last-Event-ID) a um worker novo
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS // 10
+
+
+def post_fork(server, worker):
+    # Ligações abertas no master não podem ser partilhadas entre processos
+    from app import db
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
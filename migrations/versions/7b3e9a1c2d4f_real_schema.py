@@ -0,0 +1,100 @@
+"""Real schema: slots, bonus_hunts and bonuses
+
+Revision ID: 7b3e9a1c2d4f
+Revises: 54fc5dc0f211
+Create Date: 2026-10-18 10:12:31.482019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e9a1c2d4f'
+down_revision = '54fc5dc0f211'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A migração inicial criou a tabela legada `slot`, que a aplicação nunca
+    # usou. As tabelas reais foram criadas à mão (ver _aux/), por isso só são
+    # criadas aqui quando ainda não existem; numa base de dados existente
+    # basta fazer `flask db stamp 54fc5dc0f211` antes do `flask db upgrade`.
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'slot' in existing:
+        op.drop_table('slot')
+
+    if 'slots' not in existing:
+        op.create_table('slots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('provider', sa.String(), nullable=False),
+        sa.Column('rtp', sa.Float(), nullable=True),
+        sa.Column('volatility', sa.Integer(), nullable=True),
+        sa.Column('potential', sa.Float(), nullable=True),
+        sa.Column('image', sa.String(), nullable=True),
+        sa.Column('best_x', sa.Float(), nullable=True),
+        sa.Column('best_euro', sa.Integer(), nullable=True),
+        sa.Column('creation_date', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('active', sa.Boolean(), server_default=sa.text('1'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'bonus_hunts' not in existing:
+        op.create_table('bonus_hunts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(), nullable=False),
+        sa.Column('custo_inicial', sa.Float(), nullable=False),
+        sa.Column('data_criacao', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.text('0'), nullable=True),
+        sa.Column('bonus_atual_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['bonus_atual_id'], ['bonuses.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'bonuses' not in existing:
+        op.create_table('bonuses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hunt_id', sa.Integer(), nullable=False),
+        sa.Column('slot_id', sa.Integer(), nullable=False),
+        sa.Column('aposta', sa.Float(), nullable=False),
+        sa.Column('payout', sa.Float(), nullable=True),
+        sa.Column('saldo_restante', sa.Float(), nullable=True),
+        sa.Column('nota', sa.String(), nullable=True),
+        sa.Column('padrinho', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['hunt_id'], ['bonus_hunts.id'], ),
+        sa.ForeignKeyConstraint(['slot_id'], ['slots.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    # O upgrade não cria as tabelas que já existiam (bases de dados anteriores
+    # às migrações) e não fica registado quais criou. Apagá-las com dados
+    # destruiria o catálogo e os hunts, por isso só se reverte com as três
+    # tabelas vazias.
+    connection = op.get_bind()
+    for table in ('bonuses', 'bonus_hunts', 'slots'):
+        if connection.execute(sa.text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar():
+            raise RuntimeError(f"Table '{table}' has data: refusing to drop it. Back up the database and "
+                               f"drop the tables by hand to downgrade past 7b3e9a1c2d4f.")
+
+    op.drop_table('bonuses')
+    op.drop_table('bonus_hunts')
+    op.drop_table('slots')
+    op.create_table('slot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('provedor', sa.String(length=100), nullable=False),
+    sa.Column('rtp', sa.Float(), nullable=True),
+    sa.Column('volatilidade', sa.String(length=50), nullable=True),
+    sa.Column('potencial', sa.Float(), nullable=True),
+    sa.Column('imagem', sa.String(length=200), nullable=True),
+    sa.Column('melhor_x', sa.Float(), nullable=True),
+    sa.Column('melhor_euro', sa.Float(), nullable=True),
+    sa.Column('data_criacao', sa.DateTime(), nullable=True),
+    sa.Column('ativo', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
@@ -0,0 +1,26 @@
+"""Revision counter on bonus_hunts for delta responses
+
+Revision ID: a8d2f6b1c953
+Revises: e2b9d4c7f318
+Create Date: 2026-10-18 14:21:09.533871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d2f6b1c953'
+down_revision = 'e2b9d4c7f318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bonus_hunts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revisao', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('bonus_hunts', schema=None) as batch_op:
+        batch_op.drop_column('revisao')
@@ -0,0 +1,46 @@
+"""ON DELETE CASCADE for bonuses and a partial unique index on the active hunt
+
+Revision ID: b5e1c7d9f042
+Revises: a8d2f6b1c953
+Create Date: 2026-10-18 16:02:44.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1c7d9f042'
+down_revision = 'a8d2f6b1c953'
+branch_labels = None
+depends_on = None
+
+# As FKs originais não têm nome: a convenção dá-lhes um para o batch as
+# conseguir substituir
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def upgrade():
+    with op.batch_alter_table('bonuses', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('fk_bonuses_hunt_id_bonus_hunts', type_='foreignkey')
+        batch_op.create_foreign_key('fk_bonuses_hunt_id_bonus_hunts', 'bonus_hunts', ['hunt_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('bonus_hunts', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('fk_bonus_hunts_bonus_atual_id_bonuses', type_='foreignkey')
+        batch_op.create_foreign_key('fk_bonus_hunts_bonus_atual_id_bonuses', 'bonuses', ['bonus_atual_id'], ['id'], ondelete='SET NULL')
+
+    # Só pode haver um hunt ativo; se houver vários fica o primeiro, o
+    # mesmo que o stream do hunt ativo já mostrava
+    op.execute("UPDATE bonus_hunts SET is_active = 0 WHERE is_active = 1 "
+               "AND id != (SELECT MIN(id) FROM bonus_hunts WHERE is_active = 1)")
+    op.create_index('ux_bonus_hunts_active', 'bonus_hunts', ['is_active'], unique=True,
+                    sqlite_where=sa.text('is_active = 1'))
+
+
+def downgrade():
+    op.drop_index('ux_bonus_hunts_active', table_name='bonus_hunts')
+
+    # bonus_hunts.bonus_atual_id fica com ON DELETE SET NULL, como no esquema de 7b3e9a1c2d4f
+    with op.batch_alter_table('bonuses', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('fk_bonuses_hunt_id_bonus_hunts', type_='foreignkey')
+        batch_op.create_foreign_key('fk_bonuses_hunt_id_bonus_hunts', 'bonus_hunts', ['hunt_id'], ['id'])
@@ -0,0 +1,79 @@
+"""Indexes for the hot queries and the slots FTS5 search index
+
+Revision ID: c41f6d8e9a02
+Revises: 7b3e9a1c2d4f
+Create Date: 2026-10-18 10:40:05.117342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f6d8e9a02'
+down_revision = '7b3e9a1c2d4f'
+branch_labels = None
+depends_on = None
+
+
+SLOT_SORT_INDEXES = {
+    'ix_slots_name_nocase': [sa.text('name COLLATE NOCASE'), 'id'],
+    'ix_slots_provider_nocase': [sa.text('provider COLLATE NOCASE'), 'id'],
+    'ix_slots_rtp': ['rtp', 'id'],
+    'ix_slots_volatility': ['volatility', 'id'],
+    'ix_slots_potential': ['potential', 'id'],
+    'ix_slots_best_x': ['best_x', 'id'],
+    'ix_slots_best_euro': ['best_euro', 'id'],
+    'ix_slots_creation_date': ['creation_date', 'id'],
+}
+
+
+def upgrade():
+    for name, columns in SLOT_SORT_INDEXES.items():
+        op.create_index(name, 'slots', columns, unique=False, if_not_exists=True)
+
+    op.create_index(op.f('ix_bonuses_hunt_id'), 'bonuses', ['hunt_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_bonuses_slot_id'), 'bonuses', ['slot_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_bonus_hunts_is_active'), 'bonus_hunts', ['is_active'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_bonus_hunts_data_criacao'), 'bonus_hunts', ['data_criacao'], unique=False, if_not_exists=True)
+
+    # Índice FTS5 usado por /slots/search e /slots/suggestions (app/search.py)
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS slots_fts USING fts5(
+            name, provider,
+            content='slots', content_rowid='id',
+            tokenize='trigram'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS slots_fts_ai AFTER INSERT ON slots BEGIN
+            INSERT INTO slots_fts(rowid, name, provider) VALUES (new.id, new.name, new.provider);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS slots_fts_ad AFTER DELETE ON slots BEGIN
+            INSERT INTO slots_fts(slots_fts, rowid, name, provider) VALUES ('delete', old.id, old.name, old.provider);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS slots_fts_au AFTER UPDATE OF name, provider ON slots BEGIN
+            INSERT INTO slots_fts(slots_fts, rowid, name, provider) VALUES ('delete', old.id, old.name, old.provider);
+            INSERT INTO slots_fts(rowid, name, provider) VALUES (new.id, new.name, new.provider);
+        END
+    """)
+    op.execute("INSERT INTO slots_fts(slots_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS slots_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS slots_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS slots_fts_ai")
+    op.execute("DROP TABLE IF EXISTS slots_fts")
+
+    op.drop_index(op.f('ix_bonus_hunts_data_criacao'), table_name='bonus_hunts')
+    op.drop_index(op.f('ix_bonus_hunts_is_active'), table_name='bonus_hunts')
+    op.drop_index(op.f('ix_bonuses_slot_id'), table_name='bonuses')
+    op.drop_index(op.f('ix_bonuses_hunt_id'), table_name='bonuses')
+
+    for name in reversed(list(SLOT_SORT_INDEXES)):
+        op.drop_index(name, table_name='slots')
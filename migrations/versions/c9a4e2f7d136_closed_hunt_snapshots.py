@@ -0,0 +1,36 @@
+"""Frozen snapshots for closed hunts
+
+Revision ID: c9a4e2f7d136
+Revises: b5e1c7d9f042
+Create Date: 2026-10-18 17:36:12.640981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9a4e2f7d136'
+down_revision = 'b5e1c7d9f042'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bonus_hunts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fechado_em', sa.DateTime(), nullable=True))
+
+    op.create_table('bonus_hunt_snapshots',
+    sa.Column('hunt_id', sa.Integer(), nullable=False),
+    sa.Column('bonuses', sa.JSON(), nullable=False),
+    sa.Column('estatisticas', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['hunt_id'], ['bonus_hunts.id'], name='fk_bonus_hunt_snapshots_hunt_id_bonus_hunts', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hunt_id')
+    )
+
+
+def downgrade():
+    op.drop_table('bonus_hunt_snapshots')
+
+    with op.batch_alter_table('bonus_hunts', schema=None) as batch_op:
+        batch_op.drop_column('fechado_em')
@@ -0,0 +1,103 @@
+"""Per-slot history of opened bonuses (slot_stats), kept by triggers on bonuses
+
+Revision ID: d6a3f8b2e417
+Revises: c9a4e2f7d136
+Create Date: 2026-10-18 19:12:27.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a3f8b2e417'
+down_revision = 'c9a4e2f7d136'
+branch_labels = None
+depends_on = None
+
+
+STATS_COLUMNS = ['times_played', 'total_bet', 'total_paid', 'avg_x', 'max_x', 'min_x', 'last_played']
+
+# Cópia dos triggers de app/slot_stats.py nesta revisão
+
+
+def _multiplier(row):
+    return f"CASE WHEN {row}.aposta <> 0 THEN {row}.payout / {row}.aposta ELSE 0 END"
+
+
+def _add(row):
+    return f"""
+        INSERT INTO slot_stats (slot_id, times_played, total_bet, total_paid, avg_x, max_x, min_x, last_played)
+        SELECT {row}.slot_id, 1, {row}.aposta, {row}.payout, {row}.payout / nullif({row}.aposta, 0),
+               {_multiplier(row)}, {_multiplier(row)}, (SELECT data_criacao FROM bonus_hunts WHERE id = {row}.hunt_id)
+        WHERE {row}.payout IS NOT NULL
+        ON CONFLICT (slot_id) DO UPDATE SET
+            times_played = times_played + 1,
+            total_bet = total_bet + excluded.total_bet,
+            total_paid = total_paid + excluded.total_paid,
+            avg_x = (total_paid + excluded.total_paid) / nullif(total_bet + excluded.total_bet, 0),
+            max_x = max(max_x, excluded.max_x),
+            min_x = min(min_x, excluded.min_x),
+            last_played = coalesce(max(last_played, excluded.last_played), last_played, excluded.last_played);
+    """
+
+
+def _remove(row):
+    return f"""
+        UPDATE slot_stats SET
+            times_played = times_played - 1,
+            total_bet = total_bet - {row}.aposta,
+            total_paid = total_paid - {row}.payout,
+            avg_x = (total_paid - {row}.payout) / nullif(total_bet - {row}.aposta, 0)
+        WHERE slot_id = {row}.slot_id AND {row}.payout IS NOT NULL;
+        UPDATE slot_stats SET (max_x, min_x, last_played) = (
+            SELECT max({_multiplier('b')}), min({_multiplier('b')}), max(h.data_criacao)
+            FROM bonuses b LEFT JOIN bonus_hunts h ON h.id = b.hunt_id
+            WHERE b.slot_id = {row}.slot_id AND b.payout IS NOT NULL
+        )
+        WHERE slot_id = {row}.slot_id AND {row}.payout IS NOT NULL AND (
+            max_x = {_multiplier(row)} OR min_x = {_multiplier(row)}
+            OR NOT EXISTS (SELECT 1 FROM bonus_hunts WHERE id = {row}.hunt_id AND data_criacao < last_played)
+        );
+        DELETE FROM slot_stats WHERE slot_id = {row}.slot_id AND times_played <= 0;
+    """
+
+
+def upgrade():
+    op.create_table('slot_stats',
+    sa.Column('slot_id', sa.Integer(), nullable=False),
+    sa.Column('times_played', sa.Integer(), nullable=False),
+    sa.Column('total_bet', sa.Float(), nullable=False),
+    sa.Column('total_paid', sa.Float(), nullable=False),
+    sa.Column('avg_x', sa.Float(), nullable=True),
+    sa.Column('max_x', sa.Float(), nullable=True),
+    sa.Column('min_x', sa.Float(), nullable=True),
+    sa.Column('last_played', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['slot_id'], ['slots.id'], name='fk_slot_stats_slot_id_slots', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('slot_id')
+    )
+    for column in STATS_COLUMNS:
+        op.create_index(f'ix_slot_stats_{column}', 'slot_stats', [column, 'slot_id'], unique=False)
+
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS slot_stats_ai AFTER INSERT ON bonuses BEGIN {_add('new')} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS slot_stats_ad AFTER DELETE ON bonuses BEGIN {_remove('old')} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS slot_stats_au AFTER UPDATE OF slot_id, hunt_id, aposta, payout ON bonuses "
+               f"BEGIN {_remove('old')} {_add('new')} END")
+
+    # Histórico que já existe
+    op.execute(f"""
+        INSERT INTO slot_stats (slot_id, times_played, total_bet, total_paid, avg_x, max_x, min_x, last_played)
+        SELECT b.slot_id, count(*), sum(b.aposta), sum(b.payout), sum(b.payout) / nullif(sum(b.aposta), 0),
+               max({_multiplier('b')}), min({_multiplier('b')}), max(h.data_criacao)
+        FROM bonuses b LEFT JOIN bonus_hunts h ON h.id = b.hunt_id
+        WHERE b.payout IS NOT NULL
+        GROUP BY b.slot_id
+    """)
+
+
+def downgrade():
+    for trigger in ('slot_stats_ai', 'slot_stats_ad', 'slot_stats_au'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for column in STATS_COLUMNS:
+        op.drop_index(f'ix_slot_stats_{column}', table_name='slot_stats')
+    op.drop_table('slot_stats')
@@ -0,0 +1,72 @@
+"""Copy slot images into the content-addressed store
+
+Revision ID: e2b9d4c7f318
+Revises: c41f6d8e9a02
+Create Date: 2026-10-18 12:03:44.906215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+import hashlib
+import os
+import shutil
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b9d4c7f318'
+down_revision = 'c41f6d8e9a02'
+branch_labels = None
+depends_on = None
+
+
+STORE_DIR = 'images/store'
+
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def upgrade():
+    # Liga (hard link) ou, se não for possível, copia cada imagem
+    # referenciada por um slot para images/store/<hash[:2]>/<hash>.<ext> e
+    # atualiza Slot.image. Os originais em images/slots/ ficam no sítio e
+    # podem ser apagados à mão.
+    connection = op.get_bind()
+    static_folder = current_app.static_folder
+    images = connection.execute(sa.text(
+        "SELECT DISTINCT image FROM slots WHERE image IS NOT NULL AND image NOT LIKE :store"
+    ), {'store': f'{STORE_DIR}/%'}).scalars().all()
+
+    stored = missing = 0
+    for image in images:
+        source = os.path.join(static_folder, image.lstrip('/'))
+        if not os.path.isfile(source):
+            missing += 1
+            continue
+        digest = file_hash(source)
+        ext = source.rsplit('.', 1)[1].lower()
+        new_image = f'{STORE_DIR}/{digest[:2]}/{digest}.{ext}'
+        destination = os.path.join(static_folder, new_image)
+        if not os.path.exists(destination):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            try:
+                os.link(source, destination)
+            except OSError:
+                shutil.copy2(source, destination)
+        connection.execute(sa.text("UPDATE slots SET image = :new WHERE image = :old"),
+                           {'new': new_image, 'old': image})
+        stored += 1
+
+    print(f"{stored} images linked or copied into {STORE_DIR}, {missing} missing on disk.")
+
+
+def downgrade():
+    # Não reverte nada: os caminhos antigos não são guardados, por isso
+    # Slot.image continua a apontar para a store, e a store (images/store/)
+    # não é apagada. Os originais em images/slots/ nunca foram removidos.
+    print(f"Downgrade keeps {STORE_DIR} and the store paths in slots.image.")
@@ -0,0 +1,118 @@
+"""Providers table: deduplicated provider names referenced by slots.provider_id
+
+Revision ID: e8c4b1d7a259
+Revises: d6a3f8b2e417
+Create Date: 2026-10-18 20:31:54.270615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import re
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c4b1d7a259'
+down_revision = 'd6a3f8b2e417'
+branch_labels = None
+depends_on = None
+
+
+# Cópia de app/providers.py nesta revisão
+GENERIC_SUFFIXES = {'gaming', 'games', 'studio', 'studios', 'entertainment', 'technologies', 'interactive'}
+
+COUNT_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_count_ai AFTER INSERT ON slots BEGIN
+        UPDATE providers SET slot_count = slot_count + 1 WHERE id = new.provider_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_count_ad AFTER DELETE ON slots BEGIN
+        UPDATE providers SET slot_count = slot_count - 1 WHERE id = old.provider_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_count_au AFTER UPDATE OF provider_id ON slots BEGIN
+        UPDATE providers SET slot_count = slot_count - 1 WHERE id = old.provider_id;
+        UPDATE providers SET slot_count = slot_count + 1 WHERE id = new.provider_id;
+    END
+    """,
+]
+
+# O batch do downgrade recria a tabela slots e perde os triggers do FTS5
+# (ver c41f6d8e9a02)
+FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS slots_fts_ai AFTER INSERT ON slots BEGIN
+        INSERT INTO slots_fts(rowid, name, provider) VALUES (new.id, new.name, new.provider);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS slots_fts_ad AFTER DELETE ON slots BEGIN
+        INSERT INTO slots_fts(slots_fts, rowid, name, provider) VALUES ('delete', old.id, old.name, old.provider);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS slots_fts_au AFTER UPDATE OF name, provider ON slots BEGIN
+        INSERT INTO slots_fts(slots_fts, rowid, name, provider) VALUES ('delete', old.id, old.name, old.provider);
+        INSERT INTO slots_fts(rowid, name, provider) VALUES (new.id, new.name, new.provider);
+    END
+    """,
+]
+
+
+def provider_key(name):
+    words = re.findall(r'[a-z0-9]+', name.lower())
+    while len(words) > 1 and words[-1] in GENERIC_SUFFIXES:
+        words.pop()
+    return ''.join(words) or name.strip().lower()
+
+
+def upgrade():
+    op.create_table('providers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('slot_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key', name='uq_providers_key')
+    )
+    op.create_index('ix_providers_name_nocase', 'providers', [sa.text('name COLLATE NOCASE')], unique=False)
+
+    # ADD COLUMN com REFERENCES não precisa de recriar a tabela slots (nem
+    # os triggers do FTS5 e do histórico)
+    op.execute("ALTER TABLE slots ADD COLUMN provider_id INTEGER REFERENCES providers (id)")
+    op.create_index('ix_slots_provider_id', 'slots', ['provider_id', 'id'], unique=False)
+
+    # Variantes do mesmo nome ficam com a grafia mais usada
+    connection = op.get_bind()
+    spellings = {}
+    for name, count in connection.execute(sa.text("SELECT provider, count(*) FROM slots GROUP BY provider")):
+        spellings.setdefault(provider_key(name), []).append((count, len(name), name))
+    for key, names in spellings.items():
+        canonical = max(names)[2].strip()
+        provider_id = connection.execute(
+            sa.text("INSERT INTO providers (name, key, slot_count) VALUES (:name, :key, 0) RETURNING id"),
+            {'name': canonical, 'key': key}
+        ).scalar()
+        connection.execute(
+            sa.text("UPDATE slots SET provider_id = :id, provider = :canonical WHERE provider = :name"),
+            [{'id': provider_id, 'canonical': canonical, 'name': name} for _, _, name in names]
+        )
+
+    for statement in COUNT_TRIGGERS:
+        op.execute(statement)
+    op.execute("UPDATE providers SET slot_count = (SELECT count(*) FROM slots WHERE slots.provider_id = providers.id)")
+
+
+def downgrade():
+    for trigger in ('providers_count_ai', 'providers_count_ad', 'providers_count_au'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_index('ix_slots_provider_id', table_name='slots')
+    with op.batch_alter_table('slots', schema=None) as batch_op:
+        batch_op.drop_column('provider_id')
+    for statement in FTS_TRIGGERS:
+        op.execute(statement)
+
+    op.drop_index('ix_providers_name_nocase', table_name='providers')
+    op.drop_table('providers')
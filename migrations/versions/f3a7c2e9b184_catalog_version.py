@@ -0,0 +1,43 @@
+"""Catalog version: counter bumped by triggers on slots and slot_stats
+
+Revision ID: f3a7c2e9b184
+Revises: e8c4b1d7a259
+Create Date: 2026-10-18 22:14:07.512390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7c2e9b184'
+down_revision = 'e8c4b1d7a259'
+branch_labels = None
+depends_on = None
+
+
+# Cópia de app/catalog.py nesta revisão
+TRIGGERS = [(table, suffix, operation)
+            for table in ('slots', 'slot_stats')
+            for suffix, operation in (('ai', 'INSERT'), ('ad', 'DELETE'), ('au', 'UPDATE'))]
+
+
+def upgrade():
+    op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 0)")
+    for table, suffix, operation in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS catalog_version_{table}_{suffix} AFTER {operation} ON {table} BEGIN
+                UPDATE catalog_version SET version = version + 1;
+            END
+        """)
+
+
+def downgrade():
+    for table, suffix, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS catalog_version_{table}_{suffix}")
+    op.drop_table('catalog_version')
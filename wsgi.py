@@ -0,0 +1,13 @@
+from app import create_app
+
+# Ponto de entrada de produção:
+#   gunicorn -c gunicorn.conf.py wsgi:app   (Linux/macOS)
+#   python wsgi.py                          (waitress, também no Windows)
+# O run.py fica para o servidor de desenvolvimento.
+
+app = create_app()
+
+if __name__ == '__main__':
+    from waitress import serve
+    # O waitress é um só processo: as threads de todos os workers
+    serve(app, listen=app.config['SERVER_BIND'], threads=app.config['SERVER_WORKERS'] * app.config['SERVER_THREADS'])